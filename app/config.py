@@ -0,0 +1,109 @@
+import os
+
+# ----------------- Upstream transaction API -----------------
+VERDI_API_URL = os.environ.get(
+    "VERDI_API_URL", "https://tryverdi.com/api/transaction_data"
+)
+UPSTREAM_TIMEOUT = float(os.environ.get("UPSTREAM_TIMEOUT", "30"))
+UPSTREAM_HTTP2 = os.environ.get("UPSTREAM_HTTP2", "true").lower() == "true"
+UPSTREAM_MAX_CONNECTIONS = int(os.environ.get("UPSTREAM_MAX_CONNECTIONS", "20"))
+UPSTREAM_MAX_KEEPALIVE = int(os.environ.get("UPSTREAM_MAX_KEEPALIVE", "10"))
+UPSTREAM_KEEPALIVE_EXPIRY = float(os.environ.get("UPSTREAM_KEEPALIVE_EXPIRY", "30"))
+# Parse the transaction payload incrementally instead of response.json()
+UPSTREAM_STREAMING = os.environ.get("UPSTREAM_STREAMING", "true").lower() == "true"
+
+# ----------------- Day-partitioned order cache -----------------
+ORDER_CACHE_ENABLED = os.environ.get("ORDER_CACHE_ENABLED", "true").lower() == "true"
+# Capacity in orders, not bytes: a projected order plus its parsed-timestamp
+# (_ts) cache takes about 2.3 KB, so 40000 orders is ~90 MB, sized for the
+# 512 MB render.yaml plan. Scale it with the instance's memory.
+ORDER_CACHE_MAX_ORDERS = int(os.environ.get("ORDER_CACHE_MAX_ORDERS", "40000"))
+ORDER_CACHE_TTL = int(os.environ.get("ORDER_CACHE_TTL", "21600"))  # past days
+ORDER_CACHE_TODAY_TTL = int(os.environ.get("ORDER_CACHE_TODAY_TTL", "60"))
+ORDER_CACHE_REDIS = os.environ.get("ORDER_CACHE_REDIS", "false").lower() == "true"
+
+# ----------------- Redis -----------------
+# Shared async connection pool (created in the app lifespan)
+REDIS_MAX_CONNECTIONS = int(os.environ.get("REDIS_MAX_CONNECTIONS", "20"))
+
+# ----------------- Task-history jobs -----------------
+# Table builds run on a process pool of TASK_HISTORY_WORKERS; at most
+# TASK_HISTORY_MAX_PENDING jobs are accepted per API process
+TASK_HISTORY_WORKERS = int(os.environ.get("TASK_HISTORY_WORKERS", "2"))
+TASK_HISTORY_MAX_PENDING = int(os.environ.get("TASK_HISTORY_MAX_PENDING", "32"))
+# Orders per unit of work (progress advances per chunk)
+TASK_HISTORY_CHUNK_ORDERS = int(os.environ.get("TASK_HISTORY_CHUNK_ORDERS", "2000"))
+# Finished tables (and their job records) are kept this long; identical
+# requests within the window reuse them instead of rebuilding
+TASK_HISTORY_TABLE_TTL = int(os.environ.get("TASK_HISTORY_TABLE_TTL", "900"))
+# Queued/running job records expire after this if a build never finishes
+TASK_HISTORY_JOB_TTL = int(os.environ.get("TASK_HISTORY_JOB_TTL", "600"))
+
+# ----------------- Responses -----------------
+# "orjson": render JSON with orjson (falls back to json when not installed);
+# "json": the standard library encoder
+JSON_RESPONSE = os.environ.get("JSON_RESPONSE", "orjson").lower()
+
+# ----------------- Exports -----------------
+# Rows per streamed CSV/NDJSON chunk
+EXPORT_BATCH_ROWS = int(os.environ.get("EXPORT_BATCH_ROWS", "500"))
+
+# ----------------- Report engine -----------------
+# "columnar": convert each fetched batch once into NumPy columns and run the
+# vectorized reports; "python": the original per-order dict loops
+REPORT_ENGINE = os.environ.get("REPORT_ENGINE", "columnar").lower()
+
+# ----------------- Duration statistics -----------------
+# Relative accuracy of the p50/p90/p99 sketches (0.01 == within 1%)
+PERCENTILE_ACCURACY = float(os.environ.get("PERCENTILE_ACCURACY", "0.01"))
+
+# ----------------- Client filter pushdown -----------------
+# Client-scoped reports can pass up to this many selected clients to the
+# upstream user_id parameter (one request each) for the days not already
+# cached under "all". Upstream matches user_id exactly against the display
+# name while the reports match names case- and whitespace-insensitively, so
+# a differently spelled name would be dropped: enable it (> 0) only where the
+# selected names are exactly the upstream ones. 0 (the default) fetches "all".
+CLIENT_PUSHDOWN_MAX_CLIENTS = int(os.environ.get("CLIENT_PUSHDOWN_MAX_CLIENTS", "0"))
+CLIENT_FETCH_CONCURRENCY = int(os.environ.get("CLIENT_FETCH_CONCURRENCY", "4"))
+
+# ----------------- Area matching -----------------
+# Distinct pickup addresses whose matched area is memoized
+AREA_MATCH_CACHE_SIZE = int(os.environ.get("AREA_MATCH_CACHE_SIZE", "50000"))
+# Unmatched addresses fall back to the nearest centroid within this distance
+AREA_FALLBACK_MAX_KM = float(os.environ.get("AREA_FALLBACK_MAX_KM", "5"))
+
+# ----------------- Driver index -----------------
+# Serve auto-allocation from an in-memory grid fed by a Firestore listener
+DRIVER_INDEX_ENABLED = os.environ.get("DRIVER_INDEX_ENABLED", "true").lower() == "true"
+DRIVER_INDEX_CELL_DEG = float(os.environ.get("DRIVER_INDEX_CELL_DEG", "0.05"))
+# How often the listener is checked; a stopped one is replaced
+DRIVER_INDEX_CHECK_SECONDS = float(os.environ.get("DRIVER_INDEX_CHECK_SECONDS", "5"))
+# Firestore fallback: geohash prefix queries instead of a lat band. Only finds
+# drivers whose geohash is current, so enable it once backfill_driver_geohashes
+# has run, the isOnline/havingtask/geohash composite index exists and every
+# writer of lat/lng (including the driver app) goes through
+# write_driver_location / location_fields; otherwise moved drivers are missed
+# or the query fails.
+DRIVER_GEOHASH_QUERIES = (
+    os.environ.get("DRIVER_GEOHASH_QUERIES", "false").lower() == "true"
+)
+DRIVER_GEOHASH_MAX_QUERIES = int(os.environ.get("DRIVER_GEOHASH_MAX_QUERIES", "9"))
+# First ring of the k-nearest search (doubles until k drivers or max_radius)
+DRIVER_SEARCH_START_KM = float(os.environ.get("DRIVER_SEARCH_START_KM", "2"))
+# Pickups per /auto-allocation/batch wave (the hungarian method is O(n^3))
+DRIVER_BATCH_MAX_PICKUPS = int(os.environ.get("DRIVER_BATCH_MAX_PICKUPS", "200"))
+
+# Location pings: applied to the index at once, written to Firestore in
+# coalesced batches every DRIVER_LOCATION_FLUSH_SECONDS
+DRIVER_LOCATION_FLUSH_SECONDS = float(
+    os.environ.get("DRIVER_LOCATION_FLUSH_SECONDS", "2")
+)
+DRIVER_LOCATION_BATCH_SIZE = int(os.environ.get("DRIVER_LOCATION_BATCH_SIZE", "500"))
+# Upper bound on the last flush when the app shuts down
+DRIVER_LOCATION_SHUTDOWN_TIMEOUT = float(
+    os.environ.get("DRIVER_LOCATION_SHUTDOWN_TIMEOUT", "10")
+)
+
+# "numpy": vectorized distance/availability masks; "python": per-driver loop
+DRIVER_DISTANCE_KERNEL = os.environ.get("DRIVER_DISTANCE_KERNEL", "numpy").lower()
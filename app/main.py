@@ -1,9 +1,73 @@
+import asyncio
+import logging
+import os
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.routers import reports_router
 from app.routers import drivers_router
+from app import config
+from app.services.drivers.driver_index import driver_index
+from app.services.drivers.location_writer import location_writer
+from app.services.reports.taskHistoryService import task_history_jobs
+from app.utils.area_matcher import get_area_matcher, get_centroid_index
+from app.utils.data_fetcher import createClient
+from app.utils.order_cache import order_cache
+from app.utils.redis_client import createRedis
+from app.utils.responses import FastJSONResponse
+
+logger = logging.getLogger(__name__)
+
 
-app = FastAPI(title="Analytics API", version="1.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Shared upstream HTTP client (connection pool lives for the whole process)
+    app.state.http_client = createClient()
+    # Shared Redis pool: task-history jobs and (optionally) the order cache tier
+    app.state.redis = createRedis()
+    if config.ORDER_CACHE_REDIS and os.environ.get("REDIS_HOST"):
+        order_cache.redis = app.state.redis
+    # Process pool for task-history table builds
+    task_history_jobs.start()
+    # Build the area alias automaton and centroid index before the first
+    # /api/area_report
+    get_area_matcher()
+    get_centroid_index()
+    # Live driver positions for auto-allocation (listener restarted if it stops)
+    driver_listener = (
+        asyncio.create_task(driver_index.keep_listening())
+        if config.DRIVER_INDEX_ENABLED
+        else None
+    )
+    # Write-behind flusher for /api/drivers/locations
+    location_flusher = asyncio.create_task(location_writer.run())
+    yield
+    location_flusher.cancel()
+    try:
+        await location_flusher  # runs the final (time-bounded) flush
+    except asyncio.CancelledError:
+        pass
+    except Exception:
+        # keep shutting down: the job pool, clients and listener still close
+        logger.exception("driver location flusher failed")
+    if driver_listener is not None:
+        driver_listener.cancel()
+        try:
+            await driver_listener  # unsubscribes
+        except asyncio.CancelledError:
+            pass
+    await task_history_jobs.shutdown()
+    await app.state.http_client.aclose()
+    await app.state.redis.aclose()
+
+
+app = FastAPI(
+    title="Analytics API",
+    version="1.0",
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse,
+)
 
 # CORS (for frontend access)
 app.add_middleware(
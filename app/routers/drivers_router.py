@@ -1,21 +1,26 @@
 # app/routes/reports.py
 
-from fastapi import APIRouter, HTTPException, Query
-from typing import Literal
+from fastapi import APIRouter, HTTPException, Query, status
+from pydantic import BaseModel, Field, model_validator
+from typing import List, Literal, Optional
+from app import config
 from app.utils.firebase_connection import db
+from app.services.drivers.batch_AA import auto_allocation_batch
 from app.services.drivers.batchwise_AA import auto_allocation_batchwise
+from app.services.drivers.location_writer import location_writer
 from app.services.drivers.oneByOne_AA import auto_allocation_one_by_one
 
 router = APIRouter(prefix="/api/drivers", tags=["Drivers"])
 
 
 @router.get("/auto-allocation")
-def auto_allocation(
+async def auto_allocation(
     pickup_lat: float,
     pickup_lng: float,
     type: Literal["one_by_one", "batchwise"] = Query("one_by_one"),
     max_radius: float = Query(15.0, ge=0.1),
     increment: float = Query(5.0, ge=0.1),
+    k: Optional[int] = Query(None, ge=1),  # one_by_one: only the k nearest
 ):
     if pickup_lat is None or pickup_lng is None:
         raise HTTPException(
@@ -24,13 +29,14 @@ def auto_allocation(
         )
 
     if type == "one_by_one":
-        return auto_allocation_one_by_one(
+        return await auto_allocation_one_by_one(
             pickup_lat=pickup_lat,
             pickup_lng=pickup_lng,
             max_radius=max_radius,
+            k=k,
         )
     elif type == "batchwise":
-        return auto_allocation_batchwise(
+        return await auto_allocation_batchwise(
             pickup_lat=pickup_lat,
             pickup_lng=pickup_lng,
             max_radius=max_radius,
@@ -38,3 +44,56 @@ def auto_allocation(
         )
     else:
         return("Wrong algorithm type!!")
+
+
+class Pickup(BaseModel):
+    lat: float
+    lng: float
+    order_id: Optional[str] = None
+
+
+class BatchAllocationRequest(BaseModel):
+    pickups: List[Pickup] = Field(
+        ..., min_length=1, max_length=config.DRIVER_BATCH_MAX_PICKUPS
+    )
+    max_radius: float = Field(15.0, ge=0.1)
+    method: Literal["hungarian", "greedy"] = "hungarian"
+
+
+@router.post("/auto-allocation/batch")
+async def auto_allocation_wave(request: BatchAllocationRequest):
+    # One driver read and one distinct driver per pickup for the whole wave
+    return await auto_allocation_batch(
+        pickups=[p.model_dump() for p in request.pickups],
+        max_radius=request.max_radius,
+        method=request.method,
+    )
+
+
+class LocationUpdate(BaseModel):
+    driver_id: str = Field(..., min_length=1)
+    lat: Optional[float] = Field(None, ge=-90, le=90)
+    lng: Optional[float] = Field(None, ge=-180, le=180)
+    havingtask: Optional[bool] = None
+    isOnline: Optional[bool] = None
+    duty_state: Optional[str] = None
+
+    @model_validator(mode="after")
+    def lat_lng_together(self):
+        if (self.lat is None) != (self.lng is None):
+            raise ValueError("lat and lng must be sent together")
+        return self
+
+
+class LocationBatch(BaseModel):
+    updates: List[LocationUpdate] = Field(..., min_length=1)
+
+
+@router.post("/locations", status_code=status.HTTP_202_ACCEPTED)
+async def ingest_locations(batch: LocationBatch):
+    # Visible to allocation immediately; Firestore gets coalesced batched writes
+    accepted = location_writer.submit(
+        (u.driver_id, u.model_dump(exclude={"driver_id"}, exclude_none=True))
+        for u in batch.updates
+    )
+    return {"accepted": accepted, "pending": location_writer.pending}
@@ -1,22 +1,47 @@
 # app/routes/reports.py
 
-import json
-import os
-from fastapi import APIRouter, Query
-from typing import List, Optional
-from datetime import datetime
-import uuid
-import threading
-
-import redis
-
-from app.services.reports.driverService import driverReport
-from app.services.reports.clientService import clientReport
-from app.services.reports.hourlyService import hourlyReport
+import httpx
+import redis.asyncio as aioredis
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import status as status_codes
+from typing import List, Literal, Optional
+
+from app import config
+from app.services.reports.driverService import driverReport, driverReportColumns
+from app.services.reports.clientService import clientReport, clientReportColumns
+from app.services.reports.hourlyService import hourlyReport, hourlyReportColumns
 from app.services.reports.driverEarningsService import driverEarnings
-from app.services.reports.areaReport import areaReport, formatAreas
-from app.services.reports.taskHistoryService import task_history, task_history_table
-from app.utils.data_fetcher import getData
+from app.services.reports.areaReport import areaReport, areaReportColumns, formatAreas
+from app.services.reports.taskHistoryService import (
+    existing_task_history_summary,
+    fetch_task_history_table,
+    start_task_history_table,
+    task_history,
+    task_history_columns,
+    task_history_job_id,
+    task_history_row,
+)
+from app.utils.data_fetcher import (
+    getClientData,
+    getData,
+    get_http_client,
+    streamClientData,
+)
+from app.utils.export import export_response, export_response_async
+from app.utils.order_filters import (
+    apply_filters,
+    apply_filters_async,
+    area_filter,
+    client_filter,
+    driver_filter,
+    status_filter,
+    time_window_filter,
+)
+from app.utils.job_engine import JobQueueFull
+from app.utils.order_store import OrderColumns
+from app.utils.redis_client import get_redis
+from app.utils.responses import json_response
+from app.utils.table_page import project, table_page, table_params
 
 router = APIRouter(prefix="/api", tags=["Reports"])
 
@@ -27,34 +52,51 @@ async def generate_driver_report(
     end_date: str,
     filter_by: Optional[List[str]] = Query(default=None),
     status: str = "all",
+    client: httpx.AsyncClient = Depends(get_http_client),
+    paging: Optional[dict] = Depends(table_params),
 ):
-    data = await getData(start_date, end_date, "all")
+    data = await _driver_orders(start_date, end_date, filter_by, status, client)
 
-    # Filter by driver
-    if filter_by and not any(f.lower() == "all" for f in filter_by):
-        data = [
-            order
-            for order in data
-            if any(
-                (
-                    (order.get("pickup_task", {}).get("driver_name") or "")
-                    .strip()
-                    .split(" ")[-1]
-                    .upper()
-                    == f.upper()
-                )
-                for f in filter_by
-                if (order.get("pickup_task", {}).get("driver_name") or "").strip()
-            )
-        ]
+    if config.REPORT_ENGINE == "columnar":
+        summary = driverReportColumns(OrderColumns(data))
+    else:
+        summary = driverReport(list(data))
 
-    if status != "all":
-        data = [
-            order for order in data if str(order.get("status", "")).lower() == status
-        ]
+    if paging:
+        _, summary["table_data"], summary["pagination"] = _page(
+            summary["table_data"], paging
+        )
+    return json_response(summary)
 
-    summary = driverReport(data)
-    return summary
+
+async def _driver_orders(start_date, end_date, filter_by, status, client):
+    data = await getData(start_date, end_date, "all", client)
+
+    # Filter by driver and status in one pass
+    return apply_filters(data, status_filter(status), driver_filter(filter_by))
+
+
+def _page(rows, paging, presorted_by=None):
+    """
+    (table positions of the page rows, page rows projected to `fields`,
+    pagination) of a report table; see table_page for `presorted_by`.
+    """
+    try:
+        page_rows, pagination = table_page(
+            rows,
+            paging["page"],
+            paging["page_size"],
+            paging["sort_by"],
+            presorted_by,
+        )
+        position = {id(row): i for i, row in enumerate(rows)}
+        return (
+            [position[id(row)] for row in page_rows],
+            project(page_rows, paging["fields"]),
+            pagination,
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=status_codes.HTTP_400_BAD_REQUEST, detail=str(exc))
 
 
 @router.get("/client_report")
@@ -63,28 +105,34 @@ async def generate_client_report(
     end_date: str,
     filter_by: Optional[List[str]] = Query(default=None),
     status: str = "all",
+    client: httpx.AsyncClient = Depends(get_http_client),
+    paging: Optional[dict] = Depends(table_params),
 ):
-    data = await getData(start_date, end_date, "all")
-
-    # Filter by client name if provided
-    if filter_by and not any(f.lower() == "all" for f in filter_by):
-        data = [
-            order
-            for order in data
-            if any(
-                (order.get("user_name") or "").strip().lower() == f.lower()
-                for f in filter_by
-                if (order.get("user_name") or "").strip()
-            )
-        ]
+    data = await _client_orders(start_date, end_date, filter_by, status, client)
+
+    if config.REPORT_ENGINE == "columnar":
+        summary = clientReportColumns(OrderColumns(data))
+    else:
+        summary = clientReport(list(data))
 
-    if status != "all":
-        data = [
-            order for order in data if str(order.get("status", "")).lower() == status
+    if paging:
+        positions, summary["table"], summary["pagination"] = _page(
+            summary["table"], paging
+        )
+        # the scatter repeats every client, parallel to the table (both by
+        # client code): keep the page's, in page order
+        charts = summary["charts"]
+        charts["scatter_clients"] = [
+            charts["scatter_clients"][i] for i in positions
         ]
+    return json_response(summary)
+
 
-    summary = clientReport(data)
-    return summary
+async def _client_orders(start_date, end_date, filter_by, status, client):
+    data = await getClientData(start_date, end_date, filter_by, client)
+
+    # Filter by client name and status in one pass
+    return apply_filters(data, status_filter(status), client_filter(filter_by))
 
 
 @router.get("/hourly_report")
@@ -95,59 +143,34 @@ async def generate_hourly_report(
     end_time: str,
     filter_by: Optional[List[str]] = Query(default=None),
     status: str = "all",
+    client: httpx.AsyncClient = Depends(get_http_client),
 ):
-    # Fetch all data for the date range
-    data = await getData(start_date, end_date, "all")
-
-    # Parse the start_time and end_time into time objects
-    start_time_obj = datetime.strptime(start_time, "%H:%M").time()
-    end_time_obj = datetime.strptime(end_time, "%H:%M").time()
-
-    # Helper function to check if a datetime is in the filtered time window
-    def is_in_time_window(dt: datetime) -> bool:
-        t = dt.time()
-        if start_time_obj <= end_time_obj:
-            return start_time_obj <= t <= end_time_obj
-        else:
-            # Overnight range, e.g., 22:00–02:00
-            return t >= start_time_obj or t <= end_time_obj
-
-    # Filter orders by time window
-    data = [
-        order
-        for order in data
-        if order.get("created_at")
-        and is_in_time_window(
-            datetime.strptime(order["created_at"], "%Y-%m-%d %H:%M:%S")
-        )
-    ]
-
-    # Filter by client name if provided
-    if filter_by and not any(f.lower() == "all" for f in filter_by):
-        data = [
-            order
-            for order in data
-            if any(
-                (order.get("user_name") or "").strip().lower() == f.lower()
-                for f in filter_by
-                if (order.get("user_name") or "").strip()
-            )
-        ]
-
-    # Filter by status if provided
-    if status.lower() != "all":
-        data = [
-            order
-            for order in data
-            if str(order.get("status", "")).lower() == status.lower()
-        ]
+    # Fetch the date range (only the selected clients when few are chosen)
+    data = await getClientData(start_date, end_date, filter_by, client)
+
+    # Status, client and time-window (overnight windows wrap midnight) in one pass
+    data = apply_filters(
+        data,
+        status_filter(status),
+        client_filter(filter_by),
+        time_window_filter(start_time, end_time),
+    )
 
     # Call the hourlyReport function to generate the JSON response
+    if config.REPORT_ENGINE == "columnar":
+        return json_response(
+            hourlyReportColumns(
+                OrderColumns(data),
+                start_date=start_date,
+                end_date=end_date,
+                top_n_clients=5,
+            )
+        )
     summary = hourlyReport(
         data, start_date=start_date, end_date=end_date, top_n_clients=5
     )
 
-    return summary
+    return json_response(summary)
 
 
 @router.get("/area_report")
@@ -160,52 +183,54 @@ async def generate_area_report(
         default=None, alias="filter_by"
     ),  # optional filter by area names
     status: str = "all",
+    client: httpx.AsyncClient = Depends(get_http_client),
+    paging: Optional[dict] = Depends(table_params),
 ):
+    data = await _area_orders(
+        start_date, end_date, start_time, end_time, areas, status, client
+    )
+
+    # Build final report (statcards + heatmap + table); a paged request only
+    # sorts its page, so the full table is left in area-code order
+    sort = paging is None
+    if config.REPORT_ENGINE == "columnar":
+        result = areaReportColumns(OrderColumns(data), sort=sort)
+    else:
+        result = areaReport(data, sort=sort)
+
+    if paging:
+        positions, result["table"], result["pagination"] = _page(
+            result["table"], paging, presorted_by="Orders"
+        )
+        # the heatmap repeats every area, parallel to the table: keep the
+        # page's, in page order
+        result["heatmap"] = [result["heatmap"][i] for i in positions]
+    return json_response(result)
+
+
+async def _area_orders(start_date, end_date, start_time, end_time, areas, status, client):
     # 1) Fetch base data for the date range
-    data = await getData(start_date, end_date, "all")
-
-    # 2) Parse time window (supports overnight windows like 22:00–02:00)
-    start_time_obj = datetime.strptime(start_time, "%H:%M").time()
-    end_time_obj = datetime.strptime(end_time, "%H:%M").time()
-
-    def is_in_time_window(dt: datetime) -> bool:
-        t = dt.time()
-        if start_time_obj <= end_time_obj:
-            return start_time_obj <= t <= end_time_obj
-        # else:
-        #     # Overnight range
-        #     return (t >= start_time_obj) or (t <= end_time_obj)
-
-    # 3) Time filter on created_at
-    data = [
-        o
-        for o in data
-        if o.get("created_at")
-        and is_in_time_window(datetime.strptime(o["created_at"], "%Y-%m-%d %H:%M:%S"))
-    ]
-
-    # 4) Status filter (if not "all")
-    if status.lower() != "all":
-        data = [o for o in data if str(o.get("status", "")).lower() == status.lower()]
-
-    # 5) Enrich with area, latitude, longitude using cached alias map
-    data = formatAreas(data)
-
-    # 6) Optional filter by area names (case-insensitive)
-    if areas and not any(a.lower() == "all" for a in areas):
-        wanted = {a.strip().lower() for a in areas}
-        data = [
-            o for o in data if o.get("area") and o["area"].strip().lower() in wanted
-        ]
+    data = await getData(start_date, end_date, "all", client)
+
+    # 2) Status and created_at time window in one pass; overnight windows
+    #    (e.g. 22:00–02:00) are not supported by this report
+    data = apply_filters(
+        data,
+        status_filter(status),
+        time_window_filter(start_time, end_time, overnight=False),
+    )
+
+    # 3) Enrich with area, latitude, longitude using cached alias map
+    data = formatAreas(list(data))
+
+    # 4) Optional filter by area names (case-insensitive)
+    data = apply_filters(data, area_filter(areas))
 
-    # 7) Optionally exclude "Unknown" bucket
+    # 5) Optionally exclude "Unknown" bucket
     # if not include_unknown:
     #     data = [o for o in data if o.get("area") and o["area"] != "Unknown"]
 
-    # 8) Build final report (statcards + heatmap + table)
-    result = areaReport(data)
-
-    return result
+    return list(data)
 
 
 @router.get("/task_history")
@@ -214,79 +239,146 @@ async def generate_task_history(
     end_date: str,
     filter_by: Optional[List[str]] = Query(default=None),
     status: str = "all",
+    client: httpx.AsyncClient = Depends(get_http_client),
+    redis: aioredis.Redis = Depends(get_redis),
 ):
 
-    job_id = str(uuid.uuid4())
-
-    data = await getData(start_date, end_date, "all")
-
-    if status != "all":
-        data = [
-            order for order in data if str(order.get("status", "")).lower() == status
-        ]
-
-    # Filter by client name if provided
-    if filter_by and not any(f.lower() == "all" for f in filter_by):
-        data = [
-            order
-            for order in data
-            if any(
-                (order.get("user_name") or "").strip().lower() == f.lower()
-                for f in filter_by
-                if (order.get("user_name") or "").strip()
-            )
-        ]
+    # Identical requests share one job (and skip the fetch while it's retained)
+    job_id = task_history_job_id(start_date, end_date, filter_by, status)
+    summary = await existing_task_history_summary(redis, job_id)
+    if summary is not None:
+        return json_response(
+            {"status": "processing", "job_id": job_id, "summary": summary}
+        )
 
-    # Start background thread to generate table data
-    threading.Thread(target=task_history_table, args=(job_id, data)).start()
+    # Both the table job and the summary read the filtered orders
+    data = list(
+        await _client_orders(start_date, end_date, filter_by, status, client)
+    )
 
-    final_data = task_history(data)
-    return {"status": "processing", "job_id": job_id, "summary": final_data}
+    if config.REPORT_ENGINE == "columnar":
+        final_data = task_history_columns(OrderColumns(data))
+    else:
+        final_data = task_history(data)
+
+    # Build the table on the job engine's process pool
+    try:
+        await start_task_history_table(redis, job_id, data, final_data)
+    except JobQueueFull:
+        raise HTTPException(
+            status_code=status_codes.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many task history jobs pending, retry shortly",
+        )
+    return json_response(
+        {"status": "processing", "job_id": job_id, "summary": final_data}
+    )
 
 
 @router.get("/task_history/{job_id}")
-async def get_task_history_table(job_id: str):
-    # Fetch the precomputed table data from Redis
-    redis_client = redis.Redis(
-        host=os.environ.get("REDIS_HOST"),
-        port=os.environ.get("REDIS_PORT"),
-        decode_responses=True,
-        username="default",
-        password=os.environ.get("REDIS_PASSWORD"),
+async def get_task_history_table(
+    job_id: str,
+    cursor: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1),
+    redis: aioredis.Redis = Depends(get_redis),
+):
+    # Job state, progress and a page of the rows built so far
+    return json_response(
+        await fetch_task_history_table(redis, job_id, cursor, limit)
     )
 
-    table_data = redis_client.get(job_id)
-    if table_data:
-        return {"status": "completed", "table": json.loads(table_data)}
-    else:
-        return {"status": "processing", "table": []}
-
 
 @router.get("/driver_earnings")
 async def generate_driver_earnings(
     start_date: str,
     end_date: str,
     filter_by: Optional[List[str]] = Query(default=None),
+    client: httpx.AsyncClient = Depends(get_http_client),
 ):
-    data = await getData(start_date, end_date, "all")
+    data = await getData(start_date, end_date, "all", client)
 
     # Filter by driver
-    if filter_by and not any(f.lower() == "all" for f in filter_by):
-        data = [
-            order
-            for order in data
-            if any(
-                (
-                    (order.get("pickup_task", {}).get("driver_name") or "")
-                    .strip()
-                    .split(" ")[-1]
-                    .upper()
-                    == f.upper()
-                )
-                for f in filter_by
-                if (order.get("pickup_task", {}).get("driver_name") or "").strip()
-            )
-        ]
+    data = apply_filters(data, driver_filter(filter_by))
 
     result = driverEarnings(data)
-    return result
+    return json_response(result)
+
+
+# ----------------- Streaming exports (CSV / NDJSON) -----------------
+ExportFormat = Literal["csv", "ndjson"]
+
+
+@router.get("/export/driver_report")
+async def export_driver_report(
+    start_date: str,
+    end_date: str,
+    filter_by: Optional[List[str]] = Query(default=None),
+    status: str = "all",
+    fmt: ExportFormat = Query("csv", alias="format"),
+    client: httpx.AsyncClient = Depends(get_http_client),
+):
+    data = await _driver_orders(start_date, end_date, filter_by, status, client)
+    if config.REPORT_ENGINE == "columnar":
+        rows = driverReportColumns(OrderColumns(data))["table_data"]
+    else:
+        rows = driverReport(list(data))["table_data"]
+    return export_response(rows, fmt, f"driver_report_{start_date}_{end_date}")
+
+
+@router.get("/export/client_report")
+async def export_client_report(
+    start_date: str,
+    end_date: str,
+    filter_by: Optional[List[str]] = Query(default=None),
+    status: str = "all",
+    fmt: ExportFormat = Query("csv", alias="format"),
+    client: httpx.AsyncClient = Depends(get_http_client),
+):
+    data = await _client_orders(start_date, end_date, filter_by, status, client)
+    if config.REPORT_ENGINE == "columnar":
+        rows = clientReportColumns(OrderColumns(data))["table"]
+    else:
+        rows = clientReport(list(data))["table"]
+    return export_response(rows, fmt, f"client_report_{start_date}_{end_date}")
+
+
+@router.get("/export/area_report")
+async def export_area_report(
+    start_date: str,
+    end_date: str,
+    start_time: str,
+    end_time: str,
+    areas: Optional[List[str]] = Query(default=None, alias="filter_by"),
+    status: str = "all",
+    fmt: ExportFormat = Query("csv", alias="format"),
+    client: httpx.AsyncClient = Depends(get_http_client),
+):
+    data = await _area_orders(
+        start_date, end_date, start_time, end_time, areas, status, client
+    )
+    if config.REPORT_ENGINE == "columnar":
+        rows = areaReportColumns(OrderColumns(data))["table"]
+    else:
+        rows = areaReport(data)["table"]
+    return export_response(rows, fmt, f"area_report_{start_date}_{end_date}")
+
+
+@router.get("/export/task_history")
+async def export_task_history(
+    start_date: str,
+    end_date: str,
+    filter_by: Optional[List[str]] = Query(default=None),
+    status: str = "all",
+    fmt: ExportFormat = Query("csv", alias="format"),
+    client: httpx.AsyncClient = Depends(get_http_client),
+):
+    # Orders stream from upstream (or the day cache) through the filters and
+    # out as rows; the full order list is never built
+    orders = apply_filters_async(
+        streamClientData(start_date, end_date, filter_by, client),
+        status_filter(status),
+        client_filter(filter_by),
+    )
+    rows = (task_history_row(order) async for order in orders)
+    return await export_response_async(
+        rows, fmt, f"task_history_{start_date}_{end_date}"
+    )
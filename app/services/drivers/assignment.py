@@ -0,0 +1,129 @@
+from typing import List
+
+import numpy as np
+
+# Row -> column assignments; -1 marks a row left unassigned
+
+
+def hungarian(cost: np.ndarray) -> np.ndarray:
+    """
+    Minimum-total-cost assignment for an n x m cost matrix (Hungarian /
+    shortest augmenting path with potentials, O(n^2 m)). Every row gets a
+    column when n <= m; otherwise every column gets a row.
+    """
+    n, m = cost.shape
+    if n > m:
+        by_column = hungarian(cost.T)
+        assignment = np.full(n, -1, dtype=np.int64)
+        assignment[by_column] = np.arange(m)
+        return assignment
+
+    # 1-based rows/columns; column 0 is the virtual start of each augmenting path
+    u = np.zeros(n + 1)
+    v = np.zeros(m + 1)
+    p = np.zeros(m + 1, dtype=np.int64)  # row matched to each column (0 = none)
+    way = np.zeros(m + 1, dtype=np.int64)
+    for i in range(1, n + 1):
+        p[0] = i
+        j0 = 0
+        minv = np.full(m + 1, np.inf)
+        used = np.zeros(m + 1, dtype=bool)
+        while True:
+            used[j0] = True
+            i0 = p[j0]
+            free = ~used[1:]
+            reduced = cost[i0 - 1] - u[i0] - v[1:]
+            better = free & (reduced < minv[1:])
+            minv[1:][better] = reduced[better]
+            way[1:][better] = j0
+
+            candidates = np.where(free, minv[1:], np.inf)
+            j1 = int(np.argmin(candidates)) + 1
+            delta = candidates[j1 - 1]
+
+            tree = np.flatnonzero(used)
+            u[p[tree]] += delta
+            v[tree] -= delta
+            minv[1:][free] -= delta
+            j0 = j1
+            if p[j0] == 0:
+                break
+        # flip the augmenting path back to the start column
+        while j0:
+            j1 = way[j0]
+            p[j0] = p[j1]
+            j0 = j1
+
+    assignment = np.full(n, -1, dtype=np.int64)
+    matched = np.flatnonzero(p[1:])
+    assignment[p[1:][matched] - 1] = matched
+    return assignment
+
+
+def greedy_with_repair(cost: np.ndarray, feasible: np.ndarray) -> np.ndarray:
+    """
+    Cheapest feasible pairs first, then repair: give unassigned rows a column
+    by moving its holder to a free feasible column, and apply pairwise swaps
+    while they lower the total. Near-optimal and much cheaper than hungarian.
+    """
+    n, m = cost.shape
+    assignment = np.full(n, -1, dtype=np.int64)
+    owner = np.full(m, -1, dtype=np.int64)
+
+    rows, cols = np.nonzero(feasible)
+    for k in np.argsort(cost[rows, cols], kind="stable").tolist():
+        i, j = rows[k], cols[k]
+        if assignment[i] < 0 and owner[j] < 0:
+            assignment[i] = j
+            owner[j] = i
+
+    # repair 1: unassigned row takes column j from holder h, h moves to a free column
+    for i in np.flatnonzero(assignment < 0).tolist():
+        free = owner < 0
+        for j in np.flatnonzero(feasible[i])[np.argsort(cost[i, feasible[i]])].tolist():
+            h = owner[j]
+            if h < 0:
+                assignment[i], owner[j] = j, i
+                break
+            options = np.flatnonzero(feasible[h] & free)
+            if len(options):
+                f = options[np.argmin(cost[h, options])]
+                assignment[h], owner[f] = f, h
+                assignment[i], owner[j] = j, i
+                break
+
+    # repair 2: the best pairwise swap between assigned rows while it lowers
+    # the total. Each round is O(n^2), so at most n rounds (O(n^3) in all,
+    # like hungarian); the result stays a valid assignment if the cap is hit.
+    for _ in range(n):
+        rows = np.flatnonzero(assignment >= 0)
+        if len(rows) < 2:
+            break
+        cols = assignment[rows]
+        block = cost[np.ix_(rows, cols)]
+        ok = feasible[np.ix_(rows, cols)]
+        current = np.diag(block)
+        gain = current[:, None] + current[None, :] - block - block.T
+        gain[~(ok & ok.T)] = 0
+        a, b = np.unravel_index(np.argmax(gain), gain.shape)
+        if gain[a, b] <= 1e-9:
+            break
+        ra, rb = rows[a], rows[b]
+        assignment[ra], assignment[rb] = assignment[rb], assignment[ra]
+        owner[assignment[ra]], owner[assignment[rb]] = ra, rb
+    return assignment
+
+
+def nearest_columns(cost: np.ndarray, feasible: np.ndarray, k: int) -> List[int]:
+    """
+    Columns among some row's k cheapest feasible ones. An optimal assignment
+    of k rows only ever uses these, so the matrix can be cut down to them.
+    """
+    masked = np.where(feasible, cost, np.inf)
+    if masked.shape[1] > k:
+        nearest = np.argpartition(masked, k - 1, axis=1)[:, :k]
+    else:
+        nearest = np.broadcast_to(np.arange(masked.shape[1]), masked.shape)
+    keep = np.zeros(masked.shape[1], dtype=bool)
+    keep[nearest[np.take_along_axis(masked, nearest, axis=1) < np.inf]] = True
+    return np.flatnonzero(keep).tolist()
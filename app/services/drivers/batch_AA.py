@@ -0,0 +1,86 @@
+from typing import Any, Dict, List
+
+import numpy as np
+
+from app.services.drivers.assignment import greedy_with_repair, hungarian, nearest_columns
+from app.services.drivers.driver_index import candidate_columns
+from app.services.drivers.geo import get_bounding_box, haversine_np, in_box_np
+
+
+async def auto_allocation_batch(
+    pickups: List[Dict[str, Any]],
+    max_radius: float,
+    method: str = "hungarian",
+) -> Dict[str, Any]:
+    """
+    Assigns a wave of pickups to distinct available drivers within
+    `max_radius` km, minimizing the total distance. One driver read serves
+    the whole wave; pickups with no reachable driver left get None.
+    """
+    pickup_lat = np.array([p["lat"] for p in pickups], dtype=np.float64)
+    pickup_lng = np.array([p["lng"] for p in pickups], dtype=np.float64)
+
+    # One driver snapshot covering every pickup's search box
+    boxes = [get_bounding_box(p["lat"], p["lng"], max_radius) for p in pickups]
+    box = {
+        "min_lat": min(b["min_lat"] for b in boxes),
+        "max_lat": max(b["max_lat"] for b in boxes),
+        "min_lng": min(b["min_lng"] for b in boxes),
+        "max_lng": max(b["max_lng"] for b in boxes),
+    }
+    drivers, lat, lng, available = await candidate_columns(box)
+    candidates = np.flatnonzero(in_box_np(lat, lng, box) & available)
+
+    # N x M distances; only drivers among some pickup's N nearest can be used
+    dist = haversine_np(
+        pickup_lat[:, None],
+        pickup_lng[:, None],
+        lat[candidates][None, :],
+        lng[candidates][None, :],
+    )
+    feasible = dist <= max_radius
+    keep = nearest_columns(dist, feasible, len(pickups))
+    candidates, dist, feasible = candidates[keep], dist[:, keep], feasible[:, keep]
+
+    if method == "hungarian":
+        # out-of-range pairs cost more than any set of feasible ones together
+        out_of_range = max_radius * len(pickups) + 1
+        assignment = hungarian(np.where(feasible, dist, out_of_range))
+        rows = np.flatnonzero(assignment >= 0)
+        assignment[rows[~feasible[rows, assignment[rows]]]] = -1
+    else:
+        assignment = greedy_with_repair(dist, feasible)
+
+    assignments = []
+    total = 0.0
+    for i, j in enumerate(assignment.tolist()):
+        driver = None
+        if j >= 0:
+            k = candidates[j]
+            driver_id, data = drivers[k]
+            d = float(dist[i, j])
+            total += d
+            driver = {
+                "driver_id": driver_id,
+                "name": data.get("name"),
+                "lat": float(lat[k]),
+                "lng": float(lng[k]),
+                "distance_km": round(d, 2),
+            }
+        assignments.append(
+            {
+                "order_id": pickups[i].get("order_id"),
+                "pickup": {"lat": pickups[i]["lat"], "lng": pickups[i]["lng"]},
+                "driver": driver,
+            }
+        )
+
+    assigned = sum(1 for a in assignments if a["driver"] is not None)
+    return {
+        "max_radius_km": max_radius,
+        "method": method,
+        "assigned": assigned,
+        "unassigned": len(assignments) - assigned,
+        "total_distance_km": round(total, 2),
+        "assignments": assignments,
+    }
@@ -1,7 +1,7 @@
 from typing import Dict, Any, List, Tuple
 from fastapi import HTTPException, status
-from app.services.drivers.geo import haversine, get_bounding_box
-from app.utils.firebase_connection import db
+from app.services.drivers.geo import get_bounding_box
+from app.services.drivers.nearby import nearby_drivers
 
 
 def _make_buckets(max_radius: float, increment: float) -> List[Tuple[float, float]]:
@@ -14,15 +14,21 @@ def _make_buckets(max_radius: float, increment: float) -> List[Tuple[float, floa
     return buckets
 
 
-def _bucket_index(distance: float, buckets: List[Tuple[float, float]]) -> int | None:
-    for i, (start, end) in enumerate(buckets):
-        if i < len(buckets) - 1:
-            if start <= distance < end:
-                return i
-        else:
-            if start <= distance <= end:
-                return i
-    return None
+def _bucket_index(
+    distance: float, buckets: List[Tuple[float, float]], increment: float
+) -> int | None:
+    # Buckets are [start, end) except the last, which is [start, end].
+    # Arithmetic guess, then one step either way in case the accumulated
+    # bucket edges drifted from multiples of `increment`.
+    last = len(buckets) - 1
+    if not buckets or distance < 0 or distance > buckets[last][1]:
+        return None
+    i = min(int(distance // increment), last)
+    if distance < buckets[i][0]:
+        i -= 1
+    elif i < last and distance >= buckets[i][1]:
+        i += 1
+    return i
 
 
 def _label(start: float, end: float) -> str:
@@ -30,7 +36,7 @@ def _label(start: float, end: float) -> str:
     return f"{int(start) if start.is_integer() else start}-{int(end) if end.is_integer() else end}"
 
 
-def auto_allocation_batchwise(
+async def auto_allocation_batchwise(
     pickup_lat: float,
     pickup_lng: float,
     max_radius: float,
@@ -53,56 +59,28 @@ def auto_allocation_batchwise(
 
     total = 0
 
-    # Bounding-box prefilter (lat) + manual lng filter
+    # Bounding-box prefilter (live driver index, or Firestore until it has
+    # synced) + distance cutoff
     box = get_bounding_box(pickup_lat, pickup_lng, max_radius)
-    drivers_ref = (
-        db.collection("drivers")
-        .where("lat", ">=", box["min_lat"])  # single range field: lat
-        .where("lat", "<=", box["max_lat"])
-    )
 
-    docs = drivers_ref.stream()
-
-    for doc in docs:
-        data = doc.to_dict() or {}
-        driver_lat = data.get("lat")
-        driver_lng = data.get("lng")
-        if driver_lat is None or driver_lng is None:
-            continue
-
-        if not (box["min_lng"] <= float(driver_lng) <= box["max_lng"]):
-            continue
-
-        d = haversine(float(driver_lat), float(driver_lng), pickup_lat, pickup_lng)
-        if d > max_radius:
-            continue
-
-        idx = _bucket_index(d, buckets)
+    found = await nearby_drivers(pickup_lat, pickup_lng, max_radius, box)
+    for driver_id, data, driver_lat, driver_lng, d in found:
+        idx = _bucket_index(d, buckets, increment)
         if idx is None:
             continue
 
-        if data.get("duty_state") == "OFF_DUTY":
-            continue
-
-        if data.get("havingtask") == True:
-            continue
-
-        if data.get("isOnline") == False:
-            continue    
-
         lbl = labels[idx]
         groups_map[lbl].append(
             {
-                "driver_id": doc.id,
+                "driver_id": driver_id,
                 "name": data.get("name"),
-                "lat": float(driver_lat),
-                "lng": float(driver_lng),
+                "lat": driver_lat,
+                "lng": driver_lng,
                 "distance_km": round(d, 2),
             }
         )
         total += 1
 
-
     # Sort each bucket by distance
     for lst in groups_map.values():
         lst.sort(key=lambda x: x["distance_km"])
@@ -0,0 +1,99 @@
+import asyncio
+from typing import Any, Dict, List, Tuple
+
+from app import config
+from app.services.drivers import geohash
+from app.utils.firebase_connection import async_db
+
+# Fields the allocation services read from a driver document
+DRIVER_FIELDS = ("name", "lat", "lng", "duty_state", "havingtask", "isOnline")
+GEOHASH_PRECISION = 9
+
+# Values that keep a driver available when the field is missing, written by
+# the backfill so server-side equality filters match the Python checks
+AVAILABILITY_DEFAULTS = {"havingtask": False, "isOnline": True}
+
+
+def location_fields(lat: float, lng: float) -> Dict[str, Any]:
+    """lat/lng plus the geohash that the prefix queries range over."""
+    return {
+        "lat": lat,
+        "lng": lng,
+        "geohash": geohash.encode(lat, lng, GEOHASH_PRECISION),
+    }
+
+
+async def write_driver_location(driver_id: str, lat: float, lng: float, **fields):
+    """Update a driver's position (and any other fields) keeping geohash in sync."""
+    await async_db.collection("drivers").document(driver_id).set(
+        {**fields, **location_fields(lat, lng)}, merge=True
+    )
+
+
+async def backfill_driver_geohashes(batch_size: int = 500) -> int:
+    """
+    One-off migration: add geohash and the availability defaults to every
+    driver document that lacks them. Returns the number of documents updated.
+    """
+    updated = 0
+    batch = async_db.batch()
+    pending = 0
+    async for doc in async_db.collection("drivers").stream():
+        data = doc.to_dict() or {}
+        changes = {k: v for k, v in AVAILABILITY_DEFAULTS.items() if k not in data}
+        try:
+            fields = location_fields(float(data["lat"]), float(data["lng"]))
+            if data.get("geohash") != fields["geohash"]:
+                changes["geohash"] = fields["geohash"]
+        except (KeyError, TypeError, ValueError):
+            pass
+        if not changes:
+            continue
+        batch.set(doc.reference, changes, merge=True)
+        pending += 1
+        updated += 1
+        if pending == batch_size:
+            await batch.commit()
+            batch = async_db.batch()
+            pending = 0
+    if pending:
+        await batch.commit()
+    return updated
+
+
+async def query_drivers_near(box: Dict[str, float]) -> List[Tuple[str, Dict[str, Any]]]:
+    """
+    (driver_id, data) for online drivers without a task whose geohash falls in
+    the cells covering `box`: a few concurrent prefix range queries, projected
+    to DRIVER_FIELDS. Needs the composite index (isOnline, havingtask, geohash).
+    """
+    prefixes = geohash.covering_prefixes(box, config.DRIVER_GEOHASH_MAX_QUERIES)
+
+    async def prefix_query(prefix):
+        query = (
+            async_db.collection("drivers")
+            .where("isOnline", "==", True)
+            .where("havingtask", "==", False)
+            .where("geohash", ">=", prefix)
+            .where("geohash", "<=", prefix + "~")
+            .select(DRIVER_FIELDS)
+        )
+        return [(doc.id, doc.to_dict() or {}) async for doc in query.stream()]
+
+    results = await asyncio.gather(*(prefix_query(p) for p in prefixes))
+    found = [
+        (driver_id, data)
+        for drivers in results
+        for driver_id, data in drivers
+        if _in_lat_band(data, box)
+    ]
+    # same order as the lat-range query it replaces
+    found.sort(key=lambda item: (float(item[1]["lat"]), item[0]))
+    return found
+
+
+def _in_lat_band(data: Dict[str, Any], box: Dict[str, float]) -> bool:
+    try:
+        return box["min_lat"] <= float(data.get("lat")) <= box["max_lat"]
+    except (TypeError, ValueError):
+        return False
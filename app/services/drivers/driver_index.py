@@ -0,0 +1,264 @@
+import asyncio
+import logging
+import math
+import threading
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+from app import config
+from app.services.drivers.driver_docs import DRIVER_FIELDS, query_drivers_near
+from app.services.drivers.geo import in_box_np
+from app.utils.firebase_connection import async_db, db
+
+logger = logging.getLogger(__name__)
+
+
+def is_available(data: Dict[str, Any]) -> bool:
+    return not (
+        data.get("duty_state") == "OFF_DUTY"
+        or data.get("havingtask") == True
+        or data.get("isOnline") == False
+    )
+
+
+class DriverIndex:
+    """
+    In-memory grid of driver positions and availability flags, keyed by
+    (lat, lng) cells of `cell_deg` degrees. Kept current by a Firestore
+    on_snapshot listener; `ready` once the current listener's initial
+    snapshot has arrived, and cleared again when that listener stops.
+
+    Alongside the grid every driver owns a slot in lat/lng/available
+    arrays, updated in place, for the vectorized allocation kernel.
+    """
+
+    def __init__(self, cell_deg: float, capacity: int = 1024):
+        self.cell_deg = cell_deg
+        self.ready = False
+        # bumped by listen(); snapshots from an older listener are ignored
+        self._generation = 0
+        self._reset(capacity)
+        # snapshot callbacks run on the listener's thread
+        self._lock = threading.Lock()
+
+    def _reset(self, capacity: int) -> None:
+        self._drivers: Dict[str, Dict[str, Any]] = {}
+        self._cell_of: Dict[str, Tuple[int, int]] = {}
+        self._cells: Dict[Tuple[int, int], set] = {}
+        # column slots; a free slot has NaN coordinates and is never selected
+        self._slot_of: Dict[str, int] = {}
+        self._slot_ids: List[str] = [None] * capacity
+        self._free = list(range(capacity - 1, -1, -1))
+        self._lat = np.full(capacity, np.nan)
+        self._lng = np.full(capacity, np.nan)
+        self._available = np.zeros(capacity, dtype=bool)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._reset(len(self._slot_ids))
+
+    def _cell(self, lat: float, lng: float) -> Tuple[int, int]:
+        return math.floor(lat / self.cell_deg), math.floor(lng / self.cell_deg)
+
+    def upsert(self, driver_id: str, data: Dict[str, Any]) -> None:
+        record = {field: data.get(field) for field in DRIVER_FIELDS}
+        try:
+            record["lat"] = float(record["lat"])
+            record["lng"] = float(record["lng"])
+        except (TypeError, ValueError):
+            # without a position the driver can't be a candidate
+            self.remove(driver_id)
+            return
+
+        cell = self._cell(record["lat"], record["lng"])
+        with self._lock:
+            old = self._cell_of.get(driver_id)
+            if old != cell:
+                if old is not None:
+                    self._discard(driver_id, old)
+                self._cells.setdefault(cell, set()).add(driver_id)
+                self._cell_of[driver_id] = cell
+            self._drivers[driver_id] = record
+
+            slot = self._slot_of.get(driver_id)
+            if slot is None:
+                slot = self._slot_of[driver_id] = self._take_slot()
+                self._slot_ids[slot] = driver_id
+            self._lat[slot] = record["lat"]
+            self._lng[slot] = record["lng"]
+            self._available[slot] = is_available(record)
+
+    def update(self, driver_id: str, fields: Dict[str, Any]) -> None:
+        """Merge a partial update (e.g. a location ping) into the driver's record."""
+        self.upsert(driver_id, {**self._drivers.get(driver_id, {}), **fields})
+
+    def remove(self, driver_id: str) -> None:
+        with self._lock:
+            cell = self._cell_of.pop(driver_id, None)
+            if cell is not None:
+                self._discard(driver_id, cell)
+            self._drivers.pop(driver_id, None)
+
+            slot = self._slot_of.pop(driver_id, None)
+            if slot is not None:
+                self._slot_ids[slot] = None
+                self._lat[slot] = self._lng[slot] = np.nan
+                self._available[slot] = False
+                self._free.append(slot)
+
+    def _take_slot(self) -> int:
+        if not self._free:
+            # double the columns; new slots are handed out lowest first
+            size = len(self._slot_ids)
+            self._slot_ids.extend([None] * size)
+            self._free = list(range(2 * size - 1, size - 1, -1))
+            self._lat = np.concatenate([self._lat, np.full(size, np.nan)])
+            self._lng = np.concatenate([self._lng, np.full(size, np.nan)])
+            self._available = np.concatenate([self._available, np.zeros(size, bool)])
+        return self._free.pop()
+
+    def _discard(self, driver_id: str, cell: Tuple[int, int]) -> None:
+        ids = self._cells.get(cell)
+        if ids is not None:
+            ids.discard(driver_id)
+            if not ids:
+                del self._cells[cell]
+
+    def query(self, box: Dict[str, float]) -> List[Tuple[str, Dict[str, Any]]]:
+        """
+        (driver_id, record) for drivers in the cells overlapping `box`,
+        ordered by (lat, driver_id) like the Firestore lat-range query.
+        """
+        lat0, lng0 = self._cell(box["min_lat"], box["min_lng"])
+        lat1, lng1 = self._cell(box["max_lat"], box["max_lng"])
+        with self._lock:
+            found = [
+                (driver_id, self._drivers[driver_id])
+                for i in range(lat0, lat1 + 1)
+                for j in range(lng0, lng1 + 1)
+                for driver_id in self._cells.get((i, j), ())
+            ]
+        found.sort(key=lambda item: (item[1]["lat"], item[0]))
+        return found
+
+    def query_columns(self, box: Dict[str, float]):
+        """
+        Available drivers inside `box` as ((driver_id, record) list, lat, lng),
+        selected with array masks and ordered like query().
+        """
+        with self._lock:
+            idx = np.flatnonzero(in_box_np(self._lat, self._lng, box) & self._available)
+            found = [
+                (self._slot_ids[i], self._drivers[self._slot_ids[i]])
+                for i in idx.tolist()
+            ]
+            lat, lng = self._lat[idx], self._lng[idx]
+        lats = lat.tolist()
+        order = sorted(range(len(found)), key=lambda k: (lats[k], found[k][0]))
+        return [found[k] for k in order], lat[order], lng[order]
+
+    def __len__(self) -> int:
+        return len(self._drivers)
+
+    # ----------------- Firestore listener -----------------
+    def on_snapshot(self, snapshot, changes, read_time, generation=None) -> None:
+        if generation is not None and generation != self._generation:
+            return
+        for change in changes:
+            if change.type.name == "REMOVED":
+                self.remove(change.document.id)
+            else:
+                self.upsert(change.document.id, change.document.to_dict() or {})
+        self.ready = True
+
+    def listen(self):
+        """
+        Subscribe to the drivers collection; returns the Watch to unsubscribe.
+        Starts from an empty, not-ready index: the new listener's initial
+        snapshot is the full collection, and drivers deleted while no
+        listener ran must not linger.
+        """
+        self.ready = False
+        self._generation += 1
+        generation = self._generation
+        self.clear()
+        return db.collection("drivers").on_snapshot(
+            lambda snapshot, changes, read_time: self.on_snapshot(
+                snapshot, changes, read_time, generation
+            )
+        )
+
+    async def keep_listening(self, interval: float = None) -> None:
+        """
+        Run listen() and replace the listener whenever it stops. A Watch has
+        no error callback: when its stream fails it just shuts down, so it is
+        checked every `interval` seconds. Until a replacement has synced the
+        index is not ready and candidate_drivers queries Firestore instead.
+        Runs until cancelled (app shutdown), then unsubscribes.
+        """
+        interval = interval or config.DRIVER_INDEX_CHECK_SECONDS
+        watch = None
+        try:
+            while True:
+                if watch is None or not watch.is_active:
+                    self.ready = False
+                    if watch is not None:
+                        logger.warning("drivers listener stopped, resubscribing")
+                        watch.unsubscribe()
+                        watch = None
+                    try:
+                        watch = self.listen()
+                    except Exception:
+                        logger.exception("drivers listener failed to start")
+                await asyncio.sleep(interval)
+        finally:
+            if watch is not None:
+                watch.unsubscribe()
+
+
+driver_index = DriverIndex(cell_deg=config.DRIVER_INDEX_CELL_DEG)
+
+
+async def candidate_drivers(
+    box: Dict[str, float],
+) -> List[Tuple[str, Dict[str, Any]]]:
+    """
+    (driver_id, data) for drivers that may lie inside `box`: from the live
+    index once it has synced, otherwise async Firestore queries (geohash
+    prefixes, or the original lat band when DRIVER_GEOHASH_QUERIES is off).
+    """
+    if driver_index.ready:
+        return driver_index.query(box)
+    if config.DRIVER_GEOHASH_QUERIES:
+        return await query_drivers_near(box)
+
+    query = (
+        async_db.collection("drivers")
+        .where("lat", ">=", box["min_lat"])  # single range field: lat
+        .where("lat", "<=", box["max_lat"])
+    )
+    return [(doc.id, doc.to_dict() or {}) async for doc in query.stream()]
+
+
+async def candidate_columns(box: Dict[str, float]):
+    """
+    candidate_drivers() as ((driver_id, data) list, lat, lng, available)
+    arrays for the vectorized kernel. The live index keeps these columns up
+    to date, so only the Firestore fallback converts documents here.
+    """
+    if driver_index.ready:
+        drivers, lat, lng = driver_index.query_columns(box)
+        return drivers, lat, lng, np.ones(len(drivers), dtype=bool)
+
+    drivers = await candidate_drivers(box)
+    lat = np.array([_coord(data.get("lat")) for _, data in drivers], dtype=np.float64)
+    lng = np.array([_coord(data.get("lng")) for _, data in drivers], dtype=np.float64)
+    available = np.fromiter(
+        (is_available(data) for _, data in drivers), dtype=bool, count=len(drivers)
+    )
+    return drivers, lat, lng, available
+
+
+def _coord(value):
+    return np.nan if value is None else float(value)
@@ -1,5 +1,7 @@
 import math
 
+import numpy as np
+
 def haversine(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
     """Distance in kilometers between two lat/lng points."""
     R = 6371.0
@@ -20,3 +22,25 @@ def get_bounding_box(lat: float, lng: float, radius_km: float):
         "min_lng": lng - lng_delta,
         "max_lng": lng + lng_delta,
     }
+
+
+# ----------------- Vectorized (NumPy) counterparts -----------------
+def haversine_np(lat1, lng1, lat2, lng2):
+    """haversine over arrays (broadcasting); NaN in, NaN out."""
+    R = 6371.0
+    phi1, phi2 = np.radians(lat1), np.radians(lat2)
+    d_phi = np.radians(np.subtract(lat2, lat1))
+    d_lambda = np.radians(np.subtract(lng2, lng1))
+    a = np.sin(d_phi / 2) ** 2 + np.cos(phi1) * np.cos(phi2) * np.sin(d_lambda / 2) ** 2
+    c = 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+    return R * c
+
+
+def in_box_np(lat, lng, box):
+    """Mask of points inside a get_bounding_box() box (False for NaN)."""
+    return (
+        (lat >= box["min_lat"])
+        & (lat <= box["max_lat"])
+        & (lng >= box["min_lng"])
+        & (lng <= box["max_lng"])
+    )
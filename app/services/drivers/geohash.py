@@ -0,0 +1,69 @@
+import math
+from typing import Dict, List
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+def encode(lat: float, lng: float, precision: int = 9) -> str:
+    """Standard geohash of (lat, lng) with `precision` characters."""
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    value = 0
+    even = True  # even bits refine longitude
+    while len(chars) < precision:
+        rng, x = (lng_range, lng) if even else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2
+        value <<= 1
+        if x >= mid:
+            value |= 1
+            rng[0] = mid
+        else:
+            rng[1] = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(_BASE32[value])
+            bits = 0
+            value = 0
+    return "".join(chars)
+
+
+def cell_size(precision: int):
+    """(lat degrees, lng degrees) spanned by one cell at `precision`."""
+    lat_bits = (5 * precision) // 2
+    lng_bits = 5 * precision - lat_bits
+    return 180.0 / (1 << lat_bits), 360.0 / (1 << lng_bits)
+
+
+def covering_cells(box: Dict[str, float], precision: int) -> List[str]:
+    """Geohash cells at `precision` that together cover a bounding box."""
+    lat_step, lng_step = cell_size(precision)
+    lat0 = math.floor((box["min_lat"] + 90) / lat_step)
+    lat1 = math.floor((box["max_lat"] + 90) / lat_step)
+    lng0 = math.floor((box["min_lng"] + 180) / lng_step)
+    lng1 = math.floor((box["max_lng"] + 180) / lng_step)
+    return sorted(
+        {
+            # encode each cell by its center
+            encode(
+                (i + 0.5) * lat_step - 90,
+                (j + 0.5) * lng_step - 180,
+                precision,
+            )
+            for i in range(lat0, lat1 + 1)
+            for j in range(lng0, lng1 + 1)
+        }
+    )
+
+
+def covering_prefixes(box: Dict[str, float], max_cells: int, max_precision: int = 9):
+    """The finest covering of `box` that needs at most `max_cells` prefixes."""
+    best = covering_cells(box, 1)
+    for precision in range(2, max_precision + 1):
+        cells = covering_cells(box, precision)
+        if len(cells) > max_cells:
+            break
+        best = cells
+    return best
@@ -0,0 +1,101 @@
+import asyncio
+import logging
+from typing import Any, Dict, Iterable, Tuple
+
+from app import config
+from app.services.drivers.driver_docs import location_fields
+from app.services.drivers.driver_index import driver_index
+from app.utils.firebase_connection import async_db
+
+logger = logging.getLogger(__name__)
+
+# Firestore caps a batched write at 500 operations
+MAX_BATCH_WRITES = 500
+
+
+class LocationWriter:
+    """
+    Write-behind buffer for driver position/status pings. Updates go to the
+    in-memory driver index at once; Firestore only sees the latest fields per
+    driver, flushed as batched merge-writes every `interval` seconds. (With
+    the listener on, a flush's echo can briefly show a driver's previous
+    position until the next flush.)
+    """
+
+    def __init__(
+        self,
+        interval: float,
+        batch_size: int = MAX_BATCH_WRITES,
+        shutdown_timeout: float = 10.0,
+    ):
+        self.interval = interval
+        self.shutdown_timeout = shutdown_timeout
+        self.batch_size = min(batch_size, MAX_BATCH_WRITES)
+        # driver_id -> fields not yet written; later pings overwrite earlier ones
+        self._pending: Dict[str, Dict[str, Any]] = {}
+
+    def submit(self, updates: Iterable[Tuple[str, Dict[str, Any]]]) -> int:
+        """Apply (driver_id, fields) updates to the index and queue them."""
+        count = 0
+        for driver_id, fields in updates:
+            if "lat" in fields and "lng" in fields:
+                fields = {**fields, **location_fields(fields["lat"], fields["lng"])}
+            driver_index.update(driver_id, fields)
+            self._pending.setdefault(driver_id, {}).update(fields)
+            count += 1
+        return count
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    async def flush(self) -> int:
+        """Write everything queued so far; returns the number of drivers written."""
+        if not self._pending:
+            return 0
+        pending, self._pending = self._pending, {}
+        items = list(pending.items())
+        drivers = async_db.collection("drivers")
+        written = 0
+        try:
+            for start in range(0, len(items), self.batch_size):
+                batch = async_db.batch()
+                for driver_id, fields in items[start:start + self.batch_size]:
+                    batch.set(drivers.document(driver_id), fields, merge=True)
+                await batch.commit()
+                written = start + self.batch_size
+        except BaseException:
+            # requeue what didn't make it (also when cancelled, e.g. by the
+            # shutdown timeout), under any newer pings that arrived
+            for driver_id, fields in items[written:]:
+                self._pending[driver_id] = {**fields, **self._pending.get(driver_id, {})}
+            raise
+        return len(items)
+
+    async def run(self) -> None:
+        """
+        Flush every `interval` seconds until cancelled, then flush once more
+        (at most `shutdown_timeout` seconds; a failure there is logged).
+        """
+        try:
+            while True:
+                await asyncio.sleep(self.interval)
+                try:
+                    await self.flush()
+                except Exception:
+                    logger.exception("driver location flush failed; will retry")
+        finally:
+            try:
+                await asyncio.wait_for(self.flush(), self.shutdown_timeout)
+            except Exception:
+                logger.exception(
+                    "final driver location flush failed; %d drivers not written",
+                    self.pending,
+                )
+
+
+location_writer = LocationWriter(
+    interval=config.DRIVER_LOCATION_FLUSH_SECONDS,
+    batch_size=config.DRIVER_LOCATION_BATCH_SIZE,
+    shutdown_timeout=config.DRIVER_LOCATION_SHUTDOWN_TIMEOUT,
+)
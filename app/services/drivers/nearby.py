@@ -0,0 +1,83 @@
+from typing import Any, Dict, Iterable, List, Tuple
+
+import numpy as np
+
+from app import config
+from app.services.drivers.driver_index import (
+    candidate_columns,
+    candidate_drivers,
+    is_available,
+)
+from app.services.drivers.geo import haversine, haversine_np, in_box_np
+
+# (driver_id, data, lat, lng, distance_km)
+Nearby = Tuple[str, Dict[str, Any], float, float, float]
+
+
+async def nearby_drivers(
+    pickup_lat: float,
+    pickup_lng: float,
+    max_radius: float,
+    box: Dict[str, float],
+) -> List[Nearby]:
+    """
+    Available drivers within `max_radius` km of the pickup, in candidate
+    order. DRIVER_DISTANCE_KERNEL picks the NumPy kernel or the scalar loop.
+    """
+    if config.DRIVER_DISTANCE_KERNEL == "numpy":
+        drivers, lat, lng, available = await candidate_columns(box)
+        return _nearby_numpy(
+            drivers, lat, lng, available, pickup_lat, pickup_lng, max_radius, box
+        )
+    drivers = await candidate_drivers(box)
+    return _nearby_scalar(drivers, pickup_lat, pickup_lng, max_radius, box)
+
+
+def _nearby_scalar(
+    drivers: Iterable[Tuple[str, Dict[str, Any]]],
+    pickup_lat: float,
+    pickup_lng: float,
+    max_radius: float,
+    box: Dict[str, float],
+) -> List[Nearby]:
+    found = []
+    for driver_id, data in drivers:
+        driver_lat = data.get("lat")
+        driver_lng = data.get("lng")
+        if driver_lat is None or driver_lng is None:
+            continue
+
+        # cheap longitude pre-filter
+        if not (box["min_lng"] <= float(driver_lng) <= box["max_lng"]):
+            continue
+
+        if not is_available(data):
+            continue
+
+        d = haversine(float(driver_lat), float(driver_lng), pickup_lat, pickup_lng)
+        if d <= max_radius:
+            found.append((driver_id, data, float(driver_lat), float(driver_lng), d))
+    return found
+
+
+def _nearby_numpy(
+    drivers: List[Tuple[str, Dict[str, Any]]],
+    lat: np.ndarray,
+    lng: np.ndarray,
+    available: np.ndarray,
+    pickup_lat: float,
+    pickup_lng: float,
+    max_radius: float,
+    box: Dict[str, float],
+) -> List[Nearby]:
+    # box + availability masks first, distances only for the survivors
+    idx = np.flatnonzero(in_box_np(lat, lng, box) & available)
+    d = haversine_np(lat[idx], lng[idx], pickup_lat, pickup_lng)
+    keep = d <= max_radius
+    idx, d = idx[keep], d[keep]
+    return [
+        (drivers[i][0], drivers[i][1], driver_lat, driver_lng, dist)
+        for i, driver_lat, driver_lng, dist in zip(
+            idx.tolist(), lat[idx].tolist(), lng[idx].tolist(), d.tolist()
+        )
+    ]
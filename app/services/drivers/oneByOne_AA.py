@@ -1,62 +1,68 @@
-from typing import Dict, Any, List
-from app.services.drivers.geo import haversine, get_bounding_box
-from app.utils.firebase_connection import db
+import heapq
+from typing import Dict, Any, List, Optional
+from app import config
+from app.services.drivers.driver_index import driver_index
+from app.services.drivers.geo import get_bounding_box
+from app.services.drivers.nearby import nearby_drivers
 
 
-def auto_allocation_one_by_one(
+async def auto_allocation_one_by_one(
     pickup_lat: float,
     pickup_lng: float,
     max_radius: float,
+    k: Optional[int] = None,
 ) -> Dict[str, Any]:
     """
-    Returns a flat, distance-sorted list of drivers within `max_radius` km.
+    Returns a flat, distance-sorted list of drivers within `max_radius` km,
+    or only the `k` nearest of them when k is given.
     """
-    box = get_bounding_box(pickup_lat, pickup_lng, max_radius)
+    async def within(radius):
+        box = get_bounding_box(pickup_lat, pickup_lng, radius)
+        return await nearby_drivers(pickup_lat, pickup_lng, radius, box)
 
-    drivers_ref = (
-        db.collection("drivers")
-        .where("lat", ">=", box["min_lat"]) 
-        .where("lat", "<=", box["max_lat"])
-    )
+    if k is None:
+        radius = max_radius
+        found = await within(radius)
+    else:
+        # Expanding rings: stop at the first radius holding k available drivers.
+        # Anyone outside that radius is farther than all of them.
+        if driver_index.ready:
+            ring = within
+        else:
+            # every ring would be another Firestore query: fetch max_radius
+            # once and grow the rings over that snapshot instead
+            snapshot = await within(max_radius)
 
-    docs = drivers_ref.stream()
-    driver_summaries: List[Dict[str, Any]] = []
+            async def ring(radius):
+                return [driver for driver in snapshot if driver[4] <= radius]
 
-    for doc in docs:
-        data = doc.to_dict() or {}
-        driver_lat = data.get("lat")
-        driver_lng = data.get("lng")
-        if driver_lat is None or driver_lng is None:
-            continue
+        radius = min(config.DRIVER_SEARCH_START_KM, max_radius)
+        while True:
+            found = await ring(radius)
+            if len(found) >= k or radius >= max_radius:
+                break
+            radius = min(radius * 2, max_radius)
+        # bounded heap instead of sorting every driver in the ring
+        found = heapq.nsmallest(k, found, key=lambda x: x[4])
 
-        # cheap longitude pre-filter
-        if not (box["min_lng"] <= float(driver_lng) <= box["max_lng"]):
-            continue
-
-        if data.get("duty_state") == "OFF_DUTY":
-            continue
-
-        if data.get("havingtask") == True:
-            continue
-
-        if data.get("isOnline") == False:
-            continue    
-
-        d = haversine(float(driver_lat), float(driver_lng), pickup_lat, pickup_lng)
-        if d <= max_radius:
-            driver_summaries.append(
-                {
-                    "driver_id": doc.id,
-                    "name": data.get("name"),
-                    "lat": float(driver_lat),
-                    "lng": float(driver_lng),
-                    "distance_km": round(d, 2),
-                }
-            )
+    driver_summaries: List[Dict[str, Any]] = [
+        {
+            "driver_id": driver_id,
+            "name": data.get("name"),
+            "lat": driver_lat,
+            "lng": driver_lng,
+            "distance_km": round(d, 2),
+        }
+        for driver_id, data, driver_lat, driver_lng, d in found
+    ]
 
     driver_summaries.sort(key=lambda x: x["distance_km"])
-    return {
+    result = {
         "pickup": {"lat": pickup_lat, "lng": pickup_lng},
         "max_radius_km": max_radius,
         "driver_summaries": driver_summaries,
     }
+    if k is not None:
+        result["k"] = k
+        result["search_radius_km"] = radius
+    return result
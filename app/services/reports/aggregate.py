@@ -0,0 +1,233 @@
+import heapq
+
+from app.utils.order_store import group_mean, group_percentiles
+from app.utils.stats import RunningStats
+from app.utils.timestamps import minutes_between, order_times
+
+# Durations that also report p50/p90/p99: table column -> name in "P90 <name> (min)"
+PERCENTILES = (50, 90, 99)
+PERCENTILE_COLUMNS = {
+    "Average Delivery Time (min)": "Delivery Time",
+    "Avg Pickup Waiting (min)": "Pickup Waiting",
+    "Avg Dropoff Waiting (min)": "Dropoff Waiting",
+}
+
+
+# Table columns -> (start, end) timestamps of the averaged duration. The
+# driver report measures delivery from assignment instead of creation.
+DURATION_COLUMNS = {
+    "Average Delivery Time (min)": ("created_at", "delivery_success"),
+    "Avg Time to Assign (min)": ("created_at", "pickup_assigned"),
+    "Avg Pickup Waiting (min)": ("pickup_arrived", "pickup_success"),
+    "Avg Travel to Customer (min)": ("delivery_started", "delivery_arrived"),
+    "Avg Dropoff Waiting (min)": ("delivery_arrived", "delivery_success"),
+}
+
+
+def percentile_key(name, p):
+    return f"P{p} {name} (min)"
+
+
+# ----------------- Per-order value helpers -----------------
+def amount(order, times):
+    """abs(amount); 0 when missing or not a number."""
+    try:
+        return abs(float(order.get("amount", 0)))
+    except (TypeError, ValueError):
+        return 0
+
+
+def amount_rounded(order, times):
+    return round(amount(order, times), 2)
+
+
+# ----------------- Metric definitions -----------------
+class Count:
+    def init(self):
+        return [0]
+
+    def update(self, state, order, times):
+        state[0] += 1
+
+    def result(self, state):
+        return state[0]
+
+
+class Sum:
+    """Sum of value(order, times) over the group."""
+
+    def __init__(self, value):
+        self.value = value
+
+    def init(self):
+        return [0]
+
+    def update(self, state, order, times):
+        state[0] += self.value(order, times)
+
+    def result(self, state):
+        return state[0]
+
+
+class Duration:
+    """
+    Minutes between two order timestamps, skipped when either is missing.
+    Accumulated in a constant-memory RunningStats (with a percentile sketch
+    when `quantiles` is set).
+    """
+
+    def __init__(self, start, end, quantiles=False):
+        self.start = start
+        self.end = end
+        self.quantiles = quantiles
+
+    def init(self):
+        return RunningStats(quantiles=self.quantiles)
+
+    def update(self, state, order, times):
+        minutes = minutes_between(times, self.start, self.end)
+        if minutes is not None:
+            state.add(minutes)
+
+    def result(self, state):
+        return state
+
+
+class TopK:
+    """The k most frequent key(order) values as (value, count) pairs."""
+
+    def __init__(self, key, k):
+        self.key = key
+        self.k = k
+
+    def init(self):
+        return {}
+
+    def update(self, state, order, times):
+        value = self.key(order)
+        state[value] = state.get(value, 0) + 1
+
+    def result(self, state):
+        return heapq.nlargest(self.k, state.items(), key=lambda kv: kv[1])
+
+
+class First:
+    """First value(order) that is not None."""
+
+    def __init__(self, value):
+        self.value = value
+
+    def init(self):
+        return [None]
+
+    def update(self, state, order, times):
+        if state[0] is None:
+            state[0] = self.value(order)
+
+    def result(self, state):
+        return state[0]
+
+
+# ----------------- Duration table columns -----------------
+# Both engines produce ({column: per-group means}, {percentile key: per-group
+# values}), and duration_cells turns group i of those into table cells, so
+# the reports share one set of duration and percentile columns.
+def duration_metrics(columns):
+    """Duration metrics for `columns`, sketched where percentiles are reported."""
+    return {
+        col: Duration(*span, quantiles=col in PERCENTILE_COLUMNS)
+        for col, span in columns.items()
+    }
+
+
+def duration_results(groups, columns, empty=None):
+    """Per-group means and percentiles from duration_metrics results."""
+    durations = {col: [g[col].mean(empty=empty) for g in groups] for col in columns}
+    percentiles = {
+        percentile_key(PERCENTILE_COLUMNS[col], p): [
+            g[col].quantile(p / 100) for g in groups
+        ]
+        for col in columns
+        if col in PERCENTILE_COLUMNS
+        for p in PERCENTILES
+    }
+    return durations, percentiles
+
+
+def group_durations(cols, codes, ngroups, columns, empty=None):
+    """duration_results computed column-wise over an OrderColumns batch."""
+    durations = {}
+    percentiles = {}
+    for col, (start, end) in columns.items():
+        values, mask = cols.minutes(start, end)
+        durations[col] = group_mean(codes, values, ngroups, mask, empty=empty)
+        if col in PERCENTILE_COLUMNS:
+            by_p = group_percentiles(codes, values, ngroups, mask, PERCENTILES)
+            for p in PERCENTILES:
+                percentiles[percentile_key(PERCENTILE_COLUMNS[col], p)] = by_p[p]
+    return durations, percentiles
+
+
+def duration_cells(durations, percentiles, i):
+    """Group i's duration and percentile table cells, in column order."""
+    cells = {col: means[i] for col, means in durations.items()}
+    cells.update((key, values[i]) for key, values in percentiles.items())
+    return cells
+
+
+# ----------------- Engine -----------------
+# Returned by a grouping key to leave the order out of that grouping
+SKIP = object()
+
+
+class Grouping:
+    """
+    key(order) -> group label (or SKIP); metrics maps output names to
+    metric definitions evaluated per group.
+    """
+
+    def __init__(self, key, metrics):
+        self.key = key
+        self.metrics = metrics
+
+
+def aggregate(data, groupings):
+    """
+    One pass over `data` for all groupings. Returns
+    {grouping name: {group label: {metric name: result}}} with groups in
+    first-seen order. Timestamps come from the cached order_times.
+    """
+    states = {name: {} for name in groupings}
+    plans = [
+        (states[name], g.key, list(g.metrics.items())) for name, g in groupings.items()
+    ]
+
+    for order in data:
+        times = order_times(order)
+        for groups, key, metrics in plans:
+            label = key(order)
+            if label is SKIP:
+                continue
+            group = groups.get(label)
+            if group is None:
+                group = groups[label] = [metric.init() for _, metric in metrics]
+            for (_, metric), state in zip(metrics, group):
+                metric.update(state, order, times)
+
+    return {
+        name: {
+            label: {
+                metric_name: metric.result(state)
+                for (metric_name, metric), state in zip(
+                    groupings[name].metrics.items(), group
+                )
+            }
+            for label, group in states[name].items()
+        }
+        for name in groupings
+    }
+
+
+def everything(order):
+    """Grouping key that puts every order into one "all" group."""
+    return "all"
@@ -1,195 +1,237 @@
-from collections import defaultdict
-from datetime import datetime
-import json
-import os
 import heapq
 
-AREAS_JSON = os.getenv("AREAS_JSON_PATH")
+import numpy as np
+
+from app.services.reports.aggregate import (
+    DURATION_COLUMNS,
+    PERCENTILES,
+    Count,
+    First,
+    Grouping,
+    Sum,
+    TopK,
+    aggregate,
+    amount_rounded,
+    duration_cells,
+    duration_metrics,
+    duration_results,
+    group_durations,
+)
+from app.utils.area_matcher import UNKNOWN_AREA, get_area_matcher, get_centroid_index
+from app.utils.order_store import (
+    first_index,
+    float_column,
+    group_count,
+    group_percentiles,
+    group_sum,
+    ordered_sum,
+    recode,
+    top_pairs,
+)
+from app.utils.stats import RunningStats
+
 
 def formatAreas(data):
-    # Load JSON data from file
-    with open(AREAS_JSON, "r", encoding="utf-8") as file:
-        areas_data = json.load(file)
-
-    # Build a mapping of each alias → (canonical name, lat, lon)
-    area_alias_map = {}
-    for item in areas_data:
-        if "neighborhoodenglish" in item:
-            aliases = [
-                alias.strip() for alias in item["neighborhoodenglish"].split(",")
-            ]
-            if aliases:
-                canonical = aliases[0]  # first alias as canonical
-                lat = item.get("centroid_y")  # latitude
-                lon = item.get("centroid_x")  # longitude
-                for alias in aliases:
-                    area_alias_map[alias.lower()] = (canonical, lat, lon)
-
-    # Area extraction helper
-    def extract_area_with_coords(address):
-        if not address:
-            return "Unknown", None, None
-        address_lower = address.lower()
-        for alias, (canonical, lat, lon) in area_alias_map.items():
-            if alias in address_lower:
-                return canonical, lat, lon
-        return "Unknown", None, None
+    # Alias automaton and centroid index are built once per process (app lifespan)
+    match = get_area_matcher().match
 
     # Loop through data and add "area", "latitude", "longitude"
+    unmatched = []
     for obj in data:
-        pickup_address = obj.get("pickup_task", {}).get("address", "")
-        area, lat, lon = extract_area_with_coords(pickup_address)
-        obj["area"] = area
-        obj["latitude"] = lat
-        obj["longitude"] = lon
+        pickup = obj.get("pickup_task", {})
+        area = match(pickup.get("address", ""))
+        obj["area"], obj["latitude"], obj["longitude"] = area
+        if area is UNKNOWN_AREA:
+            unmatched.append(obj)
+
+    # No alias in the address text: nearest centroid to the pickup point,
+    # resolved for all unmatched orders in one vectorized lookup
+    if unmatched:
+        centroids = get_centroid_index()
+        pickups = [obj.get("pickup_task") or {} for obj in unmatched]
+        nearest = centroids.nearest_batch(
+            float_column(p.get("latitude") for p in pickups),
+            float_column(p.get("longitude") for p in pickups),
+        )
+        for obj, i in zip(unmatched, nearest.tolist()):
+            if i >= 0:
+                obj["area"], obj["latitude"], obj["longitude"] = centroids.areas[i]
 
     return data
 
 
-def areaReport(data):
-    # Helper to parse datetime
-    def parse_dt(ts):
-        return datetime.strptime(ts, "%Y-%m-%d %H:%M:%S") if ts else None
-
-    # Aggregate per area
-    areas = defaultdict(
-        lambda: {
-            "Orders": 0,
-            "Revenue": 0,
-            "DeliveryTimes": [],
-            "AssignTimes": [],
-            "PickupWaits": [],
-            "TravelTimes": [],
-            "DropoffWaits": [],
-            "Clients": defaultdict(int),  # <-- per-area client counter
-        }
+def client_label(name):
+    return (name or "Unknown").strip() or "Unknown"
+
+
+def _coords(order):
+    # first non-None coords per area win
+    lat = order.get("latitude")
+    lon = order.get("longitude")
+    return (lat, lon) if lat is not None or lon is not None else None
+
+
+# ----------------- Report definition (one pass over the orders) -----------------
+AREA_REPORT = {
+    "areas": Grouping(
+        lambda order: order.get("area", "Unknown"),
+        {
+            "Orders": Count(),
+            "Revenue": Sum(amount_rounded),
+            **duration_metrics(DURATION_COLUMNS),
+            "Clients": TopK(lambda order: client_label(order.get("user_name")), 5),
+            "Coords": First(_coords),
+        },
+    ),
+}
+
+
+def areaReport(data, sort=True):
+    areas = aggregate(data, AREA_REPORT)["areas"]
+    stats = list(areas.values())
+
+    # the per-area sketches merge into the overall delivery-time distribution
+    delivery = RunningStats(quantiles=True)
+    for a in stats:
+        delivery.merge(a["Average Delivery Time (min)"])
+
+    durations, percentiles = duration_results(stats, DURATION_COLUMNS, empty=0)
+    return _build(
+        area_names=list(areas),
+        orders=[a["Orders"] for a in stats],
+        revenues=[a["Revenue"] for a in stats],
+        coords=[a["Coords"] or (None, None) for a in stats],
+        durations=durations,
+        percentiles=percentiles,
+        top_clients=[a["Clients"] for a in stats],
+        delivery_total=delivery.total,
+        delivery_percentiles={
+            f"p{p}": delivery.quantile(p / 100) for p in PERCENTILES
+        },
+        sort=sort,
     )
-    # cache first seen coords per area to avoid repeated scans
-    area_coords = {}  # area -> (lat, lon)
-
-    for order in data:
-        area = order.get("area", "Unknown")
-        try:
-            revenue = round(abs(float(order.get("amount", 0))), 2)
-        except:
-            revenue = 0
-
-        created = parse_dt(order.get("created_at"))
-        pickup = order.get("pickup_task", {}) or {}
-        delivery = order.get("delivery_task", {}) or {}
-
-        pickup_assigned = parse_dt(pickup.get("assigned_at"))
-        pickup_arrived = parse_dt(pickup.get("arrived_at"))
-        pickup_success = parse_dt(pickup.get("successful_at"))
-
-        delivery_started = parse_dt(delivery.get("started_at"))
-        delivery_arrived = parse_dt(delivery.get("arrived_at"))
-        delivery_success = parse_dt(delivery.get("successful_at"))
-
-        # ---- metrics ----
-        if created and delivery_success:
-            areas[area]["DeliveryTimes"].append(
-                (delivery_success - created).total_seconds() / 60
-            )
-        if created and pickup_assigned:
-            areas[area]["AssignTimes"].append(
-                (pickup_assigned - created).total_seconds() / 60
-            )
-        if pickup_success and pickup_arrived:
-            areas[area]["PickupWaits"].append(
-                (pickup_success - pickup_arrived).total_seconds() / 60
-            )
-        if delivery_arrived and delivery_started:
-            areas[area]["TravelTimes"].append(
-                (delivery_arrived - delivery_started).total_seconds() / 60
-            )
-        if delivery_success and delivery_arrived:
-            areas[area]["DropoffWaits"].append(
-                (delivery_success - delivery_arrived).total_seconds() / 60
-            )
-
-        # ---- counts ----
-        areas[area]["Orders"] += 1
-        areas[area]["Revenue"] += revenue
-
-        # client name from "username" (fallback to legacy "user_name")
-        client_name = (order.get("user_name") or "Unknown").strip() or "Unknown"
-        areas[area]["Clients"][client_name] += 1
-
-        # coords cache (first non-None wins)
-        lat = order.get("latitude")
-        lon = order.get("longitude")
-        if area not in area_coords and (lat is not None or lon is not None):
-            area_coords[area] = (lat, lon)
-
-    # Helper for average
-    def avg(lst):
-        return round(sum(lst) / len(lst), 2) if lst else 0
 
-    # ---- statcards ----
-    total_orders = sum(a["Orders"] for a in areas.values())
-    total_revenue = round(sum(a["Revenue"] for a in areas.values()), 2)
-    avg_fare = round(total_revenue / total_orders, 2) if total_orders else 0
-    avg_delivery_time = (
-        round(sum(sum(a["DeliveryTimes"]) for a in areas.values()) / total_orders, 2)
-        if total_orders
-        else 0
-    )
 
+def _build(
+    area_names,
+    orders,
+    revenues,
+    coords,
+    durations,
+    percentiles,
+    top_clients,
+    delivery_total,
+    delivery_percentiles,
+    sort=True,
+):
+    # Shared by the dict and columnar paths: parallel per-area lists in
+    # first-seen order. With sort off (a paged request sorts only its page)
+    # the heatmap and table stay in that order, so row i of either is area i.
+
+    # ---- statcards ----
+    total_orders = sum(orders)
+    total_revenue = round(sum(revenues), 2)
     statcards = {
         "number_of_orders": total_orders,
         "total_revenue": total_revenue,
-        "average_fare": avg_fare,
-        "average_delivery_time": avg_delivery_time,
+        "average_fare": round(total_revenue / total_orders, 2) if total_orders else 0,
+        "average_delivery_time": (
+            round(delivery_total / total_orders, 2) if total_orders else 0
+        ),
+        "delivery_time_percentiles": delivery_percentiles,
     }
 
-    # ---- heatmap (sorted by orders desc) ----
-    heatmap = sorted(
-        [
-            {
-                "area": area,
-                "orders": a["Orders"],
-                "revenue": round(a["Revenue"], 2),
-                "latitude": (area_coords.get(area) or (None, None))[0],
-                "longitude": (area_coords.get(area) or (None, None))[1],
-            }
-            for area, a in areas.items()
-        ],
-        key=lambda x: x["orders"],
-        reverse=True,
-    )
-
-    # ---- table (sorted by orders desc) with Top 5 Clients ----
+    heatmap = []
     table = []
-    for area, a in areas.items():
-        # efficient top-5 clients (no need to sort all)
-        top5 = heapq.nlargest(5, a["Clients"].items(), key=lambda kv: kv[1])
-        table.append(
+    for i, area in enumerate(area_names):
+        lat, lon = coords[i]
+        heatmap.append(
             {
-                "Area": area,
-                "Orders": a["Orders"],
-                "Total Revenue": round(a["Revenue"], 2),
-                "Average Fare": round(a["Revenue"] / a["Orders"], 2) if a["Orders"] else 0,
-                "Average Delivery Time (min)": avg(a["DeliveryTimes"]),
-                "Avg Time to Assign (min)": avg(a["AssignTimes"]),
-                "Avg Pickup Waiting (min)": avg(a["PickupWaits"]),
-                "Avg Travel to Customer (min)": avg(a["TravelTimes"]),
-                "Avg Dropoff Waiting (min)": avg(a["DropoffWaits"]),
-                "Top Clients": [
-                    {"client": name, "orders": count} for name, count in top5
-                ],
+                "area": area,
+                "orders": orders[i],
+                "revenue": round(revenues[i], 2),
+                "latitude": lat,
+                "longitude": lon,
             }
         )
+        row = {
+            "Area": area,
+            "Orders": orders[i],
+            "Total Revenue": round(revenues[i], 2),
+            "Average Fare": round(revenues[i] / orders[i], 2) if orders[i] else 0,
+        }
+        row.update(duration_cells(durations, percentiles, i))
+        row["Top Clients"] = [
+            {"client": name, "orders": count} for name, count in top_clients[i]
+        ]
+        table.append(row)
 
-    table.sort(key=lambda x: x["Orders"], reverse=True)
+    # ---- heatmap + table (sorted by orders desc) ----
+    if sort:
+        heatmap.sort(key=lambda x: x["orders"], reverse=True)
+        table.sort(key=lambda x: x["Orders"], reverse=True)
 
-    # ---- top 10 areas bar (from sorted table) ----
-    top_rows = table[:10]
-    top_areas_bar = [{"name": r["Area"], "value": r["Orders"]} for r in top_rows]
+    # ---- top 10 areas bar (ties keep first-seen order, as in the sorted table) ----
+    top = heapq.nlargest(10, table, key=lambda x: x["Orders"])
+    top_areas_bar = [{"name": r["Area"], "value": r["Orders"]} for r in top]
 
     return {
         "statcards": statcards,
         "heatmap": heatmap,
         "table": table,
         "top_areas_bar": top_areas_bar,
-    }
\ No newline at end of file
+    }
+
+
+def areaReportColumns(cols, sort=True):
+    """Vectorized areaReport over an OrderColumns batch built after formatAreas."""
+    codes, area_names = cols.area_codes, cols.areas
+    a = len(area_names)
+    revenue = cols.amount_rounded
+
+    orders = group_count(codes, a).tolist()
+    revenues = group_sum(codes, revenue, a).tolist()
+
+    durations, percentiles = group_durations(
+        cols, codes, a, DURATION_COLUMNS, empty=0
+    )
+    delivery, delivery_mask = cols.minutes("created_at", "delivery_success")
+    delivery_sum = ordered_sum(group_sum(codes, delivery, a, delivery_mask))
+    overall = group_percentiles(
+        np.where(codes >= 0, 0, -1), delivery, 1, delivery_mask, PERCENTILES
+    )
+
+    # first order with any coordinate decides the area's coords
+    has_coords = ~(np.isnan(cols.area_lat) & np.isnan(cols.area_lng))
+    coord_idx = first_index(np.where(has_coords, codes, -1), a).tolist()
+
+    def coords(i):
+        j = coord_idx[i]
+        if j >= cols.n:
+            return None, None
+        return _none_if_nan(cols.area_lat[j]), _none_if_nan(cols.area_lng[j])
+
+    # per-area top 5 clients
+    client_codes, clients = recode(
+        cols.client_codes,
+        cols.clients,
+        client_label,
+    )
+    top_clients = top_pairs(codes, client_codes, a, len(clients), 5)
+
+    return _build(
+        area_names=area_names,
+        orders=orders,
+        revenues=revenues,
+        coords=[coords(i) for i in range(a)],
+        durations=durations,
+        percentiles=percentiles,
+        top_clients=[[(clients[c], n) for c, n in pairs] for pairs in top_clients],
+        delivery_total=delivery_sum,
+        delivery_percentiles={f"p{p}": values[0] for p, values in overall.items()},
+        sort=sort,
+    )
+
+
+def _none_if_nan(value):
+    return None if np.isnan(value) else float(value)
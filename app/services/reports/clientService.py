@@ -1,127 +1,83 @@
-from collections import defaultdict
-from datetime import datetime
 import heapq
 
-def clientReport(data):
-    # ----------------- Helper Functions -----------------
-    def count_orders(data):
-        return len(data)
-
-    def total_fare(data):
-        return round(sum(abs(float(order["amount"])) for order in data), 2)
-
-    def average_fare(data):
-        num_orders = count_orders(data)
-        return round(total_fare(data) / num_orders, 2) if num_orders > 0 else 0
-
-    def average_time_taken(data):
-        total_minutes = 0
-        count = 0
-        for order in data:
-            created_str = order.get("created_at")
-            successful_str = order.get("delivery_task", {}).get("successful_at")
-            if not created_str or not successful_str:
-                continue
-            try:
-                created = datetime.strptime(created_str, "%Y-%m-%d %H:%M:%S")
-                successful = datetime.strptime(successful_str, "%Y-%m-%d %H:%M:%S")
-                total_minutes += (successful - created).total_seconds() / 60
-                count += 1
-            except:
-                continue
-        return round(total_minutes / count, 2) if count > 0 else 0
+import numpy as np
+
+from app.services.reports.aggregate import (
+    DURATION_COLUMNS,
+    PERCENTILES,
+    Count,
+    Duration,
+    Grouping,
+    Sum,
+    aggregate,
+    amount,
+    amount_rounded,
+    duration_cells,
+    duration_metrics,
+    duration_results,
+    everything,
+    group_durations,
+)
+from app.utils.order_store import (
+    group_count,
+    group_percentiles,
+    group_sum,
+    ordered_sum,
+)
+
+# ----------------- Report definition (one pass over the orders) -----------------
+CLIENT_REPORT = {
+    "total": Grouping(
+        everything,
+        {
+            "orders": Count(),
+            "fare": Sum(amount),
+            "delivery": Duration("created_at", "delivery_success", quantiles=True),
+        },
+    ),
+    "clients": Grouping(
+        lambda order: order.get("user_name", "Unknown"),
+        {
+            "Orders": Count(),
+            "Amount": Sum(amount_rounded),
+            **duration_metrics(DURATION_COLUMNS),
+        },
+    ),
+}
 
-    # ----------------- Table Data -----------------
-    clients = defaultdict(
-        lambda: {
-            "Amount": 0,
-            "Orders": 0,
-            "DeliveryTimes": [],
-            "AssignTimes": [],
-            "PickupWaits": [],
-            "TravelTimes": [],
-            "DropoffWaits": [],
-        }
-    )
 
-    def parse_dt(ts):
-        return datetime.strptime(ts, "%Y-%m-%d %H:%M:%S") if ts else None
-
-    for order in data:
-        client = order.get("user_name", "Unknown")
-        amount_str = order.get("amount")
-
-        try:
-            amount = round(abs(float(amount_str)), 2)
-        except:
-            amount = 0
-
-        created = parse_dt(order.get("created_at"))
-        pickup = order.get("pickup_task", {})
-        delivery = order.get("delivery_task", {})
-
-        pickup_assigned = parse_dt(pickup.get("assigned_at"))
-        pickup_arrived = parse_dt(pickup.get("arrived_at"))
-        pickup_success = parse_dt(pickup.get("successful_at"))
-        delivery_started = parse_dt(delivery.get("started_at"))
-        delivery_arrived = parse_dt(delivery.get("arrived_at"))
-        delivery_success = parse_dt(delivery.get("successful_at"))
-
-        # Various timings
-        if created and delivery_success:
-            clients[client]["DeliveryTimes"].append(
-                (delivery_success - created).total_seconds() / 60
-            )
-
-        if created and pickup_assigned:
-            clients[client]["AssignTimes"].append(
-                (pickup_assigned - created).total_seconds() / 60
-            )
-
-        if pickup_success and pickup_arrived:
-            clients[client]["PickupWaits"].append(
-                (pickup_success - pickup_arrived).total_seconds() / 60
-            )
-
-        if delivery_arrived and delivery_started:
-            clients[client]["TravelTimes"].append(
-                (delivery_arrived - delivery_started).total_seconds() / 60
-            )
-
-        if delivery_success and delivery_arrived:
-            clients[client]["DropoffWaits"].append(
-                (delivery_success - delivery_arrived).total_seconds() / 60
-            )
-
-        clients[client]["Amount"] += amount
-        clients[client]["Orders"] += 1
+def clientReport(data):
+    result = aggregate(data, CLIENT_REPORT)
+
+    total = result["total"].get("all")
+    num_orders = total["orders"] if total else 0
+    fare = round(total["fare"], 2) if total else 0
+    avg_time = total["delivery"].mean(empty=0) if total else 0
+    time_percentiles = {
+        f"p{p}": total["delivery"].quantile(p / 100) if total else None
+        for p in PERCENTILES
+    }
 
     # ----------------- Build Table Rows -----------------
+    clients = result["clients"]
+    durations, percentiles = duration_results(clients.values(), DURATION_COLUMNS)
     rows = []
-    for client, stats in clients.items():
-        def avg(lst):
-            return round(sum(lst) / len(lst), 2) if lst else None
-
-        avg_fare = (
-            round(stats["Amount"] / stats["Orders"], 2)
-            if stats["Orders"] > 0
-            else 0
-        )
-
-        rows.append(
-            {
-                "Client": client,
-                "Orders": stats["Orders"],
-                "Total Fare": round(stats["Amount"], 2),
-                "Average Fare": avg_fare,
-                "Average Delivery Time (min)": avg(stats["DeliveryTimes"]),
-                "Avg Time to Assign (min)": avg(stats["AssignTimes"]),
-                "Avg Pickup Waiting (min)": avg(stats["PickupWaits"]),
-                "Avg Travel to Customer (min)": avg(stats["TravelTimes"]),
-                "Avg Dropoff Waiting (min)": avg(stats["DropoffWaits"]),
-            }
-        )
+    for i, (client, stats) in enumerate(clients.items()):
+        row = {
+            "Client": client,
+            "Orders": stats["Orders"],
+            "Total Fare": round(stats["Amount"], 2),
+            "Average Fare": (
+                round(stats["Amount"] / stats["Orders"], 2) if stats["Orders"] > 0 else 0
+            ),
+        }
+        row.update(duration_cells(durations, percentiles, i))
+        rows.append(row)
+
+    return _summary(num_orders, fare, avg_time, time_percentiles, rows)
 
+
+def _summary(num_orders, fare, avg_time, time_percentiles, rows):
     # ----------------- Optimized Top 15 Clients -----------------
     top_by_orders = heapq.nlargest(15, rows, key=lambda x: x["Orders"])
     top_by_fare = heapq.nlargest(15, rows, key=lambda x: x["Total Fare"])
@@ -141,13 +97,51 @@ def clientReport(data):
     }
 
     # ----------------- Build Summary -----------------
-    summary = {
-        "number_of_orders": count_orders(data),
-        "total_fare": total_fare(data),
-        "average_fare": average_fare(data),
-        "average_delivery_time": average_time_taken(data),
+    return {
+        "number_of_orders": num_orders,
+        "total_fare": fare,
+        "average_fare": round(fare / num_orders, 2) if num_orders > 0 else 0,
+        "average_delivery_time": avg_time,
+        "delivery_time_percentiles": time_percentiles,
         "charts": charts,
         "table": rows,
     }
 
-    return summary
+
+def clientReportColumns(cols):
+    """Vectorized clientReport over an OrderColumns batch (same output shape)."""
+    fares = np.nan_to_num(cols.amount)
+    n = cols.n
+
+    fare = round(ordered_sum(fares), 2)
+    delivery, delivery_mask = cols.minutes("created_at", "delivery_success")
+    avg_time = (
+        round(ordered_sum(delivery[delivery_mask]) / int(delivery_mask.sum()), 2)
+        if delivery_mask.any()
+        else 0
+    )
+    overall = group_percentiles(
+        np.zeros(n, dtype=np.int64), delivery, 1, delivery_mask, PERCENTILES
+    )
+    time_percentiles = {f"p{p}": values[0] for p, values in overall.items()}
+
+    # ----------------- Table Data -----------------
+    codes, clients = cols.client_codes, cols.clients
+    c = len(clients)
+    orders = group_count(codes, c).tolist()
+    amounts = group_sum(codes, cols.amount_rounded, c).tolist()
+
+    durations, percentiles = group_durations(cols, codes, c, DURATION_COLUMNS)
+
+    rows = []
+    for i, client in enumerate(clients):
+        row = {
+            "Client": client,
+            "Orders": orders[i],
+            "Total Fare": round(amounts[i], 2),
+            "Average Fare": round(amounts[i] / orders[i], 2) if orders[i] > 0 else 0,
+        }
+        row.update(duration_cells(durations, percentiles, i))
+        rows.append(row)
+
+    return _summary(n, fare, avg_time, time_percentiles, rows)
@@ -1,160 +1,139 @@
-from datetime import datetime
-from collections import defaultdict
 import heapq  # For efficient top-k calculations
 
+import numpy as np
+
+from app.services.reports.aggregate import (
+    DURATION_COLUMNS as ORDER_DURATION_COLUMNS,
+    PERCENTILES,
+    SKIP,
+    Count,
+    Duration,
+    Grouping,
+    Sum,
+    aggregate,
+    amount,
+    amount_rounded,
+    duration_cells,
+    duration_metrics,
+    duration_results,
+    everything,
+    group_durations,
+)
+from app.utils.order_store import (
+    group_count,
+    group_percentiles,
+    group_sum,
+    ordered_sum,
+    recode,
+)
+
+NULL_DRIVER_NAMES = {"", "null", "none", "na", "n/a", "nil"}
+
+# The shared duration columns, with delivery timed from driver assignment
+DURATION_COLUMNS = {
+    **ORDER_DURATION_COLUMNS,
+    "Average Delivery Time (min)": ("pickup_assigned", "delivery_success"),
+}
+
+
+def chart_group(name):
+    # Charts group drivers by the last word of their name, e.g. "... KW1" -> "KW1"
+    parts = name.split() if name else []
+    return parts[-1].upper() if parts else None
+
+
+def table_driver(name):
+    driver = (name or "").strip()
+    return None if driver.lower() in NULL_DRIVER_NAMES else driver
+
+
+def _driver_name(order):
+    return (order.get("pickup_task") or {}).get("driver_name")
+
+
+def _chart_key(order):
+    group = chart_group(_driver_name(order))
+    return SKIP if group is None else group
+
+
+def _table_key(order):
+    driver = table_driver(_driver_name(order))
+    return SKIP if driver is None else driver
+
+
+# ----------------- Report definition (one pass over the orders) -----------------
+DRIVER_REPORT = {
+    "total": Grouping(
+        everything,
+        {
+            "orders": Count(),
+            "fare": Sum(amount),
+            "time_taken": Duration(
+                "pickup_assigned", "delivery_success", quantiles=True
+            ),
+        },
+    ),
+    "charts": Grouping(
+        _chart_key,
+        {"orders": Count(), "fare": Sum(amount)},
+    ),
+    "drivers": Grouping(
+        _table_key,
+        {
+            "Orders": Count(),
+            "Amount": Sum(amount_rounded),
+            **duration_metrics(DURATION_COLUMNS),
+        },
+    ),
+}
+
+
 def driverReport(data):
+    result = aggregate(data, DRIVER_REPORT)
+
     # ----------------- Base Calculations -----------------
-    def count_orders(data):
-        return len(data)
-
-    def total_fare(data):
-        return round(sum(abs(float(order["amount"])) for order in data), 2)
-
-    def average_fare(data):
-        num_orders = count_orders(data)
-        return round(total_fare(data) / num_orders, 2) if num_orders > 0 else 0
-
-    def average_time_taken(data):
-        total_minutes = 0
-        count = 0
-        for order in data:
-            created_str = order.get("pickup_task", {}).get("assigned_at")
-            successful_str = order.get("delivery_task", {}).get("successful_at")
-            if not created_str or not successful_str:
-                continue
-            try:
-                created = datetime.strptime(created_str, "%Y-%m-%d %H:%M:%S")
-                successful = datetime.strptime(successful_str, "%Y-%m-%d %H:%M:%S")
-                total_minutes += (successful - created).total_seconds() / 60
-                count += 1
-            except:
-                continue
-        return round(total_minutes / count, 2) if count > 0 else 0
-
-    def total_earnings(data):
-        return round(total_fare(data) * 0.85, 2)
-
-    def total_revenue(data):
-        fare = total_fare(data)
-        return round(fare - (fare * 0.85), 2)
+    total = result["total"].get("all")
+    num_orders = total["orders"] if total else 0
+    fare = round(total["fare"], 2) if total else 0
+    avg_time = total["time_taken"].mean(empty=0) if total else 0
+    time_percentiles = {
+        f"p{p}": total["time_taken"].quantile(p / 100) if total else None
+        for p in PERCENTILES
+    }
 
     # ----------------- Charts -----------------
-    def charts_per_driver_group(data):
-        groups = defaultdict(list)
-        for order in data:
-            driver_name = order.get("pickup_task", {}).get("driver_name", "")
-            if not driver_name:
-                continue
-            group = driver_name.split()[-1].upper()
-            groups[group].append(order)
-
-        result = {
-            "number_of_orders": {},
-            "total_fare": {},
-            "average_fare": {},
-            "total_earnings": {},
-        }
+    charts = {
+        "number_of_orders": {},
+        "total_fare": {},
+        "average_fare": {},
+        "total_earnings": {},
+    }
+    for group, stats in result["charts"].items():
+        group_fare = round(stats["fare"], 2)
+        charts["number_of_orders"][group] = stats["orders"]
+        charts["total_fare"][group] = group_fare
+        charts["average_fare"][group] = (
+            round(group_fare / stats["orders"], 2) if stats["orders"] > 0 else 0
+        )
+        charts["total_earnings"][group] = round(group_fare * 0.85, 2)
 
-        for group, orders in groups.items():
-            num_orders = len(orders)
-            fare = round(sum(abs(float(o["amount"])) for o in orders), 2)
-            avg_fare = round(fare / num_orders, 2) if num_orders > 0 else 0
-            earnings = round(fare * 0.85, 2)
-
-            result["number_of_orders"][group] = num_orders
-            result["total_fare"][group] = fare
-            result["average_fare"][group] = avg_fare
-            result["total_earnings"][group] = earnings
-
-        return result
-
-    # ----------------- Table Data + Top 10 Drivers -----------------
-    drivers = defaultdict(
-        lambda: {
-            "Amount": 0,
-            "Orders": 0,
-            "DeliveryTimes": [],
-            "AssignTimes": [],
-            "PickupWaits": [],
-            "TravelTimes": [],
-            "DropoffWaits": [],
+    # ----------------- Build Table Rows -----------------
+    drivers = result["drivers"]
+    durations, percentiles = duration_results(drivers.values(), DURATION_COLUMNS)
+    rows = []
+    for i, (driver, stats) in enumerate(drivers.items()):
+        row = {
+            "Driver": driver,
+            "Orders": stats["Orders"],
+            "Amount": round(stats["Amount"], 2),
         }
-    )
+        row.update(duration_cells(durations, percentiles, i))
+        rows.append(row)
 
-    def parse_dt(ts):
-        return datetime.strptime(ts, "%Y-%m-%d %H:%M:%S") if ts else None
-
-    for order in data:
-        driver_raw = order.get("pickup_task", {}).get("driver_name")
-        driver = (driver_raw or "").strip()
-        if driver.lower() in {"", "null", "none", "na", "n/a", "nil"}:
-            continue
-        amount_str = order.get("amount")
-
-        try:
-            amount = round(abs(float(amount_str)), 2)
-        except:
-            amount = 0
-
-        created = parse_dt(order.get("created_at"))
-        pickup = order.get("pickup_task", {})
-        delivery = order.get("delivery_task", {})
-
-        pickup_assigned = parse_dt(pickup.get("assigned_at"))
-        pickup_arrived = parse_dt(pickup.get("arrived_at"))
-        pickup_success = parse_dt(pickup.get("successful_at"))
-
-        delivery_started = parse_dt(delivery.get("started_at"))
-        delivery_arrived = parse_dt(delivery.get("arrived_at"))
-        delivery_success = parse_dt(delivery.get("successful_at"))
-
-        if delivery_success and pickup_assigned:
-            drivers[driver]["DeliveryTimes"].append(
-                (delivery_success - pickup_assigned).total_seconds() / 60
-            )
-
-        if created and pickup_assigned:
-            drivers[driver]["AssignTimes"].append(
-                (pickup_assigned - created).total_seconds() / 60
-            )
-
-        if pickup_success and pickup_arrived:
-            drivers[driver]["PickupWaits"].append(
-                (pickup_success - pickup_arrived).total_seconds() / 60
-            )
-
-        if delivery_arrived and delivery_started:
-            drivers[driver]["TravelTimes"].append(
-                (delivery_arrived - delivery_started).total_seconds() / 60
-            )
-
-        if delivery_success and delivery_arrived:
-            drivers[driver]["DropoffWaits"].append(
-                (delivery_success - delivery_arrived).total_seconds() / 60
-            )
-
-        drivers[driver]["Amount"] += amount
-        drivers[driver]["Orders"] += 1
+    return _summary(num_orders, fare, avg_time, time_percentiles, charts, rows)
 
-    # ----------------- Build Table Rows -----------------
-    rows = []
-    for driver, stats in drivers.items():
-        def avg(lst):
-            return round(sum(lst) / len(lst), 2) if lst else None
-
-        rows.append(
-            {
-                "Driver": driver,
-                "Orders": stats["Orders"],
-                "Amount": round(stats["Amount"], 2),
-                "Average Delivery Time (min)": avg(stats["DeliveryTimes"]),
-                "Avg Time to Assign (min)": avg(stats["AssignTimes"]),
-                "Avg Pickup Waiting (min)": avg(stats["PickupWaits"]),
-                "Avg Travel to Customer (min)": avg(stats["TravelTimes"]),
-                "Avg Dropoff Waiting (min)": avg(stats["DropoffWaits"]),
-            }
-        )
 
+def _summary(num_orders, fare, avg_time, time_percentiles, charts, rows):
     # ----------------- Optimized Top 10 Drivers -----------------
     top_by_orders = heapq.nlargest(10, rows, key=lambda x: x["Orders"])
     top_by_fastest_delivery = heapq.nsmallest(
@@ -163,14 +142,15 @@ def driverReport(data):
     )
 
     # ----------------- Build Summary -----------------
-    summary = {
-        "Number of Orders": count_orders(data),
-        "Total Fare": total_fare(data),
-        "Average Fare": average_fare(data),
-        "Average Time Taken (minutes)": average_time_taken(data),
-        "Total Earnings": total_earnings(data),
-        "Total Revenue": total_revenue(data),
-        "Charts": charts_per_driver_group(data),
+    return {
+        "Number of Orders": num_orders,
+        "Total Fare": fare,
+        "Average Fare": round(fare / num_orders, 2) if num_orders > 0 else 0,
+        "Average Time Taken (minutes)": avg_time,
+        "Time Taken Percentiles (minutes)": time_percentiles,
+        "Total Earnings": round(fare * 0.85, 2),
+        "Total Revenue": round(fare - (fare * 0.85), 2),
+        "Charts": charts,
         "table_data": rows,
         "top_drivers": {
             "top_by_orders": top_by_orders,
@@ -178,4 +158,58 @@ def driverReport(data):
         }
     }
 
-    return summary
+
+def driverReportColumns(cols):
+    """Vectorized driverReport over an OrderColumns batch (same output shape)."""
+    fares = np.nan_to_num(cols.amount)
+    n = cols.n
+
+    # ----------------- Base Calculations -----------------
+    fare = round(ordered_sum(fares), 2)
+    delivery, delivery_mask = cols.minutes("pickup_assigned", "delivery_success")
+    avg_time = (
+        round(ordered_sum(delivery[delivery_mask]) / int(delivery_mask.sum()), 2)
+        if delivery_mask.any()
+        else 0
+    )
+    overall = group_percentiles(
+        np.zeros(n, dtype=np.int64), delivery, 1, delivery_mask, PERCENTILES
+    )
+    time_percentiles = {f"p{p}": values[0] for p, values in overall.items()}
+
+    # ----------------- Charts (grouped by last word of the driver name) -----------------
+    chart_codes, chart_groups = recode(cols.driver_codes, cols.drivers, chart_group)
+    g = len(chart_groups)
+    chart_orders = group_count(chart_codes, g).tolist()
+    chart_fare = group_sum(chart_codes, fares, g).tolist()
+
+    charts = {
+        "number_of_orders": {},
+        "total_fare": {},
+        "average_fare": {},
+        "total_earnings": {},
+    }
+    for group, num_orders, group_fare in zip(chart_groups, chart_orders, chart_fare):
+        group_fare = round(group_fare, 2)
+        charts["number_of_orders"][group] = num_orders
+        charts["total_fare"][group] = group_fare
+        charts["average_fare"][group] = (
+            round(group_fare / num_orders, 2) if num_orders > 0 else 0
+        )
+        charts["total_earnings"][group] = round(group_fare * 0.85, 2)
+
+    # ----------------- Table Data -----------------
+    codes, drivers = recode(cols.driver_codes, cols.drivers, table_driver)
+    d = len(drivers)
+    orders = group_count(codes, d).tolist()
+    amounts = group_sum(codes, cols.amount_rounded, d).tolist()
+
+    durations, percentiles = group_durations(cols, codes, d, DURATION_COLUMNS)
+
+    rows = []
+    for i, driver in enumerate(drivers):
+        row = {"Driver": driver, "Orders": orders[i], "Amount": round(amounts[i], 2)}
+        row.update(duration_cells(durations, percentiles, i))
+        rows.append(row)
+
+    return _summary(n, fare, avg_time, time_percentiles, charts, rows)
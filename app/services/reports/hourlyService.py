@@ -1,8 +1,18 @@
 from collections import defaultdict
-from datetime import datetime
 import calendar
 from statistics import mean
 
+import numpy as np
+
+from app.utils.order_store import ordered_sum, top_pairs
+from app.utils.timestamps import day_number, minutes_between, order_times, weekday
+
+
+def hours_in_range(start_h, end_h):
+    if start_h <= end_h:
+        return list(range(start_h, end_h + 1))
+    return list(range(start_h, 24)) + list(range(0, end_h + 1))
+
 
 def hourlyReport(
     data, start_date, end_date, start_time="00:00", end_time="23:59", top_n_clients=5
@@ -10,11 +20,6 @@ def hourlyReport(
     start_hour = int(start_time.split(":")[0])
     end_hour = int(end_time.split(":")[0])
 
-    def hours_in_range(start_h, end_h):
-        if start_h <= end_h:
-            return list(range(start_h, end_h + 1))
-        return list(range(start_h, 24)) + list(range(0, end_h + 1))
-
     hours_iter = hours_in_range(start_hour, end_hour)
 
     hour_orders = defaultdict(list)
@@ -29,12 +34,13 @@ def hourlyReport(
     total_amount = 0.0
 
     for order in data:
-        created_str = order.get("created_at")
-        if not created_str:
+        times = order_times(order)
+        created = times["created_at"]
+        if created is None:
             continue
-        dt = datetime.strptime(created_str, "%Y-%m-%d %H:%M:%S")
-        hour = dt.hour
-        weekday = dt.weekday()
+        hour = created // 3600 % 24
+        day = day_number(created)
+        dow = weekday(created)
         client = order.get("user_name", "Unknown")
         amount = abs(float(order.get("amount", 0) or 0))
 
@@ -52,42 +58,133 @@ def hourlyReport(
         # aggregates
         hour_orders[hour].append(order)
         hour_client_orders[hour][client] += 1
-        hour_dates_set[hour].add(dt.date())
+        hour_dates_set[hour].add(day)
 
-        weekday_hour_orders[weekday][hour].append(order)
-        weekday_dates[weekday].add(dt.date())
+        weekday_hour_orders[dow][hour].append(order)
+        weekday_dates[dow].add(day)
 
         # delivery time (optional)
-        ps = order.get("pickup_task", {}).get("started_at")
-        ds = order.get("delivery_task", {}).get("successful_at")
-        if ps and ds:
-            try:
-                pdt = datetime.strptime(ps, "%Y-%m-%d %H:%M:%S")
-                ddt = datetime.strptime(ds, "%Y-%m-%d %H:%M:%S")
-                delivery_times.append((ddt - pdt).total_seconds() / 60)
-            except:
-                pass
+        minutes = minutes_between(times, "pickup_started", "delivery_success")
+        if minutes is not None:
+            delivery_times.append(minutes)
+
+    return _buildHourly(
+        hours_iter,
+        start_date,
+        end_date,
+        top_n_clients,
+        hour_counts={h: len(v) for h, v in hour_orders.items()},
+        hour_clients={h: list(c.items()) for h, c in hour_client_orders.items()},
+        hour_days={h: len(d) for h, d in hour_dates_set.items()},
+        weekday_hour_counts={
+            w: {h: len(v) for h, v in hours.items()}
+            for w, hours in weekday_hour_orders.items()
+        },
+        weekday_days={w: len(d) for w, d in weekday_dates.items()},
+        avg_delivery_time=round(mean(delivery_times), 2) if delivery_times else None,
+        total_orders=total_orders,
+        total_amount=total_amount,
+    )
+
+
+def hourlyReportColumns(
+    cols, start_date, end_date, start_time="00:00", end_time="23:59", top_n_clients=5
+):
+    """Vectorized hourlyReport over an OrderColumns batch (same output shape)."""
+    start_hour = int(start_time.split(":")[0])
+    end_hour = int(end_time.split(":")[0])
+    hours_iter = hours_in_range(start_hour, end_hour)
+
+    created = cols.ts["created_at"]
+    all_hours = (created // 3600) % 24
+
+    # filter by time (supports overnight)
+    if start_hour <= end_hour:
+        in_window = (all_hours >= start_hour) & (all_hours <= end_hour)
+    else:
+        in_window = (all_hours >= start_hour) | (all_hours <= end_hour)
+    selected = np.nonzero(cols.has("created_at") & in_window)[0]
+
+    hours = all_hours[selected]
+    days = day_number(created[selected])
+    weekdays = weekday(created[selected])
+    amount = np.nan_to_num(cols.amount[selected])
+
+    hour_counts = np.bincount(hours, minlength=24).tolist()
+    # distinct (day, hour) pairs -> number of days each hour was seen on
+    hour_days = np.bincount(np.unique(days * 24 + hours) % 24, minlength=24).tolist()
+    weekday_hour = np.bincount(weekdays * 24 + hours, minlength=7 * 24).tolist()
+    unique_days = np.unique(days)
+    weekday_days = np.bincount(weekday(unique_days * 86400), minlength=7).tolist()
+
+    top_clients = top_pairs(
+        hours, cols.client_codes[selected], 24, len(cols.clients), top_n_clients
+    )
+
+    delivery, delivery_mask = cols.minutes("pickup_started", "delivery_success")
+    delivery = delivery[selected][delivery_mask[selected]]
+
+    return _buildHourly(
+        hours_iter,
+        start_date,
+        end_date,
+        top_n_clients,
+        hour_counts=dict(enumerate(hour_counts)),
+        hour_clients={
+            h: [(cols.clients[c], n) for c, n in pairs]
+            for h, pairs in enumerate(top_clients)
+        },
+        hour_days=dict(enumerate(hour_days)),
+        weekday_hour_counts={
+            w: {h: weekday_hour[w * 24 + h] for h in range(24)} for w in range(7)
+        },
+        weekday_days=dict(enumerate(weekday_days)),
+        # statistics.mean like hourlyReport: exact, so no summation-order drift
+        avg_delivery_time=(
+            round(mean(delivery.tolist()), 2) if len(delivery) else None
+        ),
+        total_orders=len(selected),
+        total_amount=ordered_sum(amount),
+    )
+
+
+def _buildHourly(
+    hours_iter,
+    start_date,
+    end_date,
+    top_n_clients,
+    hour_counts,
+    hour_clients,
+    hour_days,
+    weekday_hour_counts,
+    weekday_days,
+    avg_delivery_time,
+    total_orders,
+    total_amount,
+):
+    # Shared by the dict and columnar paths; clients are (name, count) pairs
+    # in first-seen order so ties break the same way in both.
 
     # ---- Hourly totals (unchanged shape) ----
     total_orders_per_hour = {}
     for h in hours_iter:
         top_clients_total = sorted(
-            hour_client_orders[h].items(), key=lambda x: x[1], reverse=True
+            hour_clients.get(h, []), key=lambda x: x[1], reverse=True
         )[:top_n_clients]
         total_orders_per_hour[h] = {
-            "orders": len(hour_orders[h]),
+            "orders": hour_counts.get(h, 0),
             "top_clients": [{"name": c, "orders": n} for c, n in top_clients_total],
         }
 
     # ---- Hourly averages (now keyed by hour, same style) ----
     average_orders_per_hour = {}
     for h in hours_iter:
-        num_days = max(len(hour_dates_set[h]), 1)
-        avg_orders = len(hour_orders[h]) / num_days
+        num_days = max(hour_days.get(h, 0), 1)
+        avg_orders = hour_counts.get(h, 0) / num_days
 
         # top clients by average per day for that hour
         top_clients_avg = [
-            (client, cnt / num_days) for client, cnt in hour_client_orders[h].items()
+            (client, cnt / num_days) for client, cnt in hour_clients.get(h, [])
         ]
         top_clients_avg_sorted = sorted(
             top_clients_avg, key=lambda x: x[1], reverse=True
@@ -106,12 +203,12 @@ def hourlyReport(
     total_orders_per_weekday = {}
     for w in range(7):
         hours_list = []
-        num_days_for_weekday = max(len(weekday_dates[w]), 1)
+        num_days_for_weekday = max(weekday_days.get(w, 0), 1)
         total_orders_for_day = 0
         for h in hours_iter:
-            avg_h = len(weekday_hour_orders[w][h]) / num_days_for_weekday
+            avg_h = weekday_hour_counts.get(w, {}).get(h, 0) / num_days_for_weekday
             hours_list.append({"hour": h, "orders": round(avg_h, 2)})
-            total_orders_for_day += len(weekday_hour_orders[w][h])
+            total_orders_for_day += weekday_hour_counts.get(w, {}).get(h, 0)
         heatmap.append({"weekday": calendar.day_name[w], "hours": hours_list})
         total_orders_per_weekday[calendar.day_name[w]] = total_orders_for_day
 
@@ -134,9 +231,9 @@ def hourlyReport(
     average_orders_per_weekday_avg = {}
     filtered_days_avg = []
     for w in range(7):
-        num_days_for_weekday = max(len(weekday_dates[w]), 1)
+        num_days_for_weekday = max(weekday_days.get(w, 0), 1)
         total_orders_for_weekday = sum(
-            len(weekday_hour_orders[w][h]) for h in hours_iter
+            weekday_hour_counts.get(w, {}).get(h, 0) for h in hours_iter
         )
         avg_orders_for_weekday = total_orders_for_weekday / num_days_for_weekday
         average_orders_per_weekday_avg[calendar.day_name[w]] = round(
@@ -171,7 +268,7 @@ def hourlyReport(
                 round(coolest_day_avg, 2) if coolest_day_avg is not None else None
             ),
         },
-        "avg_delivery_time": round(mean(delivery_times), 2) if delivery_times else None,
+        "avg_delivery_time": avg_delivery_time,
         "total_amount_collected": round(total_amount, 2),
         "avg_fare_per_order": (
             round(total_amount / total_orders, 2) if total_orders > 0 else 0
@@ -1,21 +1,17 @@
-import os
-from datetime import datetime, timedelta
+import functools
 import json
-import redis
-
-redis_client = redis.Redis(
-    host=os.environ.get("REDIS_HOST"),
-    port=os.environ.get("REDIS_PORT"),
-    decode_responses=True,
-    username="default",
-    password=os.environ.get("REDIS_PASSWORD"),
-)
+import time
+from datetime import date
 
+import numpy as np
+
+from app import config
+from app.utils.job_engine import DONE, FAILED, JobEngine, job_key, progress
+from app.utils.order_store import OrderColumns, ordered_sum, rounded
+from app.utils.timestamps import minutes_between, order_times
 
-def task_history(data):
-    def parse_dt(ts):
-        return datetime.strptime(ts, "%Y-%m-%d %H:%M:%S") if ts else None
 
+def task_history(data):
     # --- Summary helpers ---
     def count_orders(data):
         return len(data)
@@ -31,10 +27,11 @@ def task_history(data):
         total_minutes = 0
         count = 0
         for order in data:
-            created = parse_dt(order.get("created_at"))
-            successful = parse_dt(order.get("delivery_task", {}).get("successful_at"))
-            if created and successful:
-                total_minutes += (successful - created).total_seconds() / 60
+            minutes = minutes_between(
+                order_times(order), "created_at", "delivery_success"
+            )
+            if minutes is not None:
+                total_minutes += minutes
                 count += 1
         return round(total_minutes / count, 2) if count > 0 else 0
 
@@ -48,46 +45,219 @@ def task_history(data):
     }
 
 
-def task_history_table(job_id, data):
-    def parse_dt(ts):
-        return datetime.strptime(ts, "%Y-%m-%d %H:%M:%S") if ts else None
+def _minutes_diff(start, end):
+    return round((end - start) / 60, 2) if start and end else None
+
+
+def task_history_row(order):
+    times = order_times(order)
+    created = times["created_at"]
+
+    pickup_assigned = times["pickup_assigned"]
+    pickup_arrived = times["pickup_arrived"]
+    pickup_success = times["pickup_success"]
+
+    delivery_started = times["delivery_started"]
+    delivery_arrived = times["delivery_arrived"]
+    delivery_success = times["delivery_success"]
+
+    return {
+        "Order ID": order.get("reference"),
+        "Client": order.get("user_name"),
+        "Amount": round(abs(float(order.get("amount", 0))), 2),
+        "Status": order.get("status"),
+        "Created At": order.get("created_at"),
+        "Time to Assign (min)": _minutes_diff(created, pickup_assigned),
+        "Time to Pickup (min)": _minutes_diff(pickup_assigned, pickup_success),
+        "Pickup Waiting (min)": _minutes_diff(pickup_arrived, pickup_success),
+        "Travel to Customer (min)": _minutes_diff(delivery_started, delivery_arrived),
+        "Dropoff Waiting (min)": _minutes_diff(delivery_arrived, delivery_success),
+        "Total Delivery Time (min)": _minutes_diff(created, delivery_success),
+    }
+
+
+def task_history_rows(data):
+    """Table rows, one order at a time."""
+    return map(task_history_row, data)
+
+
+def task_history_table(data):
+    return list(task_history_rows(data))
+
+
+def task_history_columns(cols):
+    """Vectorized task_history summary over an OrderColumns batch."""
+    n = cols.n
+    fare = round(ordered_sum(np.nan_to_num(cols.amount)), 2)
+    delivery, mask = cols.minutes("created_at", "delivery_success")
+    return {
+        "number_of_orders": n,
+        "total_fare": fare,
+        "average_fare": round(fare / n, 2) if n > 0 else 0,
+        "average_delivery_time": (
+            round(ordered_sum(delivery[mask]) / int(mask.sum()), 2) if mask.any() else 0
+        ),
+    }
+
+
+def task_history_table_columns(cols):
+    """Vectorized task_history_table: per-order durations computed column-wise."""
+
+    def minutes_column(start, end):
+        values, mask = cols.minutes(start, end)
+        return [v if ok else None for v, ok in zip(rounded(values), mask.tolist())]
+
+    durations = {
+        "Time to Assign (min)": minutes_column("created_at", "pickup_assigned"),
+        "Time to Pickup (min)": minutes_column("pickup_assigned", "pickup_success"),
+        "Pickup Waiting (min)": minutes_column("pickup_arrived", "pickup_success"),
+        "Travel to Customer (min)": minutes_column("delivery_started", "delivery_arrived"),
+        "Dropoff Waiting (min)": minutes_column("delivery_arrived", "delivery_success"),
+        "Total Delivery Time (min)": minutes_column("created_at", "delivery_success"),
+    }
+    amounts = cols.amount_rounded.tolist()
+    statuses = [cols.statuses[s] for s in cols.status_codes.tolist()]
+
+    rows = []
+    for i in range(cols.n):
+        row = {
+            "Order ID": cols.references[i],
+            "Client": cols.user_names[i],
+            "Amount": amounts[i],
+            "Status": statuses[i],
+            "Created At": cols.created_at_raw[i],
+        }
+        for key, values in durations.items():
+            row[key] = values[i]
+        rows.append(row)
+
+    return rows
+
+
+# ----------------- Table jobs (process pool, state in Redis) -----------------
+task_history_jobs = JobEngine(
+    prefix="task_history",
+    workers=config.TASK_HISTORY_WORKERS,
+    max_pending=config.TASK_HISTORY_MAX_PENDING,
+    job_ttl=config.TASK_HISTORY_JOB_TTL,
+    result_ttl=config.TASK_HISTORY_TABLE_TTL,
+)
+
+# Job state -> the status the table endpoint has always reported
+_LEGACY_STATUS = {DONE: "completed", FAILED: "failed"}
+
+
+def build_table_chunk(orders, columnar):
+    """Process-pool worker: task-history rows for a slice of orders, as JSON."""
+    if columnar:
+        return json.dumps(task_history_table_columns(OrderColumns(orders)))
+    return json.dumps(task_history_table(orders))
+
+
+def task_history_job_id(start_date, end_date, filter_by, status):
+    return job_key(
+        "task_history",
+        start_date,
+        end_date,
+        sorted(filter_by or []),
+        status.lower(),
+        config.REPORT_ENGINE,
+        _freshness_window(end_date),
+    )
+
 
-    def minutes_diff(start, end):
-        return round((end - start).total_seconds() / 60, 2) if start and end else None
+def _freshness_window(end_date):
+    # Today's orders are only cached for ORDER_CACHE_TODAY_TTL seconds, so a
+    # range reaching today (or an end date the cache can't read) gets a new
+    # job id, and with it a fresh summary, once per that interval. Past
+    # ranges are final and keep one id.
+    try:
+        if date.fromisoformat(end_date) < date.today():
+            return None
+    except (TypeError, ValueError):
+        pass
+    return int(time.time() // max(config.ORDER_CACHE_TODAY_TTL, 1))
+
+
+async def existing_task_history_summary(redis, job_id):
+    """Summary of an identical job that is queued, running or done, else None."""
+    job = await redis.hgetall(task_history_jobs.key(job_id))
+    if job.get("state") in (None, FAILED) or "summary" not in job:
+        return None
+    return json.loads(job["summary"])
+
+
+async def start_task_history_table(redis, job_id, orders, summary):
+    size = config.TASK_HISTORY_CHUNK_ORDERS
+    chunks = [orders[i:i + size] for i in range(0, len(orders), size)]
+    await task_history_jobs.submit(
+        redis,
+        job_id,
+        functools.partial(
+            build_table_chunk, columnar=config.REPORT_ENGINE == "columnar"
+        ),
+        chunks,
+        total=len(orders),
+        summary=json.dumps(summary),
+        chunk_size=size,
+    )
+
+
+async def fetch_task_history_table(redis, job_id, cursor=0, limit=None):
+    """
+    Job status plus table rows [cursor, cursor + limit) built so far (every
+    available row from `cursor` when limit is None). Only the compressed
+    chunks covering the page are read, and pages are served while the job
+    is still running; `next_cursor` is None once the table is exhausted.
+    """
+    # The job and its chunks in one round trip, assuming the configured chunk
+    # size (re-read below in the rare case the job was built with another)
+    size = config.TASK_HISTORY_CHUNK_ORDERS
+    first, last = _chunk_range(cursor, limit, size)
+    job, parts = await task_history_jobs.fetch_with_chunks(
+        redis, job_id, first, last
+    )
+    state = job.get("state")
+    total = int(job.get("total") or 0)
+    processed = int(job.get("processed") or 0)
+    stop = processed if limit is None else min(cursor + limit, processed)
+
+    try:
+        job_size = int(job["chunk_size"])
+    except (KeyError, ValueError):
+        job_size = None
+    if state is not None and job_size is None:
+        # a hash without its metadata (e.g. recreated after expiring)
+        # can't be paged: report it as failed so the client resubmits
+        state = FAILED
+        job = {**job, "state": FAILED}
+        job.setdefault("error", "job expired, resubmit the report")
 
     rows = []
-    for order in data:
-        created = parse_dt(order.get("created_at"))
-        pickup = order.get("pickup_task", {})
-        delivery = order.get("delivery_task", {})
-
-        pickup_assigned = parse_dt(pickup.get("assigned_at"))
-        pickup_arrived = parse_dt(pickup.get("arrived_at"))
-        pickup_success = parse_dt(pickup.get("successful_at"))
-
-        delivery_started = parse_dt(delivery.get("started_at"))
-        delivery_arrived = parse_dt(delivery.get("arrived_at"))
-        delivery_success = parse_dt(delivery.get("successful_at"))
-
-        rows.append(
-            {
-                "Order ID": order.get("reference"),
-                "Client": order.get("user_name"),
-                "Amount": round(abs(float(order.get("amount", 0))), 2),
-                "Status": order.get("status"),
-                "Created At": order.get("created_at"),
-                "Time to Assign (min)": minutes_diff(created, pickup_assigned),
-                "Time to Pickup (min)": minutes_diff(pickup_assigned, pickup_success),
-                "Pickup Waiting (min)": minutes_diff(pickup_arrived, pickup_success),
-                "Travel to Customer (min)": minutes_diff(
-                    delivery_started, delivery_arrived
-                ),
-                "Dropoff Waiting (min)": minutes_diff(
-                    delivery_arrived, delivery_success
-                ),
-                "Total Delivery Time (min)": minutes_diff(created, delivery_success),
-            }
-        )
-
-    # Store in Redis
-    redis_client.set(job_id, json.dumps(rows), ex=30)
+    if stop > cursor and job_size is not None:
+        if job_size != size:
+            size = job_size
+            first, last = _chunk_range(cursor, limit, size)
+            parts = await task_history_jobs.fetch_chunks(redis, job_id, first, last)
+        offset = first * size
+        rows = [row for part in parts for row in json.loads(part)]
+        rows = rows[cursor - offset:stop - offset]
+
+    next_cursor = cursor + len(rows)
+    return {
+        # unknown or expired jobs read as processing, as before
+        "status": _LEGACY_STATUS.get(state, "processing"),
+        "state": state,
+        "progress": progress(job),
+        "error": job.get("error"),
+        "total": total,
+        "cursor": cursor,
+        "next_cursor": next_cursor if next_cursor < total else None,
+        "table": rows,
+    }
+
+
+def _chunk_range(cursor, limit, size):
+    # chunks holding rows [cursor, cursor + limit), or from cursor on
+    last = -1 if limit is None else (cursor + limit - 1) // size
+    return cursor // size, last
@@ -0,0 +1,174 @@
+import json
+import math
+import os
+from collections import deque
+from functools import lru_cache
+
+import numpy as np
+
+from app import config
+
+UNKNOWN_AREA = ("Unknown", None, None)
+
+
+class AreaMatcher:
+    """
+    Aho–Corasick automaton over every lower-cased neighborhood alias in
+    areas.json. One linear pass per address finds the longest alias it
+    contains (leftmost on ties) and returns (canonical name, lat, lon).
+    """
+
+    def __init__(self, areas_data, cache_size=None):
+        # node -> {char: child}, failure link, longest alias ending here
+        self._goto = [{}]
+        self._fail = [0]
+        self._best = [None]
+
+        patterns = {}
+        for item in areas_data:
+            if "neighborhoodenglish" not in item:
+                continue
+            aliases = [alias.strip() for alias in item["neighborhoodenglish"].split(",")]
+            canonical = aliases[0]  # first alias as canonical
+            area = (canonical, item.get("centroid_y"), item.get("centroid_x"))
+            for alias in aliases:
+                if alias:
+                    # a repeated alias belongs to the last area that lists it
+                    patterns[alias.lower()] = area
+
+        for alias, area in patterns.items():
+            self._insert(alias, area)
+        self._link()
+
+        size = config.AREA_MATCH_CACHE_SIZE if cache_size is None else cache_size
+        self.match = lru_cache(maxsize=size)(self._match)
+
+    def _insert(self, alias, area):
+        node = 0
+        for ch in alias:
+            child = self._goto[node].get(ch)
+            if child is None:
+                child = len(self._goto)
+                self._goto[node][ch] = child
+                self._goto.append({})
+                self._fail.append(0)
+                self._best.append(None)
+            node = child
+        self._best[node] = (len(alias), area)
+
+    def _link(self):
+        # Breadth-first so every failure target is finished before it is used
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in self._goto[node].items():
+                fail = self._fail[node]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(ch, 0)
+                # the node's own alias is the longest suffix; otherwise inherit
+                if self._best[child] is None:
+                    self._best[child] = self._best[self._fail[child]]
+                queue.append(child)
+
+    def _match(self, address):
+        if not address:
+            return UNKNOWN_AREA
+        goto, fail, best = self._goto, self._fail, self._best
+        node = 0
+        found = None
+        for ch in address.lower():
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            hit = best[node]
+            # strictly longer only, so the leftmost alias wins on equal length
+            if hit is not None and (found is None or hit[0] > found[0]):
+                found = hit
+        return found[1] if found else UNKNOWN_AREA
+
+
+class CentroidIndex:
+    """
+    Nearest neighborhood centroid within `max_km` of a point. Centroids are
+    projected to a local km plane; areas.json has a few hundred of them, so
+    each batch of points is compared against all centroids at once.
+    """
+
+    # Points per batch: two reused CHUNK x centroids float64 buffers
+    # (~1.8 MB each for a few hundred centroids)
+    _CHUNK = 1024
+
+    def __init__(self, areas_data, max_km=None):
+        self.max_km = config.AREA_FALLBACK_MAX_KM if max_km is None else max_km
+        self.areas = []
+        for item in areas_data:
+            lat, lon = item.get("centroid_y"), item.get("centroid_x")
+            if "neighborhoodenglish" not in item or lat is None or lon is None:
+                continue
+            canonical = item["neighborhoodenglish"].split(",")[0].strip()
+            self.areas.append((canonical, lat, lon))
+
+        lat = np.array([a[1] for a in self.areas], dtype=np.float64)
+        lon = np.array([a[2] for a in self.areas], dtype=np.float64)
+        # equirectangular projection around the centroids' mean latitude
+        mean_lat = float(lat.mean()) if len(lat) else 0.0
+        self._kx = math.cos(math.radians(mean_lat)) * 111.32
+        self._ky = 110.574
+        self._x = lon * self._kx
+        self._y = lat * self._ky
+
+    def nearest_batch(self, lat, lon):
+        """
+        Index into self.areas of the closest centroid (lowest index on ties)
+        per point, -1 where nothing is within max_km or coords are NaN.
+        """
+        result = np.full(len(lat), -1, dtype=np.int64)
+        if not self.areas:
+            return result
+        x = np.asarray(lon, dtype=np.float64) * self._kx
+        y = np.asarray(lat, dtype=np.float64) * self._ky
+        limit = self.max_km * self.max_km
+        rows = min(self._CHUNK, len(x))
+        d2_buf = np.empty((rows, len(self._x)))
+        dy_buf = np.empty_like(d2_buf)
+        for start in range(0, len(x), self._CHUNK):
+            stop = min(start + self._CHUNK, len(x))
+            d2, dy = d2_buf[: stop - start], dy_buf[: stop - start]
+            np.subtract(x[start:stop, None], self._x, out=d2)
+            np.square(d2, out=d2)
+            np.subtract(y[start:stop, None], self._y, out=dy)
+            np.square(dy, out=dy)
+            d2 += dy
+            # a NaN point is NaN across its row: argmin gives 0, and the
+            # NaN distance fails the limit below
+            best = np.argmin(d2, axis=1)
+            best_d2 = d2[np.arange(len(best)), best]
+            result[start:stop] = np.where(best_d2 <= limit, best, -1)
+        return result
+
+
+# The areas.json shipped next to this module, used when AREAS_JSON_PATH is unset
+DEFAULT_AREAS_PATH = os.path.join(os.path.dirname(__file__), "areas.json")
+
+
+def _areas_path(path):
+    return path or os.getenv("AREAS_JSON_PATH") or DEFAULT_AREAS_PATH
+
+
+@lru_cache(maxsize=1)
+def _load_areas(path):
+    with open(path, "r", encoding="utf-8") as file:
+        return json.load(file)
+
+
+@lru_cache(maxsize=1)
+def get_area_matcher(path=None):
+    """The AreaMatcher for AREAS_JSON_PATH, built on first use (app startup)."""
+    return AreaMatcher(_load_areas(_areas_path(path)))
+
+
+@lru_cache(maxsize=1)
+def get_centroid_index(path=None):
+    """The CentroidIndex for AREAS_JSON_PATH, built on first use (app startup)."""
+    return CentroidIndex(_load_areas(_areas_path(path)))
@@ -1,15 +1,294 @@
+import asyncio
+import heapq
 import httpx
+import ijson
 import os
+from datetime import datetime, timedelta
+from fastapi import Request
+
+from app import config
+from app.utils.order_cache import order_cache
+from app.utils.order_filters import selects_all
+from app.utils.singleflight import SingleFlight
 
 VERDI_API_KEY = os.environ.get("VERDI_API_KEY")
 
-async def getData(start_date, end_date, filter_by):
-    # Example async API request
-    url = "https://tryverdi.com/api/transaction_data"
+# Only the fields the report services read are kept from each upstream order
+ORDER_FIELDS = {
+    "reference": None,
+    "user_name": None,
+    "amount": None,
+    "status": None,
+    "created_at": None,
+    "pickup_task": (
+        "driver_name",
+        "address",
+        "assigned_at",
+        "arrived_at",
+        "successful_at",
+        "started_at",
+        "latitude",
+        "longitude",
+    ),
+    "delivery_task": ("started_at", "arrived_at", "successful_at"),
+}
+
+# Identical concurrent getData calls (dashboard panels) share one upstream fetch
+_inflight = SingleFlight()
+
+
+def createClient():
+    # One pooled client per process: keep-alive + HTTP/2 so report calls reuse
+    # the TLS connection to the transaction API instead of re-handshaking.
+    return httpx.AsyncClient(
+        http2=config.UPSTREAM_HTTP2,
+        timeout=config.UPSTREAM_TIMEOUT,
+        limits=httpx.Limits(
+            max_connections=config.UPSTREAM_MAX_CONNECTIONS,
+            max_keepalive_connections=config.UPSTREAM_MAX_KEEPALIVE,
+            keepalive_expiry=config.UPSTREAM_KEEPALIVE_EXPIRY,
+        ),
+        headers={
+            "Authorization": f"Bearer {VERDI_API_KEY}",
+            "Accept-Encoding": "gzip, deflate",
+        },
+    )
+
+
+def get_http_client(request: Request) -> httpx.AsyncClient:
+    # FastAPI dependency: the client created in the app lifespan
+    return request.app.state.http_client
+
+
+async def getData(start_date, end_date, filter_by, client=None):
+    key = (start_date, end_date, filter_by)
+    orders = await _inflight.do(
+        key, lambda: _getDataWithClient(client, start_date, end_date, filter_by)
+    )
+    # Callers get their own list; the order dicts themselves are shared
+    return list(orders)
+
+
+async def getClientData(start_date, end_date, clients, client=None):
+    """
+    Orders for the selected clients (callers still apply their local client
+    filter). Days already cached under "all" are served from the cache;
+    with the pushdown enabled, only the missing days of a small selection
+    go upstream, one request per client with at most
+    CLIENT_FETCH_CONCURRENCY in flight. Otherwise it is a full fetch.
+    """
+    user_ids = _pushdownIds(clients)
+    if user_ids is None:
+        return await getData(start_date, end_date, "all", client)
+
+    days = _dayRange(start_date, end_date)
+    if not config.ORDER_CACHE_ENABLED or days is None:
+        return await _fetchClients(start_date, end_date, user_ids, client)
+
+    by_day, runs = await _cachedDays("all", days)
+    fetched = await asyncio.gather(
+        *(_fetchClients(run[0], run[-1], user_ids, client) for run in runs)
+    )
+    for run, orders in zip(runs, fetched):
+        by_day.update(_partitionByDay(orders, run))
+    return [order for day in days for order in by_day[day]]
+
+
+async def streamClientData(start_date, end_date, clients, client):
+    """
+    getClientData as an async generator: a pushed-down selection is small
+    and fetched as usual, a full fetch is streamed through streamData.
+    Callers still apply their local client filter.
+    """
+    if _pushdownIds(clients) is None:
+        async for order in streamData(start_date, end_date, "all", client):
+            yield order
+        return
+    for order in await getClientData(start_date, end_date, clients, client):
+        yield order
+
+
+def _pushdownIds(clients):
+    # None means fetch "all". Upstream matches user_id exactly against the
+    # display name, so the pushdown is opt-in (see config) and sends the
+    # selected names as given.
+    if selects_all(clients):
+        return None
+    user_ids = list(dict.fromkeys(clients))
+    if len(user_ids) > config.CLIENT_PUSHDOWN_MAX_CLIENTS:
+        return None
+    return user_ids
+
+
+async def _fetchClients(start_date, end_date, user_ids, client):
+    semaphore = asyncio.BoundedSemaphore(config.CLIENT_FETCH_CONCURRENCY)
+
+    async def fetchClient(user_id):
+        async with semaphore:
+            return await getData(start_date, end_date, user_id, client)
+
+    per_client = await asyncio.gather(*(fetchClient(u) for u in user_ids))
+    # Keep the created_at order a full fetch would have returned
+    return list(
+        heapq.merge(*per_client, key=lambda order: order.get("created_at") or "")
+    )
+
+
+async def _getDataWithClient(client, start_date, end_date, filter_by):
+    # Fallback for callers outside a request (scripts, jobs)
+    if client is None:
+        async with createClient() as client:
+            return await _getData(client, start_date, end_date, filter_by)
+    return await _getData(client, start_date, end_date, filter_by)
+
+
+async def _getData(client, start_date, end_date, filter_by):
+    days = _dayRange(start_date, end_date)
+    if not config.ORDER_CACHE_ENABLED or days is None:
+        return await _fetch(client, start_date, end_date, filter_by)
+
+    # Serve covered days from the cache, fetch only the missing runs of days
+    by_day, runs = await _cachedDays(filter_by, days)
+    fetched = await asyncio.gather(
+        *(_fetch(client, run[0], run[-1], filter_by) for run in runs)
+    )
+    for run, orders in zip(runs, fetched):
+        by_day.update(await _storeRun(filter_by, run, orders))
+
+    return [order for day in days for order in by_day[day]]
+
+
+async def streamData(start_date, end_date, filter_by, client):
+    """
+    Async generator over projected orders. Cached days are replayed from
+    memory, missing runs of days are parsed one order at a time from the
+    HTTP body and cached afterwards, unless a run outgrows the whole cache,
+    in which case it is streamed without being kept.
+    """
+    days = _dayRange(start_date, end_date)
+    if not config.ORDER_CACHE_ENABLED or days is None:
+        async for order in _streamOrders(client, start_date, end_date, filter_by):
+            yield order
+        return
+
+    by_day, runs = await _cachedDays(filter_by, days)
+    run_at = {run[0]: run for run in runs}
+    for day in days:
+        if day in by_day:
+            for order in by_day[day]:
+                yield order
+            continue
+        run = run_at.get(day)
+        if run is None:  # inside a run already streamed
+            continue
+        kept = []
+        async for order in _streamOrders(client, run[0], run[-1], filter_by):
+            if kept is not None:
+                kept.append(order)
+                if len(kept) > order_cache.max_orders:
+                    kept = None
+            yield order
+        if kept is not None:
+            await _storeRun(filter_by, run, kept)
+
+
+async def _cachedDays(filter_by, days):
+    # Cached days, plus the contiguous runs of missing days to fetch
+    by_day = await order_cache.get_many(filter_by, days)
+    return by_day, _contiguousRuns([d for d in days if d not in by_day])
+
+
+async def _storeRun(filter_by, run, orders):
+    # A fetched run's orders, cached per day; returns them by day
+    partitioned = _partitionByDay(orders, run)
+    for day in run:
+        await order_cache.put(filter_by, day, partitioned[day])
+    return partitioned
+
+
+async def _fetch(client, start_date, end_date, filter_by):
+    if config.UPSTREAM_STREAMING:
+        return [
+            order
+            async for order in _streamOrders(client, start_date, end_date, filter_by)
+        ]
+
     params = {"start_date": start_date, "end_date": end_date, "user_id": filter_by}
-    headers = {"Authorization": f"Bearer {VERDI_API_KEY}"}
+    response = await client.get(config.VERDI_API_URL, params=params)
+    response.raise_for_status()
+    return [projectOrder(order) for order in response.json()]
 
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        response = await client.get(url, params=params, headers=headers)
+
+async def _streamOrders(client, start_date, end_date, filter_by):
+    params = {"start_date": start_date, "end_date": end_date, "user_id": filter_by}
+    async with client.stream("GET", config.VERDI_API_URL, params=params) as response:
         response.raise_for_status()
-        return response.json()
+        orders = ijson.items_async(_BodyReader(response), "item", use_float=True)
+        async for order in orders:
+            yield projectOrder(order)
+
+
+class _BodyReader:
+    # Minimal async file-like wrapper so ijson can pull decoded body chunks
+    def __init__(self, response):
+        self._chunks = response.aiter_bytes()
+
+    async def read(self, size=-1):
+        # ijson probes with read(0) to detect bytes vs str
+        if size == 0:
+            return b""
+        # b"" means EOF to ijson, so skip empty chunks from the decoder
+        async for chunk in self._chunks:
+            if chunk:
+                return chunk
+        return b""
+
+
+def projectOrder(order):
+    projected = {}
+    for field, subfields in ORDER_FIELDS.items():
+        if field not in order:
+            continue
+        value = order[field]
+        if subfields is not None and isinstance(value, dict):
+            value = {k: value[k] for k in subfields if k in value}
+        projected[field] = value
+    return projected
+
+
+# ----------------- Day helpers -----------------
+def _dayRange(start_date, end_date):
+    # Only plain YYYY-MM-DD ranges are cacheable; anything else goes upstream as-is
+    try:
+        start = datetime.strptime(start_date, "%Y-%m-%d").date()
+        end = datetime.strptime(end_date, "%Y-%m-%d").date()
+    except (TypeError, ValueError):
+        return None
+    if end < start:
+        return None
+    return [
+        (start + timedelta(days=i)).isoformat() for i in range((end - start).days + 1)
+    ]
+
+
+def _contiguousRuns(days):
+    runs = []
+    for day in days:
+        if runs and _nextDay(runs[-1][-1]) == day:
+            runs[-1].append(day)
+        else:
+            runs.append([day])
+    return runs
+
+
+def _nextDay(day):
+    return (datetime.strptime(day, "%Y-%m-%d") + timedelta(days=1)).strftime("%Y-%m-%d")
+
+
+def _partitionByDay(orders, run):
+    partitioned = {day: [] for day in run}
+    for order in orders:
+        day = (order.get("created_at") or "")[:10]
+        # Orders without a usable created_at stay with the run's first day
+        partitioned.get(day, partitioned[run[0]]).append(order)
+    return partitioned
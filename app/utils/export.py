@@ -0,0 +1,130 @@
+import csv
+import io
+import json
+
+from fastapi.responses import StreamingResponse
+
+from app import config
+
+MEDIA_TYPES = {"csv": "text/csv; charset=utf-8", "ndjson": "application/x-ndjson"}
+
+
+def _cell(value):
+    # nested values (e.g. an area's "Top Clients") go into one CSV cell as JSON
+    return json.dumps(value) if isinstance(value, (list, dict)) else value
+
+
+def _csv_encoder():
+    # batch of dict rows -> CSV text; the first batch carries the header
+    fieldnames = None
+
+    def encode(batch):
+        nonlocal fieldnames
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=fieldnames or list(batch[0]))
+        if fieldnames is None:
+            fieldnames = writer.fieldnames
+            writer.writeheader()
+        for row in batch:
+            writer.writerow({key: _cell(value) for key, value in row.items()})
+        return buffer.getvalue()
+
+    return encode
+
+
+def _ndjson_encoder():
+    def encode(batch):
+        return "".join(json.dumps(row) + "\n" for row in batch)
+
+    return encode
+
+
+ENCODERS = {"csv": _csv_encoder, "ndjson": _ndjson_encoder}
+
+
+def _batches(rows, batch_rows):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == batch_rows:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+async def _async_batches(rows, batch_rows):
+    batch = []
+    async for row in rows:
+        batch.append(row)
+        if len(batch) == batch_rows:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def export_chunks(rows, fmt, batch_rows=None):
+    """
+    Dict rows (sharing the first row's keys) as CSV or NDJSON text,
+    `batch_rows` rows per chunk, so only one batch is ever buffered. `rows`
+    may be an iterable or an async iterable; the chunks follow suit.
+    """
+    batch_rows = batch_rows or config.EXPORT_BATCH_ROWS
+    encode = ENCODERS[fmt]()
+    if hasattr(rows, "__aiter__"):
+        return _encode_async(encode, _async_batches(rows, batch_rows))
+    return map(encode, _batches(rows, batch_rows))
+
+
+async def _encode_async(encode, batches):
+    async for batch in batches:
+        yield encode(batch)
+
+
+def csv_chunks(rows, batch_rows=None):
+    """Dict rows as CSV text, a header and then `batch_rows` rows per chunk."""
+    return export_chunks(rows, "csv", batch_rows)
+
+
+def ndjson_chunks(rows, batch_rows=None):
+    """Dict rows as newline-delimited JSON, `batch_rows` lines per chunk."""
+    return export_chunks(rows, "ndjson", batch_rows)
+
+
+def export_response(rows, fmt, filename):
+    """
+    Stream `rows` as a CSV or NDJSON download. The chunk generator is
+    synchronous, so Starlette runs it in its threadpool and only pulls the
+    next chunk once the previous one has been sent (backpressure).
+    """
+    return _download(export_chunks(rows, fmt), fmt, filename)
+
+
+async def export_response_async(rows, fmt, filename):
+    """
+    export_response for an async iterable of rows, consumed on the event
+    loop. The first chunk is produced before the response starts, so an
+    upstream error still fails the request instead of truncating a 200.
+    """
+    chunks = export_chunks(rows, fmt)
+    try:
+        first = [await chunks.__anext__()]
+    except StopAsyncIteration:
+        first = []
+
+    async def body():
+        for chunk in first:
+            yield chunk
+        async for chunk in chunks:
+            yield chunk
+
+    return _download(body(), fmt, filename)
+
+
+def _download(chunks, fmt, filename):
+    return StreamingResponse(
+        chunks,
+        media_type=MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{fmt}"'},
+    )
@@ -1,10 +1,9 @@
 import json
 import os
 import firebase_admin
-from firebase_admin import credentials, firestore
+from firebase_admin import credentials, firestore, firestore_async
 
-# Initialize Firebase Admin once per process and expose a Firestore client.
-def get_db():
+def _init_app():
     if not firebase_admin._apps:
         creds_json = os.environ.get("FIREBASE_CREDENTIALS")
         if not creds_json:
@@ -12,7 +11,17 @@ def get_db():
         cred_dict = json.loads(creds_json)
         cred = credentials.Certificate(cred_dict)
         firebase_admin.initialize_app(cred)
+
+# Initialize Firebase Admin once per process and expose a Firestore client.
+def get_db():
+    _init_app()
     return firestore.client()
 
-# Convenience singleton
+# Same app, asyncio client: queries run on the event loop instead of a worker thread
+def get_async_db():
+    _init_app()
+    return firestore_async.client()
+
+# Convenience singletons (the sync client also serves snapshot listeners)
 db = get_db()
+async_db = get_async_db()
@@ -0,0 +1,191 @@
+import asyncio
+import base64
+import hashlib
+import json
+import logging
+import multiprocessing
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+# Job lifecycle, stored in the job's Redis hash
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+logger = logging.getLogger(__name__)
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+def job_key(*params):
+    """Stable id for a job's parameters: identical requests share one job."""
+    raw = json.dumps(params, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode()).hexdigest()[:32]
+
+
+def _encode_chunk(fn, chunk):
+    # Runs in the worker: the compressed result is what crosses the process
+    # boundary. base64 because the shared Redis client decodes responses.
+    return base64.b64encode(zlib.compress(fn(chunk).encode())).decode("ascii")
+
+
+def decode_chunk(raw):
+    """A stored chunk back to the string `fn` returned for it."""
+    return zlib.decompress(base64.b64decode(raw)).decode()
+
+
+class JobEngine:
+    """
+    Runs CPU-heavy report jobs on a fixed-size process pool. A job is a list
+    of chunks mapped through a picklable `fn`, one chunk at a time, so its
+    progress advances as chunks finish. Each chunk's result (a string) is
+    compressed and appended to a Redis list as soon as it is done, so readers
+    can page through a job while it is still running. At most `workers` jobs
+    run at once and at most `max_pending` are accepted per process; state and
+    progress live in the hash `<prefix>:<job_id>`, results in `...:chunks`.
+    """
+
+    def __init__(self, prefix, workers, max_pending, job_ttl, result_ttl):
+        self.prefix = prefix
+        self.workers = workers
+        self.max_pending = max_pending
+        self.job_ttl = job_ttl
+        self.result_ttl = result_ttl
+        self._pool = None
+        self._slots = None
+        self._tasks = {}  # running/queued task -> (redis, job_id)
+
+    def start(self):
+        # spawn, not fork: the API process has gRPC/listener threads running
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+        self._slots = asyncio.Semaphore(self.workers)
+
+    async def shutdown(self):
+        tasks = dict(self._tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        # a job cancelled before it started never ran its own cleanup
+        for task, (redis, job_id) in tasks.items():
+            if task.cancelled():
+                await redis.delete(self.key(job_id), self.chunks_key(job_id))
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def key(self, job_id):
+        return f"{self.prefix}:{job_id}"
+
+    def chunks_key(self, job_id):
+        return f"{self.prefix}:{job_id}:chunks"
+
+    # ----------------- Submitting -----------------
+    async def submit(self, redis, job_id, fn, chunks, total, **meta):
+        """
+        Queue `fn` over `chunks` (`total` items in all) unless an identical
+        job is already queued, running or done; returns True if queued here.
+        `meta` is stored on the job (e.g. a summary for later duplicates).
+        """
+        if len(self._tasks) >= self.max_pending:
+            raise JobQueueFull(f"{len(self._tasks)} jobs already pending")
+        key = self.key(job_id)
+        # claim the id atomically; a failed job may be retried
+        if not await redis.hsetnx(key, "state", QUEUED):
+            if await redis.hget(key, "state") != FAILED:
+                return False
+            await redis.delete(key, self.chunks_key(job_id))
+            if not await redis.hsetnx(key, "state", QUEUED):
+                return False
+        job = {"total": total, **meta}
+        async with redis.pipeline(transaction=False) as pipe:
+            self._set_state(pipe, key, job, self.job_ttl, state=QUEUED, processed=0)
+            await pipe.execute()
+
+        task = asyncio.create_task(self._run(redis, job_id, fn, chunks, job))
+        self._tasks[task] = (redis, job_id)
+        task.add_done_callback(lambda done: self._tasks.pop(done, None))
+        return True
+
+    @staticmethod
+    def _set_state(pipe, key, job, ttl, **fields):
+        # The whole hash (total and meta included) with a fresh TTL on every
+        # change, so a hash that expired mid-run comes back complete.
+        pipe.hset(key, mapping={**job, **fields})
+        pipe.expire(key, ttl)
+
+    async def _run(self, redis, job_id, fn, chunks, job):
+        key = self.key(job_id)
+        chunks_key = self.chunks_key(job_id)
+        loop = asyncio.get_running_loop()
+        try:
+            async with self._slots:
+                async with redis.pipeline(transaction=False) as pipe:
+                    self._set_state(
+                        pipe, key, job, self.job_ttl, state=RUNNING, processed=0
+                    )
+                    await pipe.execute()
+                processed = 0
+                for written, chunk in enumerate(chunks, start=1):
+                    part = await loop.run_in_executor(
+                        self._pool, _encode_chunk, fn, chunk
+                    )
+                    processed += len(chunk)
+                    # chunk and progress land together: readable right away
+                    async with redis.pipeline(transaction=False) as pipe:
+                        pipe.rpush(chunks_key, part)
+                        pipe.expire(chunks_key, self.job_ttl)
+                        self._set_state(
+                            pipe,
+                            key,
+                            job,
+                            self.job_ttl,
+                            state=RUNNING,
+                            processed=processed,
+                        )
+                        length = (await pipe.execute())[0]
+                    if length != written:
+                        # the list expired under a very slow chunk
+                        raise RuntimeError("earlier results expired while running")
+            async with redis.pipeline(transaction=False) as pipe:
+                self._set_state(
+                    pipe, key, job, self.result_ttl, state=DONE, processed=job["total"]
+                )
+                pipe.expire(chunks_key, self.result_ttl)
+                await pipe.execute()
+        except asyncio.CancelledError:
+            await redis.delete(key, chunks_key)
+            raise
+        except Exception as exc:
+            logger.exception("job %s failed", key)
+            async with redis.pipeline(transaction=False) as pipe:
+                self._set_state(
+                    pipe, key, job, self.job_ttl, state=FAILED, error=repr(exc)
+                )
+                await pipe.execute()
+
+    # ----------------- Polling -----------------
+    async def fetch(self, redis, job_id):
+        """The job's hash ({} if unknown or expired)."""
+        return await redis.hgetall(self.key(job_id))
+
+    async def fetch_chunks(self, redis, job_id, first, last):
+        """Decoded results of chunks first..last (inclusive) written so far."""
+        raw = await redis.lrange(self.chunks_key(job_id), first, last)
+        return [decode_chunk(part) for part in raw]
+
+    async def fetch_with_chunks(self, redis, job_id, first, last):
+        """fetch() and fetch_chunks() in one round trip: (hash, chunks)."""
+        async with redis.pipeline(transaction=False) as pipe:
+            pipe.hgetall(self.key(job_id))
+            pipe.lrange(self.chunks_key(job_id), first, last)
+            job, raw = await pipe.execute()
+        return job, [decode_chunk(part) for part in raw]
+
+
+def progress(job):
+    """Percent of the job's items processed (0 for an unknown job)."""
+    total = int(job.get("total") or 0)
+    if job.get("state") == DONE:
+        return 100.0
+    return round(100 * int(job.get("processed") or 0) / total, 1) if total else 0.0
@@ -0,0 +1,92 @@
+import json
+import time
+from collections import OrderedDict
+from datetime import date
+
+from app import config
+
+
+class OrderCache:
+    """
+    Orders cached per calendar day, keyed by (filter_by, "YYYY-MM-DD").
+    Tier 1 is an in-process LRU bounded by total order count; tier 2 is an
+    optional Redis tier so several uvicorn workers share fetched days (the
+    app lifespan attaches the shared client when ORDER_CACHE_REDIS is on).
+    """
+
+    def __init__(self, max_orders, ttl, today_ttl, redis_client=None):
+        self.max_orders = max_orders
+        self.ttl = ttl
+        self.today_ttl = today_ttl
+        self.redis = redis_client
+        self._entries = OrderedDict()  # key -> (expires_at, orders)
+        self._size = 0
+
+    def ttl_for(self, day):
+        # Today (and anything later) is still changing, past days are final
+        return self.today_ttl if day >= date.today().isoformat() else self.ttl
+
+    async def get_many(self, filter_by, days):
+        hits = {}
+        now = time.monotonic()
+        for day in days:
+            key = (filter_by, day)
+            entry = self._entries.get(key)
+            if entry is None:
+                continue
+            expires_at, orders = entry
+            if expires_at <= now:
+                self._drop(key)
+                continue
+            self._entries.move_to_end(key)
+            hits[day] = orders
+
+        missing = [d for d in days if d not in hits]
+        if self.redis is not None and missing:
+            values = await self.redis.mget([_redis_key(filter_by, d) for d in missing])
+            for day, raw in zip(missing, values):
+                if raw is None:
+                    continue
+                orders = json.loads(raw)
+                self._store(filter_by, day, orders)
+                hits[day] = orders
+
+        return hits
+
+    async def put(self, filter_by, day, orders):
+        self._store(filter_by, day, orders)
+        if self.redis is not None:
+            await self.redis.set(
+                _redis_key(filter_by, day), json.dumps(orders), ex=self.ttl_for(day)
+            )
+
+    def _store(self, filter_by, day, orders):
+        key = (filter_by, day)
+        if key in self._entries:
+            self._drop(key)
+        self._entries[key] = (time.monotonic() + self.ttl_for(day), orders)
+        self._size += len(orders)
+        # LRU eviction by total number of cached orders
+        while self._size > self.max_orders and len(self._entries) > 1:
+            oldest = next(iter(self._entries))
+            self._drop(oldest)
+
+    def _drop(self, key):
+        _, orders = self._entries.pop(key)
+        self._size -= len(orders)
+
+    def clear(self):
+        self._entries.clear()
+        self._size = 0
+
+
+def _redis_key(filter_by, day):
+    return f"orders:{filter_by}:{day}"
+
+
+# Convenience singleton
+order_cache = OrderCache(
+    max_orders=config.ORDER_CACHE_MAX_ORDERS,
+    ttl=config.ORDER_CACHE_TTL,
+    today_ttl=config.ORDER_CACHE_TODAY_TTL,
+)
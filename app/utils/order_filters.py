@@ -0,0 +1,118 @@
+from datetime import datetime
+
+from app.utils.timestamps import order_times, seconds_of_day, time_to_seconds
+
+# Each builder normalizes its filter values once and returns a predicate
+# order -> bool, or None when the filter does not restrict anything.
+
+
+def selects_all(values):
+    return not values or any(v.lower() == "all" for v in values)
+
+
+def driver_filter(filter_by):
+    """Match on the upper-cased last word of pickup_task.driver_name."""
+    if selects_all(filter_by):
+        return None
+    wanted = frozenset(f.upper() for f in filter_by)
+
+    def predicate(order):
+        name = (order.get("pickup_task", {}).get("driver_name") or "").strip()
+        return bool(name) and name.split(" ")[-1].upper() in wanted
+
+    return predicate
+
+
+def client_filter(filter_by):
+    """Case-insensitive match on the stripped user_name."""
+    if selects_all(filter_by):
+        return None
+    wanted = frozenset(f.lower() for f in filter_by)
+
+    def predicate(order):
+        name = (order.get("user_name") or "").strip()
+        return bool(name) and name.lower() in wanted
+
+    return predicate
+
+
+def area_filter(areas):
+    """Case-insensitive match on the "area" set by formatAreas."""
+    if selects_all(areas):
+        return None
+    wanted = frozenset(a.strip().lower() for a in areas)
+
+    def predicate(order):
+        area = order.get("area")
+        return bool(area) and area.strip().lower() in wanted
+
+    return predicate
+
+
+def status_filter(status):
+    if status.lower() == "all":
+        return None
+    wanted = status.lower()
+
+    def predicate(order):
+        return str(order.get("status", "")).lower() == wanted
+
+    return predicate
+
+
+def time_window_filter(start_time, end_time, overnight=True):
+    """
+    created_at time of day within [start_time, end_time] ("HH:MM"). A window
+    with start > end wraps midnight (e.g. 22:00–02:00) unless `overnight`
+    is off, in which case it matches nothing.
+    """
+    start_s = time_to_seconds(datetime.strptime(start_time, "%H:%M").time())
+    end_s = time_to_seconds(datetime.strptime(end_time, "%H:%M").time())
+
+    def predicate(order):
+        created = order_times(order)["created_at"]
+        if created is None:
+            return False
+        t = seconds_of_day(created)
+        if start_s <= end_s:
+            return start_s <= t <= end_s
+        return overnight and (t >= start_s or t <= end_s)
+
+    return predicate
+
+
+# ----------------- Pipeline -----------------
+def compile_filters(*predicates):
+    """AND the given predicates (None entries are ignored) into one, or None."""
+    predicates = tuple(p for p in predicates if p is not None)
+    if not predicates:
+        return None
+    if len(predicates) == 1:
+        return predicates[0]
+
+    def combined(order):
+        for predicate in predicates:
+            if not predicate(order):
+                return False
+        return True
+
+    return combined
+
+
+def apply_filters(data, *predicates):
+    """
+    Single lazy pass over `data` keeping orders that pass every predicate;
+    `data` is returned untouched when nothing filters.
+    """
+    predicate = compile_filters(*predicates)
+    if predicate is None:
+        return data
+    return (order for order in data if predicate(order))
+
+
+async def apply_filters_async(data, *predicates):
+    """apply_filters over an async iterable of orders (always lazy)."""
+    predicate = compile_filters(*predicates)
+    async for order in data:
+        if predicate is None or predicate(order):
+            yield order
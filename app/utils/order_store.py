@@ -0,0 +1,210 @@
+import numpy as np
+
+from app.utils.stats import sketch_values
+from app.utils.timestamps import NAT, TIMESTAMP_FIELDS, order_times
+
+
+class OrderColumns:
+    """
+    A fetched batch of orders converted once into column arrays:
+    amounts, int64 epoch-second timestamps, dictionary-encoded
+    driver/client/area/status codes and pickup coordinates.
+    """
+
+    def __init__(self, orders):
+        orders = orders if isinstance(orders, list) else list(orders)
+        self.n = len(orders)
+
+        pickups = [order.get("pickup_task") or {} for order in orders]
+
+        # ----------------- Amounts -----------------
+        # abs(amount); NaN where the value can't be parsed
+        self.amount = np.fromiter(
+            (_to_float(order.get("amount")) for order in orders),
+            dtype=np.float64,
+            count=self.n,
+        )
+        # per-order round(amount, 2) as the table rows sum it
+        self.amount_rounded = np.array(
+            rounded(np.nan_to_num(self.amount)), dtype=np.float64
+        )
+
+        # ----------------- Timestamps -----------------
+        # the same parser and per-order cache as the dict reports
+        times = [order_times(order) for order in orders]
+        self.ts = {
+            name: np.fromiter(
+                (NAT if t[name] is None else t[name] for t in times),
+                dtype=np.int64,
+                count=self.n,
+            )
+            for name, _, _ in TIMESTAMP_FIELDS
+        }
+
+        # ----------------- Dictionary-encoded labels -----------------
+        self.driver_codes, self.drivers = _encode(
+            task.get("driver_name") for task in pickups
+        )
+        self.client_codes, self.clients = _encode(
+            order.get("user_name", "Unknown") for order in orders
+        )
+        self.area_codes, self.areas = _encode(
+            order.get("area", "Unknown") for order in orders
+        )
+        self.status_codes, self.statuses = _encode(
+            order.get("status") for order in orders
+        )
+
+        # ----------------- Coordinates -----------------
+        self.pickup_lat = float_column(task.get("latitude") for task in pickups)
+        self.pickup_lng = float_column(task.get("longitude") for task in pickups)
+        # area centroids attached by formatAreas
+        self.area_lat = float_column(order.get("latitude") for order in orders)
+        self.area_lng = float_column(order.get("longitude") for order in orders)
+
+        # ----------------- Pass-through columns (task history rows) -----------------
+        self.references = [order.get("reference") for order in orders]
+        self.user_names = [order.get("user_name") for order in orders]
+        self.created_at_raw = [order.get("created_at") for order in orders]
+
+    def has(self, name):
+        return self.ts[name] != NAT
+
+    def minutes(self, start, end):
+        """(end - start) in minutes and the mask of orders where both are set."""
+        mask = self.has(start) & self.has(end)
+        diff = np.where(mask, self.ts[end] - self.ts[start], 0) / 60
+        return diff, mask
+
+
+# ----------------- Vectorized group-by helpers -----------------
+def recode(codes, labels, key):
+    """
+    Map category labels through `key` and merge categories that collide.
+    `key` returning None drops the category (code -1). Groups keep the
+    order in which their first order appeared.
+    """
+    index = {}
+    # one spare slot so codes that are already -1 keep mapping to -1
+    mapping = np.full(len(labels) + 1, -1, dtype=np.int64)
+    for i, label in enumerate(labels):
+        derived = key(label)
+        if derived is None:
+            continue
+        mapping[i] = index.setdefault(derived, len(index))
+    return mapping[codes], list(index)
+
+
+def ordered_sum(values):
+    """
+    Left-to-right float sum, the order the per-order loops add in. np.sum
+    adds pairwise, which can move a total rounded to cents by 0.01.
+    """
+    return float(np.add.accumulate(values)[-1]) if len(values) else 0.0
+
+
+def group_count(codes, ngroups, mask=None):
+    valid = codes >= 0 if mask is None else (codes >= 0) & mask
+    return np.bincount(codes[valid], minlength=ngroups)
+
+
+def group_sum(codes, values, ngroups, mask=None):
+    valid = codes >= 0 if mask is None else (codes >= 0) & mask
+    return np.bincount(codes[valid], weights=values[valid], minlength=ngroups)
+
+
+def group_mean(codes, values, ngroups, mask, empty=None):
+    """Per-group round(mean, 2) of values[mask]; `empty` where nothing matched."""
+    sums = group_sum(codes, values, ngroups, mask)
+    counts = group_count(codes, ngroups, mask)
+    return [
+        round(s / c, 2) if c else empty for s, c in zip(sums.tolist(), counts.tolist())
+    ]
+
+
+def group_percentiles(codes, values, ngroups, mask, percentiles):
+    """
+    Per-group percentiles of values[mask] through the same bucket mapping as
+    QuantileSketch: {p: [round(value, 2) or None per group]}.
+    """
+    valid = (codes >= 0) & mask
+    group_codes = codes[valid]
+    bucketed = sketch_values(values[valid])
+    order = np.lexsort((bucketed, group_codes))
+    bucketed = bucketed[order]
+    counts = np.bincount(group_codes, minlength=ngroups)
+    starts = np.cumsum(counts) - counts
+
+    result = {}
+    for p in percentiles:
+        ranks = np.floor(p / 100 * (counts - 1)).astype(np.int64)
+        result[p] = [
+            round(float(bucketed[start + rank]), 2) if n else None
+            for start, rank, n in zip(starts.tolist(), ranks.tolist(), counts.tolist())
+        ]
+    return result
+
+
+def first_index(codes, ngroups):
+    """Index of the first order in each group (n for empty groups)."""
+    first = np.full(ngroups, len(codes), dtype=np.int64)
+    valid = codes >= 0
+    np.minimum.at(first, codes[valid], np.nonzero(valid)[0])
+    return first
+
+
+def top_pairs(outer, inner, ngroups, ninner, k):
+    """
+    For every outer group, the k most frequent inner codes as
+    (inner_code, count) pairs. Ties keep first-appearance order, matching
+    heapq.nlargest / sorted(reverse=True) over an insertion-ordered dict.
+    """
+    valid = (outer >= 0) & (inner >= 0)
+    pairs = outer[valid] * ninner + inner[valid]
+    positions = np.nonzero(valid)[0]
+    uniq, first_pos, counts = np.unique(pairs, return_index=True, return_counts=True)
+    first_seen = positions[first_pos]
+    pair_outer = uniq // ninner
+    order = np.lexsort((first_seen, -counts, pair_outer))
+
+    result = [[] for _ in range(ngroups)]
+    for i in order.tolist():
+        group = result[int(pair_outer[i])]
+        if len(group) < k:
+            group.append((int(uniq[i] % ninner), int(counts[i])))
+    return result
+
+
+# ----------------- Conversion helpers -----------------
+def rounded(values, digits=2):
+    """
+    round(v, digits) of every value, as a list. Python's round is correctly
+    rounded, np.round is not, so this stays scalar.
+    """
+    return [round(v, digits) for v in values.tolist()]
+
+
+def _encode(values):
+    index = {}
+    codes = np.fromiter(
+        (index.setdefault(v, len(index)) for v in values), dtype=np.int64
+    )
+    return codes, list(index)
+
+
+def _to_float(value):
+    try:
+        return abs(float(value))
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def float_column(values):
+    return np.fromiter((_to_float_or_nan(v) for v in values), dtype=np.float64)
+
+
+def _to_float_or_nan(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
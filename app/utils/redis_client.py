@@ -0,0 +1,26 @@
+import os
+
+import redis.asyncio as aioredis
+from fastapi import Request
+
+from app import config
+
+
+def createRedis():
+    # One connection pool per process, shared by the order cache and the
+    # task-history jobs; connections are opened lazily and reused.
+    pool = aioredis.ConnectionPool(
+        host=os.environ.get("REDIS_HOST"),
+        port=os.environ.get("REDIS_PORT", "6379"),
+        decode_responses=True,
+        username="default",
+        password=os.environ.get("REDIS_PASSWORD"),
+        max_connections=config.REDIS_MAX_CONNECTIONS,
+    )
+    # from_pool: closing the client also disconnects the pool
+    return aioredis.Redis.from_pool(pool)
+
+
+def get_redis(request: Request) -> aioredis.Redis:
+    # FastAPI dependency: the client created in the app lifespan
+    return request.app.state.redis
@@ -0,0 +1,33 @@
+from typing import Any
+
+from fastapi.responses import JSONResponse
+
+from app import config
+
+try:
+    import orjson
+except ImportError:  # optional: fall back to the standard library encoder
+    orjson = None
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON response rendered with orjson when it is installed and
+    JSON_RESPONSE is "orjson" (NumPy scalars/arrays included), else with
+    json.dumps exactly like Starlette's JSONResponse.
+    """
+
+    def render(self, content: Any) -> bytes:
+        if orjson is not None and config.JSON_RESPONSE == "orjson":
+            return orjson.dumps(
+                content, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+            )
+        return super().render(content)
+
+
+def json_response(content: Any, status_code: int = 200) -> FastJSONResponse:
+    """
+    Return this from an endpoint whose content is already plain dicts, lists
+    and scalars: FastAPI sends a Response as-is, skipping jsonable_encoder.
+    """
+    return FastJSONResponse(content, status_code=status_code)
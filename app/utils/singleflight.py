@@ -0,0 +1,20 @@
+import asyncio
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key: the first caller starts the
+    work, everyone arriving while it is in flight awaits the same task.
+    """
+
+    def __init__(self):
+        self._inflight = {}
+
+    async def do(self, key, fn):
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # shield: one caller disconnecting must not cancel the shared fetch
+        return await asyncio.shield(task)
@@ -0,0 +1,142 @@
+import math
+
+import numpy as np
+
+from app import config
+
+# Values closer to zero than this go to the sketch's zero bucket
+_MIN_INDEXABLE = 1e-9
+
+
+class QuantileSketch:
+    """
+    Mergeable quantile sketch with relative accuracy `alpha` (DDSketch-style
+    logarithmic buckets). Memory grows with log(max / min) of the values,
+    not with how many were added.
+    """
+
+    __slots__ = ("gamma", "_log_gamma", "positive", "negative", "zero", "count")
+
+    def __init__(self, alpha=None):
+        alpha = config.PERCENTILE_ACCURACY if alpha is None else alpha
+        self.gamma = (1 + alpha) / (1 - alpha)
+        self._log_gamma = math.log(self.gamma)
+        self.positive = {}
+        self.negative = {}
+        self.zero = 0
+        self.count = 0
+
+    def add(self, x):
+        self.count += 1
+        if x > _MIN_INDEXABLE:
+            k = math.ceil(math.log(x) / self._log_gamma)
+            self.positive[k] = self.positive.get(k, 0) + 1
+        elif x < -_MIN_INDEXABLE:
+            k = math.ceil(math.log(-x) / self._log_gamma)
+            self.negative[k] = self.negative.get(k, 0) + 1
+        else:
+            self.zero += 1
+
+    def merge(self, other):
+        for k, n in other.positive.items():
+            self.positive[k] = self.positive.get(k, 0) + n
+        for k, n in other.negative.items():
+            self.negative[k] = self.negative.get(k, 0) + n
+        self.zero += other.zero
+        self.count += other.count
+
+    def quantile(self, q):
+        """Value at quantile q (0..1), or None when empty."""
+        if not self.count:
+            return None
+        rank = math.floor(q * (self.count - 1))
+        seen = 0
+        for k in sorted(self.negative, reverse=True):
+            seen += self.negative[k]
+            if seen > rank:
+                return -self._value(k)
+        seen += self.zero
+        if seen > rank:
+            return 0.0
+        for k in sorted(self.positive):
+            seen += self.positive[k]
+            if seen > rank:
+                return self._value(k)
+        return self._value(max(self.positive))
+
+    def _value(self, k):
+        # midpoint (in relative terms) of bucket (gamma^(k-1), gamma^k]
+        return 2 * self.gamma**k / (self.gamma + 1)
+
+
+class RunningStats:
+    """
+    Constant-memory accumulator: count, sum, Welford mean/variance, min/max
+    and optionally a QuantileSketch for percentiles. Mergeable.
+    """
+
+    __slots__ = ("count", "total", "_mean", "_m2", "min", "max", "sketch")
+
+    def __init__(self, quantiles=False):
+        self.count = 0
+        self.total = 0
+        self._mean = 0.0
+        self._m2 = 0.0
+        self.min = None
+        self.max = None
+        self.sketch = QuantileSketch() if quantiles else None
+
+    def add(self, x):
+        self.count += 1
+        self.total += x
+        delta = x - self._mean
+        self._mean += delta / self.count
+        self._m2 += delta * (x - self._mean)
+        self.min = x if self.min is None or x < self.min else self.min
+        self.max = x if self.max is None or x > self.max else self.max
+        if self.sketch is not None:
+            self.sketch.add(x)
+
+    def merge(self, other):
+        if not other.count:
+            return
+        n = self.count + other.count
+        delta = other._mean - self._mean
+        self._m2 += other._m2 + delta * delta * self.count * other.count / n
+        self._mean += delta * other.count / n
+        self.count = n
+        self.total += other.total
+        self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = other.max if self.max is None else max(self.max, other.max)
+        if self.sketch is not None and other.sketch is not None:
+            self.sketch.merge(other.sketch)
+
+    def mean(self, empty=None):
+        # From the running sum so report averages match the summed-list version
+        return round(self.total / self.count, 2) if self.count else empty
+
+    def variance(self):
+        return self._m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    def std(self):
+        return math.sqrt(self.variance())
+
+    def quantile(self, q, empty=None):
+        if self.sketch is None or not self.count:
+            return empty
+        return round(self.sketch.quantile(q), 2)
+
+
+# ----------------- Vectorized counterpart -----------------
+def sketch_values(values, alpha=None):
+    """
+    Map each value to the representative value of its sketch bucket, so
+    that exact order statistics over the result equal QuantileSketch.quantile.
+    """
+    alpha = config.PERCENTILE_ACCURACY if alpha is None else alpha
+    gamma = (1 + alpha) / (1 - alpha)
+    magnitude = np.abs(values)
+    indexable = magnitude > _MIN_INDEXABLE
+    k = np.ceil(np.log(np.where(indexable, magnitude, 1.0)) / math.log(gamma))
+    represented = 2 * gamma**k / (gamma + 1)
+    return np.where(indexable, np.sign(values) * represented, 0.0)
@@ -0,0 +1,87 @@
+import heapq
+import math
+from typing import List, Optional
+
+from fastapi import Query
+
+
+def table_params(
+    page: int = Query(1, ge=1),
+    page_size: Optional[int] = Query(None, ge=1),
+    sort_by: Optional[str] = Query(None),  # column name, "-" prefix = descending
+    fields: Optional[List[str]] = Query(default=None),
+):
+    """
+    FastAPI dependency for report table paging. None when no paging
+    parameter was given, so the report keeps returning its full table.
+    """
+    if page == 1 and page_size is None and sort_by is None and fields is None:
+        return None
+    return {"page": page, "page_size": page_size, "sort_by": sort_by, "fields": fields}
+
+
+def table_page(rows, page=1, page_size=None, sort_by=None, presorted_by=None):
+    """
+    One page of `rows` and its pagination info. Sorting selects only the
+    first page * page_size rows with a heap instead of sorting the table;
+    ties keep table order, and None sorts last either way. Raises ValueError
+    for an unknown or unsortable sort_by column.
+
+    `presorted_by` names a numeric column the table would normally be sorted
+    by (descending) but was built without sorting: pages come out as if it
+    had been, i.e. ordered by that column when sort_by is None, and with
+    ties broken by it.
+    """
+    total = len(rows)
+    columns = set(rows[0]) if rows else set()
+    end = min(page * page_size, total) if page_size else total
+    start = (page - 1) * page_size if page_size else 0
+
+    order = sort_by or (presorted_by and f"-{presorted_by}")
+    if order:
+        column = order.lstrip("-")
+        if rows and column not in columns:
+            raise ValueError(f"Unknown sort_by column: {column}")
+        if order.startswith("-"):
+            pick, key = heapq.nlargest, lambda row: _descending(row[column])
+        else:
+            pick, key = heapq.nsmallest, lambda row: _ascending(row[column])
+        if presorted_by:
+            # larger presorted_by values first among ties, whichever the pick
+            sign = 1 if pick is heapq.nlargest else -1
+            key = _tiebreak(key, presorted_by, sign)
+        try:
+            selected = pick(end, rows, key=key)
+        except TypeError:
+            raise ValueError(f"Column {column} can't be sorted")
+    else:
+        selected = rows[:end]
+    return selected[start:end], {
+        "page": page,
+        "page_size": page_size or total,
+        "total_rows": total,
+        "total_pages": math.ceil(total / page_size) if page_size else 1,
+        "sort_by": sort_by,
+    }
+
+
+def project(rows, fields):
+    """Only `fields` of each row (all of them when fields is None)."""
+    if not fields or not rows:
+        return rows
+    unknown = [f for f in fields if f not in rows[0]]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return [{f: row[f] for f in fields} for row in rows]
+
+
+def _tiebreak(key, column, sign):
+    return lambda row: (key(row), sign * row[column])
+
+
+def _ascending(value):
+    return (value is None, 0 if value is None else value)
+
+
+def _descending(value):
+    return (value is not None, 0 if value is None else value)
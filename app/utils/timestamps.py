@@ -0,0 +1,94 @@
+from datetime import datetime
+from functools import lru_cache
+
+import numpy as np
+
+TS_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Missing timestamps in the columnar (NumPy) path are NaT (int64 min)
+NAT = np.iinfo(np.int64).min
+
+# (name, task, field) for every order timestamp the reports read
+TIMESTAMP_FIELDS = (
+    ("created_at", None, "created_at"),
+    ("pickup_assigned", "pickup_task", "assigned_at"),
+    ("pickup_arrived", "pickup_task", "arrived_at"),
+    ("pickup_success", "pickup_task", "successful_at"),
+    ("pickup_started", "pickup_task", "started_at"),
+    ("delivery_started", "delivery_task", "started_at"),
+    ("delivery_arrived", "delivery_task", "arrived_at"),
+    ("delivery_success", "delivery_task", "successful_at"),
+)
+
+# Parsed values are cached on the order dict under this key
+_CACHE_KEY = "_ts"
+
+
+def parse_epoch(ts):
+    """
+    "YYYY-MM-DD HH:MM:SS" -> epoch seconds, reading the naive timestamp at a
+    fixed UTC offset. None when missing or malformed.
+    """
+    if not ts:
+        return None
+    try:
+        if len(ts) == 19 and ts[10] == " " and ts[13] == ":" and ts[16] == ":":
+            hour, minute, second = int(ts[11:13]), int(ts[14:16]), int(ts[17:19])
+            if 0 <= hour < 24 and 0 <= minute < 60 and 0 <= second < 60:
+                return _day_epoch(ts[:10]) + hour * 3600 + minute * 60 + second
+        return _epoch(datetime.strptime(ts, TS_FORMAT))
+    except (TypeError, ValueError):
+        return None
+
+
+@lru_cache(maxsize=4096)
+def _day_epoch(day):
+    # Only a few distinct days per batch, so the date part is parsed once each
+    return _epoch(datetime.strptime(day, "%Y-%m-%d"))
+
+
+def _epoch(dt):
+    return int((dt - datetime(1970, 1, 1)).total_seconds())
+
+
+def order_times(order):
+    """All report timestamps of an order as epoch seconds, parsed once and cached."""
+    times = order.get(_CACHE_KEY)
+    if times is None:
+        tasks = {
+            None: order,
+            "pickup_task": order.get("pickup_task") or {},
+            "delivery_task": order.get("delivery_task") or {},
+        }
+        times = {
+            name: parse_epoch(tasks[source].get(field))
+            for name, source, field in TIMESTAMP_FIELDS
+        }
+        order[_CACHE_KEY] = times
+    return times
+
+
+def minutes_between(times, start, end):
+    """(end - start) in minutes, or None when either timestamp is missing."""
+    a, b = times[start], times[end]
+    if a is None or b is None:
+        return None
+    return (b - a) / 60
+
+
+# ----------------- Calendar helpers on epoch seconds -----------------
+def seconds_of_day(epoch):
+    return epoch % 86400
+
+
+def day_number(epoch):
+    return epoch // 86400
+
+
+def weekday(epoch):
+    # 1970-01-01 was a Thursday (Monday == 0)
+    return (epoch // 86400 + 3) % 7
+
+
+def time_to_seconds(t):
+    return t.hour * 3600 + t.minute * 60 + t.second
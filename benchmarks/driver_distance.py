@@ -0,0 +1,62 @@
+"""
+Scalar vs NumPy candidate filtering for auto-allocation, both served from a
+populated DriverIndex as in production. Imports the app, so the same
+environment (FIREBASE_CREDENTIALS) is needed; nothing is read from Firestore.
+
+    python -m benchmarks.driver_distance [drivers] [repeat]
+"""
+
+import random
+import sys
+import timeit
+
+import numpy as np
+
+from app.services.drivers.driver_index import DriverIndex
+from app.services.drivers.geo import get_bounding_box
+from app.services.drivers.nearby import _nearby_numpy, _nearby_scalar
+
+PICKUP = (29.3375, 47.9740)  # Kuwait City
+RADIUS_KM = 15.0
+
+
+def make_index(n, seed=0):
+    rng = random.Random(seed)
+    index = DriverIndex(cell_deg=0.05)
+    for i in range(n):
+        index.upsert(
+            f"driver-{i}",
+            {
+                "name": f"Driver {i}",
+                "lat": PICKUP[0] + rng.uniform(-0.2, 0.2),
+                "lng": PICKUP[1] + rng.uniform(-0.2, 0.2),
+                "duty_state": rng.choice(["ON_DUTY", "ON_DUTY", "OFF_DUTY"]),
+                "havingtask": rng.random() < 0.2,
+                "isOnline": rng.random() < 0.9,
+            },
+        )
+    return index
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    index = make_index(n)
+    box = get_bounding_box(*PICKUP, RADIUS_KM)
+
+    def scalar():
+        return _nearby_scalar(index.query(box), *PICKUP, RADIUS_KM, box)
+
+    def vectorized():
+        drivers, lat, lng = index.query_columns(box)
+        available = np.ones(len(drivers), dtype=bool)  # already filtered
+        return _nearby_numpy(drivers, lat, lng, available, *PICKUP, RADIUS_KM, box)
+
+    assert [r[0] for r in scalar()] == [r[0] for r in vectorized()]
+    for name, fn in (("scalar", scalar), ("numpy", vectorized)):
+        best = min(timeit.repeat(fn, number=1, repeat=repeat))
+        print(f"{name:>6}: {best * 1000:8.2f} ms for {n} drivers")
+
+
+if __name__ == "__main__":
+    main()
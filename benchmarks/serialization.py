@@ -0,0 +1,97 @@
+"""
+Response serialization for table-heavy reports: FastAPI's default path for a
+returned dict (jsonable_encoder, then json.dumps in JSONResponse) against
+FastJSONResponse rendering the same dict directly, as report endpoints now
+do. Reports are built from synthetic orders; nothing is fetched.
+
+    python -m benchmarks.serialization [orders] [repeat]
+"""
+
+import json
+import random
+import sys
+import timeit
+from datetime import datetime, timedelta
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app import config
+from app.services.reports.clientService import clientReportColumns
+from app.services.reports.driverService import driverReportColumns
+from app.services.reports.taskHistoryService import task_history_table
+from app.utils.order_store import OrderColumns
+from app.utils.responses import FastJSONResponse, orjson
+
+START = datetime(2025, 3, 1)
+
+
+def make_orders(n, seed=0):
+    rng = random.Random(seed)
+
+    def ts(base, max_minutes):
+        moment = base + timedelta(minutes=rng.uniform(0, max_minutes))
+        return moment, moment.strftime("%Y-%m-%d %H:%M:%S")
+
+    orders = []
+    for i in range(n):
+        created, created_at = ts(START, 30 * 24 * 60)
+        assigned, assigned_at = ts(created, 20)
+        picked, picked_at = ts(assigned, 20)
+        _, delivered_at = ts(picked, 40)
+        orders.append(
+            {
+                "reference": f"R{i}",
+                "user_name": f"Client {rng.randrange(n // 5 + 1)}",
+                "amount": str(round(rng.uniform(1, 30), 3)),
+                "status": "completed",
+                "created_at": created_at,
+                "pickup_task": {
+                    "driver_name": f"Driver {rng.randrange(n // 20 + 1)} KW{i % 4}",
+                    "assigned_at": assigned_at,
+                    "arrived_at": picked_at,
+                    "successful_at": picked_at,
+                    "started_at": assigned_at,
+                },
+                "delivery_task": {
+                    "started_at": picked_at,
+                    "arrived_at": delivered_at,
+                    "successful_at": delivered_at,
+                },
+            }
+        )
+    return orders
+
+
+def default_path(content):
+    return JSONResponse(jsonable_encoder(content)).body
+
+
+def fast_path(content):
+    return FastJSONResponse(content).body
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    orders = make_orders(n)
+    cols = OrderColumns(orders)
+    reports = {
+        "driver_report": driverReportColumns(cols),
+        "client_report": clientReportColumns(cols),
+        "task_history table": {"status": "completed", "table": task_history_table(orders)},
+    }
+
+    encoder = "orjson" if orjson is not None and config.JSON_RESPONSE == "orjson" else "json"
+    print(f"{n} orders, FastJSONResponse using {encoder}")
+    for name, content in reports.items():
+        assert json.loads(default_path(content)) == json.loads(fast_path(content))
+        size = len(default_path(content)) / 1024
+        print(f"{name} ({size:.0f} KiB)")
+        for label, fn in (("default", default_path), ("fast", fast_path)):
+            best = min(timeit.repeat(lambda: fn(content), number=1, repeat=repeat))
+            print(f"  {label:>8}: {best * 1000:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
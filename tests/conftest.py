@@ -0,0 +1,10 @@
+import sys
+import types
+
+# app.utils.firebase_connection opens Firestore clients at import time. Tests
+# never talk to Firestore: the driver modules import this placeholder instead,
+# and tests that need a client monkeypatch a fake into the importing module.
+firebase_connection = types.ModuleType("app.utils.firebase_connection")
+firebase_connection.db = None
+firebase_connection.async_db = None
+sys.modules.setdefault("app.utils.firebase_connection", firebase_connection)
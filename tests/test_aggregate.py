@@ -0,0 +1,73 @@
+from app.services.reports.aggregate import (
+    SKIP,
+    Count,
+    Duration,
+    First,
+    Grouping,
+    Sum,
+    TopK,
+    aggregate,
+    amount,
+    everything,
+)
+
+ORDERS = [
+    {
+        "user_name": "B",
+        "amount": "-2.5",
+        "created_at": "2025-03-01 10:00:00",
+        "delivery_task": {"successful_at": "2025-03-01 10:30:00"},
+    },
+    {
+        "user_name": "A",
+        "amount": "1",
+        "created_at": "2025-03-01 11:00:00",
+        "delivery_task": {"successful_at": "2025-03-01 11:12:00"},
+    },
+    {"user_name": "B", "amount": "x", "created_at": "2025-03-01 12:00:00"},
+    {
+        "amount": "4",
+        "created_at": "2025-03-01 13:00:00",
+        "delivery_task": {"successful_at": "2025-03-01 13:45:00"},
+    },
+    {"user_name": "A", "amount": "3", "created_at": None},
+]
+
+GROUPINGS = {
+    "total": Grouping(everything, {"orders": Count(), "fare": Sum(amount)}),
+    "clients": Grouping(
+        lambda order: order.get("user_name", SKIP),
+        {
+            "orders": Count(),
+            "fare": Sum(amount),
+            "delivery": Duration("created_at", "delivery_success"),
+            "first_fare": First(lambda order: order.get("amount")),
+            "top": TopK(lambda order: order["amount"], 1),
+        },
+    ),
+}
+
+
+def test_one_pass_over_all_groupings():
+    result = aggregate(ORDERS, GROUPINGS)
+
+    assert result["total"] == {"all": {"orders": 5, "fare": 10.5}}
+    clients = result["clients"]
+    # first-seen order, and SKIP leaves the nameless order out
+    assert list(clients) == ["B", "A"]
+    assert clients["B"]["orders"] == 2 and clients["A"]["orders"] == 2
+    # unparseable amounts count as 0, negative ones as their magnitude
+    assert clients["B"]["fare"] == 2.5 and clients["A"]["fare"] == 4.0
+    assert clients["B"]["first_fare"] == "-2.5"
+    assert clients["A"]["top"] == [("1", 1)]
+
+
+def test_duration_skips_missing_timestamps():
+    clients = aggregate(ORDERS, GROUPINGS)["clients"]
+    # only the orders with both timestamps are averaged
+    assert clients["B"]["delivery"].count == 1 and clients["B"]["delivery"].mean() == 30
+    assert clients["A"]["delivery"].count == 1 and clients["A"]["delivery"].mean() == 12
+
+
+def test_empty_data():
+    assert aggregate([], GROUPINGS) == {"total": {}, "clients": {}}
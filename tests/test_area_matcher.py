@@ -0,0 +1,95 @@
+import json
+import random
+
+import numpy as np
+import pytest
+
+from app.utils.area_matcher import DEFAULT_AREAS_PATH, UNKNOWN_AREA, AreaMatcher, CentroidIndex
+
+AREAS = [
+    {"neighborhoodenglish": "Salmiya,Salmiya Block 10", "centroid_x": 48.07, "centroid_y": 29.33},
+    {"neighborhoodenglish": "Hawalli, Block 10 Hawalli", "centroid_x": 48.02, "centroid_y": 29.34},
+    {"neighborhoodenglish": "Jabriya", "centroid_x": 48.02, "centroid_y": 29.32},
+    {"neighborhoodenglish": "Surra", "centroid_x": 47.98, "centroid_y": 29.31},
+    {"neighborhoodenglish": "Salwa", "centroid_x": 48.08, "centroid_y": 29.29},
+    {"neighborhoodenglish": "Sharq,Jabriya"},  # repeated alias: last area wins
+]
+
+
+def reference_match(areas_data, address):
+    # every alias's first occurrence; longest wins, then the leftmost
+    patterns = {}
+    for item in areas_data:
+        aliases = [a.strip() for a in item["neighborhoodenglish"].split(",")]
+        area = (aliases[0], item.get("centroid_y"), item.get("centroid_x"))
+        for alias in aliases:
+            if alias:
+                patterns[alias.lower()] = area
+    text = (address or "").lower()
+    hits = [
+        (len(alias), -(text.find(alias) + len(alias)), area)
+        for alias, area in patterns.items()
+        if alias in text
+    ]
+    return max(hits, key=lambda hit: hit[:2])[2] if hits else UNKNOWN_AREA
+
+
+@pytest.mark.parametrize(
+    "address, expected",
+    [
+        ("Street 5, Salmiya Block 10, Kuwait", "Salmiya"),
+        ("block 10 hawalli near salmiya", "Hawalli"),
+        ("SURRA, Salmiya", "Salmiya"),  # longer alias beats the earlier one
+        ("Salwa then Surra", "Salwa"),  # equal length: leftmost wins
+        ("Hawalli / Salmiya", "Hawalli"),
+        ("", "Unknown"),
+        (None, "Unknown"),
+        ("nowhere", "Unknown"),
+    ],
+)
+def test_longest_alias_wins(address, expected):
+    assert AreaMatcher(AREAS).match(address)[0] == expected
+
+
+def test_repeated_alias_belongs_to_last_area():
+    assert AreaMatcher(AREAS).match("Jabriya block 1") == ("Sharq", None, None)
+
+
+def test_matches_reference_on_bundled_areas():
+    with open(DEFAULT_AREAS_PATH, encoding="utf-8") as file:
+        areas = json.load(file)
+    matcher = AreaMatcher(areas, cache_size=0)
+    aliases = [
+        alias.strip()
+        for item in areas
+        if "neighborhoodenglish" in item
+        for alias in item["neighborhoodenglish"].split(",")
+        if alias.strip()
+    ]
+    rng = random.Random(0)
+    for _ in range(500):
+        words = rng.sample(aliases, rng.randint(0, 3)) + ["Street", "Block 4"]
+        rng.shuffle(words)
+        address = " ".join(w.upper() if rng.random() < 0.2 else w for w in words)
+        assert matcher.match(address) == reference_match(areas, address), address
+
+
+def test_centroid_index_nearest_within_radius():
+    index = CentroidIndex(AREAS, max_km=5)
+    names = [area[0] for area in index.areas]
+    lat = np.array([29.331, 29.3105, 29.60, np.nan])
+    lon = np.array([48.069, 47.981, 48.5, 48.0])
+    nearest = index.nearest_batch(lat, lon).tolist()
+    assert [names[i] if i >= 0 else None for i in nearest] == ["Salmiya", "Surra", None, None]
+
+
+def test_centroid_index_chunks_match_one_batch(monkeypatch):
+    index = CentroidIndex(AREAS, max_km=5)
+    rng = np.random.default_rng(0)
+    lat = rng.uniform(29.2, 29.5, 50)
+    lon = rng.uniform(47.9, 48.2, 50)
+    lat[[3, 17]] = np.nan
+    whole = index.nearest_batch(lat, lon)
+    monkeypatch.setattr(CentroidIndex, "_CHUNK", 7)
+    assert index.nearest_batch(lat, lon).tolist() == whole.tolist()
+    assert whole[3] == whole[17] == -1 and (whole >= 0).any()
@@ -0,0 +1,74 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from app.services.drivers.assignment import (
+    greedy_with_repair,
+    hungarian,
+    nearest_columns,
+)
+
+
+def brute_force(cost):
+    """Lowest total over every assignment of min(n, m) distinct pairs."""
+    n, m = cost.shape
+    if n > m:
+        return brute_force(cost.T)
+    return min(
+        cost[np.arange(n), list(cols)].sum()
+        for cols in itertools.permutations(range(m), n)
+    )
+
+
+def total(cost, assignment):
+    rows = np.flatnonzero(assignment >= 0)
+    return cost[rows, assignment[rows]].sum()
+
+
+def assert_valid(assignment, n, m):
+    assert assignment.shape == (n,)
+    used = assignment[assignment >= 0]
+    assert len(set(used.tolist())) == len(used)
+    assert ((used >= 0) & (used < m)).all()
+
+
+@pytest.mark.parametrize("seed", range(200))
+def test_hungarian_matches_brute_force(seed):
+    rng = np.random.default_rng(seed)
+    n, m = rng.integers(1, 7, 2)
+    # integer costs force ties, where any optimum is fine
+    cost = rng.integers(0, 6, (n, m)).astype(float) if seed % 2 else rng.random((n, m))
+    assignment = hungarian(cost)
+    assert_valid(assignment, n, m)
+    assert (assignment >= 0).sum() == min(n, m)
+    assert total(cost, assignment) == pytest.approx(brute_force(cost))
+
+
+@pytest.mark.parametrize("seed", range(50))
+def test_greedy_is_feasible_and_never_beats_the_optimum(seed):
+    rng = np.random.default_rng(seed)
+    n, m = rng.integers(1, 7, 2)
+    cost = rng.random((n, m)) * 10
+    feasible = rng.random((n, m)) < 0.7
+    assignment = greedy_with_repair(cost, feasible)
+    assert_valid(assignment, n, m)
+    rows = np.flatnonzero(assignment >= 0)
+    assert feasible[rows, assignment[rows]].all()
+    if len(rows) == min(n, m) and feasible.all():
+        assert total(cost, assignment) >= brute_force(cost) - 1e-9
+
+
+def test_greedy_repair_moves_a_holder_to_a_free_column():
+    cost = np.array([[1.0, 2.0], [1.5, 9.0]])
+    feasible = np.array([[True, True], [True, False]])
+    assert greedy_with_repair(cost, feasible).tolist() == [1, 0]
+
+
+@pytest.mark.parametrize("seed", range(50))
+def test_nearest_columns_keep_an_optimal_assignment(seed):
+    rng = np.random.default_rng(seed)
+    n, m = rng.integers(1, 5), rng.integers(5, 9)
+    cost = rng.random((n, m))
+    keep = nearest_columns(cost, np.ones((n, m), dtype=bool), n)
+    assert brute_force(cost[:, keep]) == pytest.approx(brute_force(cost))
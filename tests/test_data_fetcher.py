@@ -0,0 +1,124 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from app import config
+from app.utils import data_fetcher
+from app.utils.order_cache import OrderCache
+from app.utils.order_filters import apply_filters, client_filter
+
+ORDERS = [
+    {"reference": "R1", "user_name": "Client 7", "created_at": "2025-03-01 08:00:00"},
+    {"reference": "R2", "user_name": "Client 3 ", "created_at": "2025-03-01 09:00:00"},
+    {"reference": "R3", "user_name": "client 7", "created_at": "2025-03-01 10:00:00"},
+    {"reference": "R4", "user_name": "Client 9", "created_at": "2025-03-01 11:00:00"},
+    {"reference": "R5", "user_name": "Client 7", "created_at": "2025-03-02 08:00:00"},
+    {"reference": "R6", "user_name": "Client 9", "created_at": "2025-03-03 08:00:00"},
+]
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    # exact user_id match on the display name, like the transaction API
+    requested = []
+
+    def handler(request):
+        params = request.url.params
+        user_id, start, end = params["user_id"], params["start_date"], params["end_date"]
+        requested.append((user_id, start, end))
+        body = [
+            o
+            for o in ORDERS
+            if (user_id == "all" or o["user_name"] == user_id)
+            and start <= o["created_at"][:10] <= end
+        ]
+        return httpx.Response(200, content=json.dumps(body).encode())
+
+    monkeypatch.setattr(config, "ORDER_CACHE_ENABLED", False)
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler)), requested
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = OrderCache(max_orders=100, ttl=600, today_ttl=60)
+    monkeypatch.setattr(config, "ORDER_CACHE_ENABLED", True)
+    monkeypatch.setattr(data_fetcher, "order_cache", cache)
+    return cache
+
+
+def client_orders(http, selection, start="2025-03-01", end="2025-03-03"):
+    async def run():
+        data = await data_fetcher.getClientData(start, end, selection, http)
+        return [o["reference"] for o in apply_filters(data, client_filter(selection))]
+
+    return asyncio.run(run())
+
+
+def full_fetch(selection):
+    return [o["reference"] for o in apply_filters(ORDERS, client_filter(selection))]
+
+
+@pytest.mark.parametrize(
+    "selection", [["client 7", " Client 3"], ["CLIENT 3"], ["Client 7", "client 9"]]
+)
+def test_selection_matches_full_fetch_by_default(upstream, selection):
+    http, requested = upstream
+    assert client_orders(http, selection) == full_fetch(selection)
+    # the pushdown is off unless enabled: differently spelled names are kept
+    assert [user_id for user_id, _, _ in requested] == ["all"]
+
+
+def test_enabled_pushdown_sends_the_selection(upstream, monkeypatch):
+    http, requested = upstream
+    monkeypatch.setattr(config, "CLIENT_PUSHDOWN_MAX_CLIENTS", 2)
+    assert client_orders(http, ["Client 7", "Client 9"]) == ["R1", "R4", "R5", "R6"]
+    assert sorted(user_id for user_id, _, _ in requested) == ["Client 7", "Client 9"]
+
+    requested.clear()
+    client_orders(http, ["Client 7", "Client 9", "Client 3 "])
+    assert [user_id for user_id, _, _ in requested] == ["all"]
+
+
+def test_pushdown_serves_cached_days_and_fetches_only_missing_ones(
+    upstream, cache, monkeypatch
+):
+    http, requested = upstream
+    monkeypatch.setattr(config, "CLIENT_PUSHDOWN_MAX_CLIENTS", 2)
+    # e.g. the driver tab cached day 1 under "all"
+    asyncio.run(data_fetcher.getData("2025-03-01", "2025-03-01", "all", http))
+    requested.clear()
+
+    # day 1 comes from the cache with every spelling, days 2-3 are pushed down
+    assert client_orders(http, ["client 7"]) == ["R1", "R3"]
+    assert requested == [("client 7", "2025-03-02", "2025-03-03")]
+
+    requested.clear()
+    assert client_orders(http, ["Client 9"]) == ["R4", "R6"]
+    assert requested == [("Client 9", "2025-03-02", "2025-03-03")]
+
+
+def stream(http, start_date, end_date):
+    async def run():
+        stream = data_fetcher.streamData(start_date, end_date, "all", http)
+        return [o["reference"] async for o in stream]
+
+    return asyncio.run(run())
+
+
+@pytest.mark.parametrize("max_orders", [100, 3])
+def test_stream_data_shares_the_day_cache(upstream, cache, max_orders):
+    http, requested = upstream
+    cache.max_orders = max_orders
+
+    # day 2 cached by a getData call, day 1 streamed from upstream
+    asyncio.run(data_fetcher.getData("2025-03-02", "2025-03-02", "all", http))
+    expected = ["R1", "R2", "R3", "R4", "R5"]
+    assert stream(http, "2025-03-01", "2025-03-02") == expected
+    assert len(requested) == 2
+
+    requested.clear()
+    assert stream(http, "2025-03-01", "2025-03-02") == expected
+    # a run larger than the whole cache is streamed but not kept
+    assert len(requested) == (0 if max_orders == 100 else 1)
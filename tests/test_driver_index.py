@@ -0,0 +1,194 @@
+import random
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from app.services.drivers import driver_index as driver_index_module
+from app.services.drivers.driver_index import DriverIndex, is_available
+from app.services.drivers.geo import get_bounding_box
+
+KUWAIT = (29.3, 48.0)
+
+
+def driver(lat, lng, **flags):
+    return {"name": "Driver", "lat": lat, "lng": lng, **flags}
+
+
+def change(kind, driver_id, data=None):
+    return SimpleNamespace(
+        type=SimpleNamespace(name=kind),
+        document=SimpleNamespace(id=driver_id, to_dict=lambda: data),
+    )
+
+
+def brute_force(drivers, box):
+    """Available drivers inside `box`, ordered by (lat, driver_id)."""
+    found = [
+        (driver_id, data)
+        for driver_id, data in drivers.items()
+        if box["min_lat"] <= data["lat"] <= box["max_lat"]
+        and box["min_lng"] <= data["lng"] <= box["max_lng"]
+        and is_available(data)
+    ]
+    return sorted(found, key=lambda item: (item[1]["lat"], item[0]))
+
+
+def assert_consistent(index, drivers):
+    """Grid, records and column slots all describe exactly `drivers`."""
+    assert len(index) == len(drivers)
+    assert set(index._slot_of) == set(drivers)
+    assert sorted(index._slot_ids[s] for s in index._slot_of.values()) == sorted(drivers)
+    free = set(index._free)
+    assert free.isdisjoint(index._slot_of.values())
+    assert len(free) + len(drivers) == len(index._slot_ids)
+    for slot in free:
+        assert index._slot_ids[slot] is None
+        assert np.isnan(index._lat[slot]) and not index._available[slot]
+    in_cells = [d for ids in index._cells.values() for d in ids]
+    assert sorted(in_cells) == sorted(drivers)
+
+
+def test_removed_slots_are_reused_before_growing():
+    index = DriverIndex(cell_deg=0.05, capacity=4)
+    for i in range(4):
+        index.upsert(f"d{i}", driver(29.3 + i / 100, 48.0))
+    index.remove("d1")
+    index.remove("d3")
+    assert_consistent(index, {"d0", "d2"})
+
+    index.upsert("d4", driver(29.4, 48.1))
+    index.upsert("d5", driver(29.5, 48.2))
+    assert len(index._slot_ids) == 4
+    assert {index._slot_of["d4"], index._slot_of["d5"]} == {1, 3}
+
+    # a fifth driver doubles the columns and keeps the existing slots
+    index.upsert("d6", driver(29.6, 48.3))
+    assert len(index._slot_ids) == 8
+    assert index._slot_of["d6"] == 4
+    assert_consistent(index, {"d0", "d2", "d4", "d5", "d6"})
+
+
+def test_a_driver_without_a_position_is_removed():
+    index = DriverIndex(cell_deg=0.05)
+    index.upsert("d0", driver(29.3, 48.0))
+    index.upsert("d0", driver(None, 48.0))
+    assert_consistent(index, set())
+    assert index.query_columns(get_bounding_box(*KUWAIT, 50))[0] == []
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_index_matches_brute_force_under_random_updates(seed):
+    rng = random.Random(seed)
+    index = DriverIndex(cell_deg=0.05, capacity=8)
+    drivers = {}
+    for _ in range(400):
+        driver_id = f"d{rng.randrange(40)}"
+        action = rng.random()
+        if action < 0.2:
+            index.remove(driver_id)
+            drivers.pop(driver_id, None)
+        elif action < 0.5 and driver_id in drivers:
+            # a location ping merged into the existing record
+            ping = {"lat": rng.uniform(29.0, 29.6), "lng": rng.uniform(47.7, 48.3)}
+            index.update(driver_id, ping)
+            drivers[driver_id] = {**drivers[driver_id], **ping}
+        else:
+            data = driver(
+                rng.uniform(29.0, 29.6),
+                rng.uniform(47.7, 48.3),
+                duty_state=rng.choice(["ON_DUTY", "OFF_DUTY", None]),
+                havingtask=rng.choice([True, False, None]),
+                isOnline=rng.choice([True, False, None]),
+            )
+            index.upsert(driver_id, data)
+            drivers[driver_id] = data
+
+    assert_consistent(index, set(drivers))
+    for _ in range(10):
+        box = get_bounding_box(
+            rng.uniform(29.0, 29.6), rng.uniform(47.7, 48.3), rng.uniform(1, 30)
+        )
+        expected = brute_force(drivers, box)
+        found, lat, lng = index.query_columns(box)
+        assert [(d, r["lat"], r["lng"]) for d, r in found] == [
+            (d, r["lat"], r["lng"]) for d, r in expected
+        ]
+        assert lat.tolist() == [r["lat"] for _, r in expected]
+        assert lng.tolist() == [r["lng"] for _, r in expected]
+        # the grid query returns a superset: whole cells, any availability
+        cells = {d for d, _ in index.query(box)}
+        assert {d for d, _ in expected} <= cells
+
+
+class FakeWatch:
+    def __init__(self, callback):
+        self.callback = callback
+        self.is_active = True
+
+    def unsubscribe(self):
+        self.is_active = False
+
+
+class FakeDb:
+    def __init__(self):
+        self.watches = []
+
+    def collection(self, name):
+        assert name == "drivers"
+        return self
+
+    def on_snapshot(self, callback):
+        self.watches.append(FakeWatch(callback))
+        return self.watches[-1]
+
+
+def test_resync_drops_stale_drivers_and_old_listener_snapshots(monkeypatch):
+    db = FakeDb()
+    monkeypatch.setattr(driver_index_module, "db", db)
+    index = DriverIndex(cell_deg=0.05)
+
+    index.listen()
+    first = db.watches[0].callback
+    snapshot = [
+        change("ADDED", "a", driver(29.3, 48.0)),
+        change("ADDED", "b", driver(29.31, 48.0)),
+    ]
+    first(None, snapshot, None)
+    assert index.ready and len(index) == 2
+
+    # the listener dies; "b" is deleted while nobody listens
+    index.listen()
+    assert not index.ready and len(index) == 0
+    # a late callback from the dead listener must not repopulate the index
+    first(None, [change("MODIFIED", "b", driver(29.32, 48.0))], None)
+    assert not index.ready and len(index) == 0
+
+    db.watches[1].callback(None, [change("ADDED", "a", driver(29.3, 48.0))], None)
+    assert index.ready
+    assert_consistent(index, {"a"})
+
+
+def test_pings_during_resync_merge_into_the_snapshot_record(monkeypatch):
+    db = FakeDb()
+    monkeypatch.setattr(driver_index_module, "db", db)
+    index = DriverIndex(cell_deg=0.05)
+    index.listen()
+
+    # a ping before the snapshot only carries a position
+    index.update("a", {"lat": 29.35, "lng": 48.05})
+    box = get_bounding_box(29.35, 48.05, 1)
+    assert [d for d, _ in index.query_columns(box)[0]] == ["a"]
+
+    # the snapshot holds the last flushed state: busy, at the old position
+    db.watches[0].callback(
+        None, [change("ADDED", "a", driver(29.3, 48.0, havingtask=True))], None
+    )
+    assert index.query_columns(get_bounding_box(29.3, 48.0, 1))[0] == []
+
+    # the next ping keeps the snapshot's flags and moves the driver
+    index.update("a", {"lat": 29.35, "lng": 48.05, "havingtask": False})
+    found, lat, lng = index.query_columns(box)
+    assert [(d, r["name"]) for d, r in found] == [("a", "Driver")]
+    assert (lat.tolist(), lng.tolist()) == ([29.35], [48.05])
+    assert_consistent(index, {"a"})
@@ -0,0 +1,43 @@
+import asyncio
+
+import pytest
+
+from app.utils.export import export_chunks, export_response_async
+
+ROWS = [{"a": i, "b": [i, "x"]} for i in range(5)]
+
+
+async def aiter(rows):
+    for row in rows:
+        yield row
+
+
+async def collect(chunks):
+    return [chunk async for chunk in chunks]
+
+
+@pytest.mark.parametrize("fmt", ["csv", "ndjson"])
+def test_async_rows_give_the_same_chunks(fmt):
+    chunks = list(export_chunks(ROWS, fmt, batch_rows=2))
+    assert len(chunks) == 3
+    assert asyncio.run(collect(export_chunks(aiter(ROWS), fmt, batch_rows=2))) == chunks
+    if fmt == "csv":
+        # one header, on the first chunk only
+        assert "".join(chunks).count("a,b") == 1
+
+
+def test_async_export_fails_before_the_response_starts():
+    async def failing():
+        raise RuntimeError("upstream down")
+        yield
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(export_response_async(failing(), "csv", "x"))
+
+
+def test_async_export_of_no_rows_is_empty():
+    async def run():
+        response = await export_response_async(aiter([]), "ndjson", "x")
+        return await collect(response.body_iterator)
+
+    assert asyncio.run(run()) == []
@@ -0,0 +1,62 @@
+import random
+
+import pytest
+
+from app.services.drivers import geohash
+from app.services.drivers.geo import get_bounding_box
+
+
+def random_boxes(seed, n=50):
+    rng = random.Random(seed)
+    for _ in range(n):
+        lat = rng.uniform(-60, 60)
+        lng = rng.uniform(-179, 179)
+        yield get_bounding_box(lat, lng, rng.choice([0.3, 2, 5, 20, 80]))
+
+
+def points_in(box, rng, n=200):
+    corners = [
+        (box["min_lat"], box["min_lng"]),
+        (box["min_lat"], box["max_lng"]),
+        (box["max_lat"], box["min_lng"]),
+        (box["max_lat"], box["max_lng"]),
+    ]
+    inside = [
+        (
+            rng.uniform(box["min_lat"], box["max_lat"]),
+            rng.uniform(box["min_lng"], box["max_lng"]),
+        )
+        for _ in range(n)
+    ]
+    return corners + inside
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("max_cells", [1, 4, 9, 16])
+def test_covering_prefixes_cover_every_point_in_the_box(seed, max_cells):
+    rng = random.Random(seed)
+    for box in random_boxes(seed):
+        prefixes = geohash.covering_prefixes(box, max_cells)
+        # precision 1 is the fallback even when it needs more cells
+        assert len(prefixes) <= max_cells or len(prefixes[0]) == 1
+        assert len({len(p) for p in prefixes}) == 1
+        for lat, lng in points_in(box, rng):
+            code = geohash.encode(lat, lng, 9)
+            assert any(code.startswith(p) for p in prefixes), (box, lat, lng)
+
+
+@pytest.mark.parametrize("precision", range(1, 8))
+def test_covering_cells_are_the_cells_of_the_points(precision):
+    rng = random.Random(precision)
+    for box in random_boxes(precision, n=20):
+        lat_step, lng_step = geohash.cell_size(precision)
+        size = (box["max_lat"] - box["min_lat"]) * (box["max_lng"] - box["min_lng"])
+        if size / (lat_step * lng_step) > 400:
+            continue
+        cells = geohash.covering_cells(box, precision)
+        hit = {geohash.encode(lat, lng, precision) for lat, lng in points_in(box, rng)}
+        assert hit <= set(cells)
+
+
+def test_encode_known_values():
+    assert geohash.encode(57.64911, 10.40744, 11) == "u4pruydqqvj"
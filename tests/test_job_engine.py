@@ -0,0 +1,220 @@
+import asyncio
+import json
+
+import pytest
+
+from app.utils.job_engine import (
+    DONE,
+    FAILED,
+    QUEUED,
+    RUNNING,
+    JobEngine,
+    JobQueueFull,
+    progress,
+)
+
+
+class FakeRedis:
+    """The commands JobEngine uses, with decoded responses and manual expiry."""
+
+    def __init__(self):
+        self.data = {}
+        self.ttl = {}
+        self.states = []  # every state written, in order
+
+    def expire_now(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+            self.ttl.pop(key, None)
+
+    async def hsetnx(self, key, field, value):
+        h = self.data.setdefault(key, {})
+        if field in h:
+            return 0
+        h[field] = str(value)
+        return 1
+
+    async def hget(self, key, field):
+        return self.data.get(key, {}).get(field)
+
+    async def hset(self, key, field=None, value=None, mapping=None):
+        h = self.data.setdefault(key, {})
+        if field is not None:
+            h[field] = str(value)
+        h.update({k: str(v) for k, v in (mapping or {}).items()})
+        if "state" in (mapping or {}):
+            self.states.append(mapping["state"])
+        return 1
+
+    async def hgetall(self, key):
+        return dict(self.data.get(key, {}))
+
+    async def delete(self, *keys):
+        self.expire_now(*keys)
+
+    async def expire(self, key, seconds):
+        if key in self.data:
+            self.ttl[key] = seconds
+        return int(key in self.data)
+
+    async def rpush(self, key, *values):
+        self.data.setdefault(key, []).extend(values)
+        return len(self.data[key])
+
+    async def lrange(self, key, first, last):
+        values = self.data.get(key, [])
+        return values[first : None if last == -1 else last + 1]
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.calls = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def __getattr__(self, name):
+        def queue(*args, **kwargs):
+            self.calls.append((name, args, kwargs))
+
+        return queue
+
+    async def execute(self):
+        return [
+            await getattr(self.redis, name)(*args, **kwargs)
+            for name, args, kwargs in self.calls
+        ]
+
+
+@pytest.fixture
+def engine():
+    # json.dumps is picklable, so the real spawn pool can run it
+    jobs = JobEngine("test", workers=1, max_pending=2, job_ttl=60, result_ttl=300)
+    yield jobs
+    if jobs._pool is not None:
+        jobs._pool.shutdown(wait=True, cancel_futures=True)
+
+
+def run(engine, steps):
+    async def main():
+        engine.start()
+        try:
+            return await steps()
+        finally:
+            await engine.shutdown()
+
+    return asyncio.run(main())
+
+
+async def wait_done(engine, redis, job_id):
+    for _ in range(600):
+        job = await engine.fetch(redis, job_id)
+        if job.get("state") in (DONE, FAILED):
+            return job
+        await asyncio.sleep(0.05)
+    raise AssertionError("job did not finish")
+
+
+def test_job_runs_to_done_with_meta_and_result_ttl(engine):
+    redis = FakeRedis()
+    chunks = [[1, 2], [3], [4, 5, 6]]
+
+    async def steps():
+        queued = await engine.submit(redis, "a", json.dumps, chunks, 6, summary="{}")
+        job = await wait_done(engine, redis, "a")
+        return queued, job, await engine.fetch_chunks(redis, "a", 0, -1)
+
+    queued, job, parts = run(engine, steps)
+    assert queued
+    assert redis.states == [QUEUED, RUNNING, RUNNING, RUNNING, RUNNING, DONE]
+    assert job == {"state": DONE, "processed": "6", "total": "6", "summary": "{}"}
+    assert progress(job) == 100.0
+    assert [json.loads(p) for p in parts] == chunks
+    assert redis.ttl[engine.key("a")] == redis.ttl[engine.chunks_key("a")] == 300
+
+
+def test_identical_job_is_not_queued_twice(engine):
+    redis = FakeRedis()
+
+    async def steps():
+        first = await engine.submit(redis, "a", json.dumps, [[1]], 1)
+        second = await engine.submit(redis, "a", json.dumps, [[1]], 1)
+        await wait_done(engine, redis, "a")
+        third = await engine.submit(redis, "a", json.dumps, [[1]], 1)
+        return first, second, third
+
+    assert run(engine, steps) == (True, False, False)
+
+
+def test_failed_job_reports_error_and_can_be_retried(engine):
+    redis = FakeRedis()
+
+    async def steps():
+        # a set is not JSON serializable: the worker raises
+        await engine.submit(redis, "a", json.dumps, [[1], [{2}]], 2, summary="s")
+        failed = await wait_done(engine, redis, "a")
+        retried = await engine.submit(
+            redis, "a", json.dumps, [[1], [2]], 2, summary="s"
+        )
+        return failed, retried, await wait_done(engine, redis, "a")
+
+    failed, retried, done = run(engine, steps)
+    assert failed["state"] == FAILED and "TypeError" in failed["error"]
+    assert failed["summary"] == "s" and failed["processed"] == "1"
+    assert retried and done["state"] == DONE and "error" not in done
+
+
+def test_hash_expired_before_running_comes_back_complete(engine):
+    redis = FakeRedis()
+
+    async def steps():
+        await engine.submit(redis, "a", json.dumps, [[1], [2]], 2, summary="s")
+        # the job's TTL lapses while it waits for a worker slot
+        redis.expire_now(engine.key("a"))
+        return await wait_done(engine, redis, "a")
+
+    job = run(engine, steps)
+    assert job == {"state": DONE, "processed": "2", "total": "2", "summary": "s"}
+
+
+def test_results_expired_mid_run_fail_the_job(engine):
+    redis = FakeRedis()
+    rpush = redis.rpush
+
+    async def expiring_rpush(key, *values):
+        # the first chunk's list expires before the second lands
+        if len(redis.data.get(key, [])) == 1:
+            redis.expire_now(key)
+        return await rpush(key, *values)
+
+    redis.rpush = expiring_rpush
+
+    async def steps():
+        await engine.submit(redis, "a", json.dumps, [[1], [2]], 2, summary="s")
+        return await wait_done(engine, redis, "a")
+
+    job = run(engine, steps)
+    assert job["state"] == FAILED and "expired" in job["error"]
+    assert job["summary"] == "s" and job["total"] == "2"
+
+
+def test_queue_full_and_shutdown_cleans_up(engine):
+    redis = FakeRedis()
+
+    async def steps():
+        for job_id in ("a", "b"):
+            chunks = [[i] for i in range(50)]
+            await engine.submit(redis, job_id, json.dumps, chunks, 50)
+        with pytest.raises(JobQueueFull):
+            await engine.submit(redis, "c", json.dumps, [[1]], 1)
+
+    run(engine, steps)
+    # shutdown cancelled both jobs and removed their state and results
+    assert redis.data == {}
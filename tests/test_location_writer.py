@@ -0,0 +1,97 @@
+import asyncio
+
+import pytest
+
+from app.services.drivers import location_writer as location_writer_module
+from app.services.drivers.driver_index import DriverIndex
+from app.services.drivers.location_writer import LocationWriter
+
+
+class FakeBatch:
+    def __init__(self, db):
+        self.db = db
+        self.writes = []
+
+    def set(self, ref, fields, merge=False):
+        assert merge
+        self.writes.append((ref, fields))
+
+    async def commit(self):
+        self.db.commits += 1
+        failure = self.db.failures.pop(self.db.commits, None)
+        if failure is not None:
+            failure()
+        for ref, fields in self.writes:
+            self.db.docs.setdefault(ref, {}).update(fields)
+
+
+class FakeAsyncDb:
+    """Batched merge-writes into `docs`; failures maps commit number -> callback."""
+
+    def __init__(self):
+        self.docs = {}
+        self.commits = 0
+        self.failures = {}
+
+    def collection(self, name):
+        assert name == "drivers"
+        return self
+
+    def document(self, driver_id):
+        return driver_id
+
+    def batch(self):
+        return FakeBatch(self)
+
+
+@pytest.fixture
+def db(monkeypatch):
+    db = FakeAsyncDb()
+    monkeypatch.setattr(location_writer_module, "async_db", db)
+    monkeypatch.setattr(location_writer_module, "driver_index", DriverIndex(0.05))
+    return db
+
+
+def ping(i, lat=29.3):
+    return f"d{i}", {"lat": lat, "lng": 48.0, "isOnline": True}
+
+
+def test_latest_pings_are_written_in_batches(db):
+    writer = LocationWriter(interval=1, batch_size=2)
+    writer.submit([ping(i) for i in range(5)])
+    writer.submit([ping(0, lat=29.4)])
+    assert writer.pending == 5
+    assert len(location_writer_module.driver_index) == 5
+
+    assert asyncio.run(writer.flush()) == 5
+    assert db.commits == 3 and writer.pending == 0
+    assert db.docs["d0"]["lat"] == 29.4
+    assert db.docs["d0"]["geohash"].startswith("tj")
+
+
+@pytest.mark.parametrize("error", [RuntimeError, asyncio.CancelledError])
+def test_failed_batch_requeues_the_unwritten_drivers(db, error):
+    writer = LocationWriter(interval=1, batch_size=2)
+    writer.submit([ping(i) for i in range(5)])
+
+    def fail():
+        # newer pings arrive while the failing batch is in flight
+        writer.submit([ping(2, lat=29.5), ("d3", {"isOnline": False})])
+        raise error("commit failed")
+
+    db.failures[2] = fail
+    with pytest.raises(error):
+        asyncio.run(writer.flush())
+
+    # the first batch is written; the rest is queued again, newest fields on top
+    assert sorted(db.docs) == ["d0", "d1"]
+    assert sorted(writer._pending) == ["d2", "d3", "d4"]
+    assert writer._pending["d2"]["lat"] == 29.5
+    assert writer._pending["d3"]["lat"] == 29.3
+    assert writer._pending["d3"]["isOnline"] is False
+
+    assert asyncio.run(writer.flush()) == 3
+    assert sorted(db.docs) == ["d0", "d1", "d2", "d3", "d4"]
+    assert db.docs["d2"]["lat"] == 29.5
+    assert db.docs["d3"]["isOnline"] is False
+    assert writer.pending == 0
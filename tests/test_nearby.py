@@ -0,0 +1,177 @@
+import asyncio
+import random
+
+import pytest
+
+from app import config
+from app.services.drivers import driver_index as driver_index_module
+from app.services.drivers import oneByOne_AA
+from app.services.drivers.driver_index import DriverIndex, is_available
+from app.services.drivers.geo import get_bounding_box, haversine
+from app.services.drivers.nearby import nearby_drivers
+
+KERNELS = ["numpy", "scalar"]
+
+
+def make_drivers(n, seed):
+    rng = random.Random(seed)
+    drivers = {}
+    for i in range(n):
+        data = {
+            "name": f"Driver {i}",
+            "lat": round(rng.uniform(29.0, 29.6), 6),
+            "lng": round(rng.uniform(47.7, 48.3), 6),
+            "duty_state": rng.choice(["ON_DUTY", "OFF_DUTY", None]),
+            "havingtask": rng.choice([False, False, True, None]),
+            "isOnline": rng.choice([True, True, False, None]),
+        }
+        # the gaps real driver documents have
+        if rng.random() < 0.05:
+            data["lat"] = None
+        if rng.random() < 0.05:
+            del data["lng"]
+        if rng.random() < 0.05:
+            data["lat"] = str(data["lat"])
+        drivers[f"d{i}"] = data
+    return drivers
+
+
+class FakeQuery:
+    """The lat-band query of the Firestore fallback over `drivers`."""
+
+    def __init__(self, drivers, filters=()):
+        self.drivers = drivers
+        self.filters = filters
+
+    def where(self, field, op, value):
+        assert field == "lat"
+        return FakeQuery(self.drivers, self.filters + ((op, value),))
+
+    async def stream(self):
+        for driver_id, data in sorted(self.drivers.items()):
+            try:
+                lat = float(data.get("lat"))
+            except (TypeError, ValueError):
+                continue
+            if all(lat >= v if op == ">=" else lat <= v for op, v in self.filters):
+                yield FakeDoc(driver_id, data)
+
+
+class FakeDoc:
+    def __init__(self, driver_id, data):
+        self.id = driver_id
+        self.data = data
+
+    def to_dict(self):
+        return dict(self.data)
+
+
+class FakeAsyncDb:
+    def __init__(self, drivers):
+        self.drivers = drivers
+        self.queries = 0
+
+    def collection(self, name):
+        assert name == "drivers"
+        self.queries += 1
+        return FakeQuery(self.drivers)
+
+
+@pytest.fixture(params=["index", "firestore"])
+def source(request, monkeypatch):
+    """Install `drivers` as the live index or as the Firestore fallback."""
+    monkeypatch.setattr(config, "DRIVER_GEOHASH_QUERIES", False)
+
+    def install(drivers):
+        index = DriverIndex(cell_deg=0.05)
+        if request.param == "index":
+            for driver_id, data in drivers.items():
+                index.upsert(driver_id, data)
+            index.ready = True
+        db = FakeAsyncDb(drivers)
+        monkeypatch.setattr(driver_index_module, "driver_index", index)
+        monkeypatch.setattr(oneByOne_AA, "driver_index", index)
+        monkeypatch.setattr(driver_index_module, "async_db", db)
+        return db
+
+    return install
+
+
+def nearby(kernel, lat, lng, radius, monkeypatch):
+    monkeypatch.setattr(config, "DRIVER_DISTANCE_KERNEL", kernel)
+    box = get_bounding_box(lat, lng, radius)
+    return asyncio.run(nearby_drivers(lat, lng, radius, box))
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_numpy_kernel_matches_scalar_loop(source, seed, monkeypatch):
+    rng = random.Random(seed)
+    drivers = make_drivers(rng.choice([0, 1, 30, 300]), seed)
+    source(drivers)
+
+    matched = 0
+    for _ in range(5):
+        lat, lng = rng.uniform(29.0, 29.6), rng.uniform(47.7, 48.3)
+        radius = rng.choice([0.5, 2, 5, 15, 60])
+        scalar = nearby("scalar", lat, lng, radius, monkeypatch)
+        vector = nearby("numpy", lat, lng, radius, monkeypatch)
+
+        assert [d[0] for d in vector] == [d[0] for d in scalar]
+        matched += len(scalar)
+        for (_, v_data, v_lat, v_lng, v_d), (_, s_data, s_lat, s_lng, s_d) in zip(
+            vector, scalar
+        ):
+            assert v_data == s_data
+            assert (v_lat, v_lng) == (s_lat, s_lng)
+            assert v_d == pytest.approx(s_d, rel=1e-12)
+            assert v_d <= radius
+    if len(drivers) >= 300:
+        assert matched
+
+
+def distances(drivers, lat, lng):
+    """(distance, driver_id) of every available driver with a position."""
+    found = []
+    for driver_id, data in drivers.items():
+        if data.get("lat") is None or data.get("lng") is None:
+            continue
+        if is_available(data):
+            d = haversine(float(data["lat"]), float(data["lng"]), lat, lng)
+            found.append((d, driver_id))
+    return sorted(found)
+
+
+def ring_radius(found, k, max_radius):
+    """The first doubled radius holding k drivers, capped at max_radius."""
+    radius = min(config.DRIVER_SEARCH_START_KM, max_radius)
+    while sum(d <= radius for d, _ in found) < k and radius < max_radius:
+        radius = min(radius * 2, max_radius)
+    return radius
+
+
+@pytest.mark.parametrize("kernel", KERNELS)
+@pytest.mark.parametrize("seed", range(10))
+def test_k_nearest_stops_at_the_first_ring_holding_k(
+    source, kernel, seed, monkeypatch
+):
+    rng = random.Random(seed)
+    drivers = make_drivers(rng.choice([0, 5, 300]), seed)
+    db = source(drivers)
+    monkeypatch.setattr(config, "DRIVER_DISTANCE_KERNEL", kernel)
+    monkeypatch.setattr(config, "DRIVER_SEARCH_START_KM", 1)
+
+    for _ in range(5):
+        lat, lng = rng.uniform(29.0, 29.6), rng.uniform(47.7, 48.3)
+        k, max_radius = rng.choice([1, 3, 10]), rng.choice([3, 10, 50])
+        found = [(d, i) for d, i in distances(drivers, lat, lng) if d <= max_radius]
+        radius = ring_radius(found, k, max_radius)
+
+        db.queries = 0
+        result = asyncio.run(
+            oneByOne_AA.auto_allocation_one_by_one(lat, lng, max_radius, k=k)
+        )
+        assert result["search_radius_km"] == radius
+        nearest = [i for d, i in found if d <= radius][:k]
+        assert [s["driver_id"] for s in result["driver_summaries"]] == nearest
+        # the Firestore fallback reads max_radius once instead of every ring
+        assert db.queries == (0 if driver_index_module.driver_index.ready else 1)
@@ -0,0 +1,95 @@
+import copy
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.services.reports.areaReport import areaReport, areaReportColumns
+from app.services.reports.clientService import clientReport, clientReportColumns
+from app.services.reports.driverService import driverReport, driverReportColumns
+from app.services.reports.hourlyService import hourlyReport, hourlyReportColumns
+from app.services.reports.taskHistoryService import (
+    task_history,
+    task_history_columns,
+    task_history_table,
+    task_history_table_columns,
+)
+from app.utils.order_store import OrderColumns
+
+START = datetime(2025, 3, 1)
+
+
+def make_orders(n, seed):
+    rng = random.Random(seed)
+
+    def ts(base, max_minutes):
+        moment = base + timedelta(seconds=rng.randint(0, max_minutes * 60))
+        return moment, moment.strftime("%Y-%m-%d %H:%M:%S")
+
+    orders = []
+    for i in range(n):
+        created, created_at = ts(START, 7 * 24 * 60)
+        assigned, assigned_at = ts(created, 20)
+        picked, picked_at = ts(assigned, 20)
+        _, delivered_at = ts(picked, 40)
+        order = {
+            "reference": f"R{i}",
+            "user_name": f"Client {rng.randrange(12)}",
+            "amount": str(round(rng.uniform(0.1, 30), 3)),
+            "status": rng.choice(["completed", "cancelled"]),
+            "created_at": created_at,
+            "area": rng.choice(["Salmiya", "Hawalli", "Jabriya", "Unknown"]),
+            "latitude": 29.3,
+            "longitude": 48.0,
+            "pickup_task": {
+                "driver_name": f"Driver {rng.randrange(8)} KW{i % 3}",
+                "assigned_at": assigned_at,
+                "arrived_at": picked_at,
+                "successful_at": picked_at,
+                "started_at": assigned_at,
+            },
+            "delivery_task": {
+                "started_at": picked_at,
+                "arrived_at": delivered_at,
+                "successful_at": delivered_at,
+            },
+        }
+        # the gaps real upstream data has
+        if rng.random() < 0.05:
+            del order["user_name"]
+        if rng.random() < 0.05:
+            order["delivery_task"] = {}
+        if rng.random() < 0.05:
+            order["pickup_task"]["assigned_at"] = None
+        # formats the fixed-format parser rejects (NumPy would accept them)
+        if rng.random() < 0.03:
+            order["pickup_task"]["arrived_at"] = picked_at.replace(" ", "T")
+        if rng.random() < 0.03:
+            order["created_at"] = created_at[:10]
+        orders.append(order)
+    return orders
+
+
+REPORTS = {
+    "client": (clientReport, clientReportColumns),
+    "driver": (driverReport, driverReportColumns),
+    "area": (areaReport, areaReportColumns),
+    "task_history": (task_history, task_history_columns),
+    "task_history_table": (task_history_table, task_history_table_columns),
+    "hourly": (
+        lambda data: hourlyReport(data, "2025-03-01", "2025-03-07", "22:00", "06:00"),
+        lambda cols: hourlyReportColumns(
+            cols, "2025-03-01", "2025-03-07", "22:00", "06:00"
+        ),
+    ),
+}
+
+
+# seed 15: the fare total lands on a half cent, where summation order shows
+@pytest.mark.parametrize("seed", [0, 1, 15])
+@pytest.mark.parametrize("report", sorted(REPORTS))
+def test_engines_identical(report, seed):
+    python_engine, columnar_engine = REPORTS[report]
+    orders = make_orders(3000, seed)
+    expected = python_engine(copy.deepcopy(orders))
+    assert columnar_engine(OrderColumns(copy.deepcopy(orders))) == expected
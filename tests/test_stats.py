@@ -0,0 +1,95 @@
+import math
+import random
+import statistics
+
+import numpy as np
+import pytest
+
+from app.utils.stats import QuantileSketch, RunningStats, sketch_values
+
+QUANTILES = (0, 0.01, 0.25, 0.5, 0.9, 0.99, 1)
+
+
+def samples(seed, n=5000):
+    rng = random.Random(seed)
+    # delivery-time-like: skewed, spanning several orders of magnitude
+    values = [rng.lognormvariate(3, 1) for _ in range(n)]
+    values += [0.0] * 50 + [-rng.uniform(0.1, 5) for _ in range(100)]
+    rng.shuffle(values)
+    return values
+
+
+def exact_quantile(values, q):
+    # the rank QuantileSketch.quantile targets
+    return sorted(values)[math.floor(q * (len(values) - 1))]
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_running_stats_matches_exact(seed):
+    values = samples(seed)
+    stats = RunningStats()
+    for x in values:
+        stats.add(x)
+
+    assert stats.count == len(values)
+    assert stats.min == min(values) and stats.max == max(values)
+    assert stats.mean() == round(sum(values) / len(values), 2)
+    assert stats.variance() == pytest.approx(statistics.variance(values), rel=1e-9)
+    assert stats.std() == pytest.approx(statistics.stdev(values), rel=1e-9)
+
+
+def test_running_stats_merge_equals_single_pass():
+    values = samples(0)
+    whole = RunningStats(quantiles=True)
+    parts = [RunningStats(quantiles=True) for _ in range(4)]
+    for i, x in enumerate(values):
+        whole.add(x)
+        parts[i % 4].add(x)
+    merged = RunningStats(quantiles=True)
+    for part in parts + [RunningStats(quantiles=True)]:  # empty merges are no-ops
+        merged.merge(part)
+
+    assert merged.count == whole.count
+    assert merged.total == pytest.approx(whole.total, rel=1e-12)
+    assert merged.variance() == pytest.approx(whole.variance(), rel=1e-9)
+    assert (merged.min, merged.max) == (whole.min, whole.max)
+    for q in QUANTILES:
+        assert merged.quantile(q) == whole.quantile(q)
+
+
+def test_empty_running_stats():
+    stats = RunningStats(quantiles=True)
+    assert stats.mean() is None and stats.mean(empty=0) == 0
+    assert stats.quantile(0.5) is None and stats.variance() == 0.0
+
+
+@pytest.mark.parametrize("alpha", [0.01, 0.05])
+@pytest.mark.parametrize("seed", range(3))
+def test_sketch_relative_accuracy(seed, alpha):
+    values = samples(seed)
+    sketch = QuantileSketch(alpha)
+    for x in values:
+        sketch.add(x)
+    for q in QUANTILES:
+        exact = exact_quantile(values, q)
+        assert abs(sketch.quantile(q) - exact) <= alpha * abs(exact) + 1e-12
+
+
+def test_sketch_memory_is_bounded_by_range():
+    sketch = QuantileSketch(0.01)
+    rng = random.Random(0)
+    for _ in range(100_000):
+        sketch.add(rng.uniform(1, 120))
+    # log(120) / log(gamma) buckets at most, however many values were added
+    assert len(sketch.positive) <= math.ceil(math.log(120) / math.log(sketch.gamma)) + 1
+
+
+def test_sketch_values_match_sketch_quantiles():
+    values = samples(1)
+    sketch = QuantileSketch()
+    for x in values:
+        sketch.add(x)
+    bucketed = np.sort(sketch_values(np.array(values)))
+    for q in QUANTILES:
+        rank = math.floor(q * (len(values) - 1))
+        assert bucketed[rank] == pytest.approx(sketch.quantile(q), rel=1e-12)
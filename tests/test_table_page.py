@@ -0,0 +1,27 @@
+import random
+
+import pytest
+
+from app.utils.table_page import table_page
+
+
+def make_rows(seed):
+    rng = random.Random(seed)
+    return [
+        {
+            "Area": f"Area {i}",
+            "Orders": rng.randint(1, 4),
+            "Fare": rng.choice([None, 1.5, 2.0, 3.25]),
+        }
+        for i in range(40)
+    ]
+
+
+@pytest.mark.parametrize("seed", range(10))
+@pytest.mark.parametrize("sort_by", [None, "Orders", "-Orders", "Fare", "-Fare"])
+def test_presorted_by_pages_like_the_sorted_table(seed, sort_by):
+    rows = make_rows(seed)
+    presorted = sorted(rows, key=lambda row: row["Orders"], reverse=True)
+    for page in (1, 2, 3):
+        expected = table_page(presorted, page, 7, sort_by)
+        assert table_page(rows, page, 7, sort_by, presorted_by="Orders") == expected
@@ -0,0 +1,84 @@
+import asyncio
+import json
+from datetime import date, timedelta
+
+import pytest
+
+from app import config
+from app.services.reports import taskHistoryService
+from app.services.reports.taskHistoryService import (
+    fetch_task_history_table,
+    task_history_job_id,
+    task_history_jobs,
+)
+from app.utils.job_engine import _encode_chunk
+from tests.test_job_engine import FakeRedis
+
+
+def test_job_without_chunk_size_reads_as_failed():
+    redis = FakeRedis()
+    # e.g. a hash an older build recreated with only state/processed
+    redis.data[task_history_jobs.key("a")] = {"state": "running", "processed": "5"}
+    result = asyncio.run(fetch_task_history_table(redis, "a"))
+    assert result["status"] == "failed" and result["state"] == "failed"
+    assert "expired" in result["error"]
+    assert result["table"] == []
+
+
+def test_unknown_job_still_reads_as_processing():
+    result = asyncio.run(fetch_task_history_table(FakeRedis(), "nope"))
+    assert result["status"] == "processing" and result["state"] is None
+
+
+def test_job_id_rolls_over_only_when_the_range_reaches_today(monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(taskHistoryService.time, "time", lambda: now[0])
+    monkeypatch.setattr(config, "ORDER_CACHE_TODAY_TTL", 60)
+    past = (date.today() - timedelta(days=1)).isoformat()
+    today = date.today().isoformat()
+
+    def ids():
+        return [
+            task_history_job_id("2025-01-01", end, None, "all")
+            for end in (past, today, "not a date")
+        ]
+
+    before = ids()
+    now[0] += 60
+    after = ids()
+    assert before[0] == after[0]
+    assert before[1] != after[1] and before[2] != after[2]
+
+
+def store_done_job(redis, rows, chunk_size):
+    chunks = [rows[i : i + chunk_size] for i in range(0, len(rows), chunk_size)]
+    redis.data[task_history_jobs.key("a")] = {
+        "state": "done",
+        "processed": str(len(rows)),
+        "total": str(len(rows)),
+        "chunk_size": str(chunk_size),
+    }
+    redis.data[task_history_jobs.chunks_key("a")] = [
+        _encode_chunk(json.dumps, chunk) for chunk in chunks
+    ]
+
+
+@pytest.mark.parametrize("configured", [3, 4])
+def test_pages_read_the_job_and_its_chunks_together(monkeypatch, configured):
+    redis = FakeRedis()
+    rows = [{"Order ID": f"R{i}"} for i in range(10)]
+    store_done_job(redis, rows, 3)
+    monkeypatch.setattr(config, "TASK_HISTORY_CHUNK_ORDERS", configured)
+
+    async def separate_reads(*args):
+        raise AssertionError("hash read outside the pipeline")
+
+    monkeypatch.setattr(task_history_jobs, "fetch", separate_reads)
+
+    def page(cursor, limit):
+        return asyncio.run(fetch_task_history_table(redis, "a", cursor, limit))
+
+    assert page(0, None)["table"] == rows
+    # a job built with another chunk size than configured is still paged right
+    assert page(2, 5)["table"] == rows[2:7] and page(2, 5)["next_cursor"] == 7
+    assert page(8, 5)["table"] == rows[8:] and page(8, 5)["next_cursor"] is None